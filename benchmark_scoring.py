@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+计算流程性能基准：用合成工作簿分别测量读取、清洗、计算和写出各阶段的耗时
+结果可保存为JSON基线，之后的运行与基线比较，超过回归阈值时以非零状态退出
+
+    python3 benchmark_scoring.py --sizes 100 1000 --output baseline.json
+    python3 benchmark_scoring.py --sizes 100 1000 --baseline baseline.json --threshold 0.2
+    python3 benchmark_scoring.py --sizes 1000 --extra-columns 60 --drop-unused-columns   # 宽表丢弃无关列
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from calculate_scores_final_fix import process_single_subject
+from pipeline_profiler import StageProfiler
+from result_writer import write_consolidated_workbook
+from synthetic_workbook import DEFAULT_EXAMS, DEFAULT_SUBJECTS, generate_workbook
+from workbook_loader import WorkbookSession, clean_subject_dataframe
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+STAGES = ['load', 'clean', 'score', 'write']
+
+# 某阶段耗时超过基线 (1 + 阈值) 倍且绝对增量超过 MIN_REGRESSION_SECONDS 时视为回归
+DEFAULT_THRESHOLD = 0.2
+MIN_REGRESSION_SECONDS = 0.05
+
+
+def prepare_workbook(data_dir, n_classes, seed, extra_columns=0):
+    """生成（或复用已生成的）合成工作簿"""
+    extra = f'_extra{extra_columns}' if extra_columns else ''
+    path = os.path.join(data_dir, f'synthetic_{n_classes}_seed{seed}{extra}.xlsx')
+    if not os.path.exists(path):
+        print(f"  生成合成工作簿: {path}")
+        generate_workbook(path, n_classes, seed=seed, extra_columns=extra_columns)
+    return path
+
+
+def run_pipeline(path, output_dir, track_memory=False, drop_unused_columns=False):
+    """运行一次完整流程，返回 StageProfiler 统计（阶段为 STAGES）"""
+    profiler = StageProfiler(track_memory=track_memory).start()
+    # 计算流程逐列打印处理信息，基准测量时不输出
+    with contextlib.redirect_stdout(io.StringIO()):
+        with WorkbookSession(path, drop_unused_columns=drop_unused_columns) as workbook:
+            sheets = workbook.load()
+        profiler.mark('load')
+
+        cleaned = {subject: clean_subject_dataframe(df, verbosity='quiet') for subject, df in sheets.items()}
+        profiler.mark('clean')
+
+        results = {}
+        for subject, df in cleaned.items():
+            results[subject] = process_single_subject(path, subject, subject_df=df, cleaned=True,
+                                                      write_output=False)
+        profiler.mark('score')
+
+        write_consolidated_workbook(os.path.join(output_dir, 'results.xlsx'), results)
+        profiler.mark('write')
+    return profiler.stop().to_dict()
+
+
+def benchmark_size(path, repeat, track_memory=False, drop_unused_columns=False):
+    """多次运行取每个阶段的最短耗时"""
+    best = {stage: float('inf') for stage in STAGES}
+    peak_memory = None
+    with tempfile.TemporaryDirectory() as output_dir:
+        for _ in range(repeat):
+            profile = run_pipeline(path, output_dir, track_memory, drop_unused_columns)
+            for stats in profile['stages']:
+                best[stats['stage']] = min(best[stats['stage']], stats['wall_time'])
+            if profile['peak_memory'] is not None:
+                peak_memory = max(peak_memory or 0, profile['peak_memory'])
+    return {'stages': best, 'total': sum(best.values()), 'peak_memory': peak_memory}
+
+
+def environment_info():
+    """记录运行环境，比较不同机器上的基线时用于判断是否可比"""
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare_to_baseline(baseline, current, threshold=DEFAULT_THRESHOLD, min_seconds=MIN_REGRESSION_SECONDS):
+    """与基线比较，返回回归项 [(班级数, 阶段, 基线秒数, 当前秒数)]（只比较两者都有的规模和阶段）"""
+    regressions = []
+    for size, result in current['results'].items():
+        baseline_result = baseline['results'].get(size)
+        if baseline_result is None:
+            continue
+        for stage, seconds in result['stages'].items():
+            baseline_seconds = baseline_result['stages'].get(stage)
+            if baseline_seconds is None:
+                continue
+            if seconds > baseline_seconds * (1 + threshold) and seconds - baseline_seconds > min_seconds:
+                regressions.append((int(size), stage, baseline_seconds, seconds))
+    return regressions
+
+
+def print_results(current, baseline=None):
+    header = f"{'班级数':>8s}" + ''.join(f"{stage:>10s}" for stage in STAGES + ['total'])
+    print(header)
+    for size, result in current['results'].items():
+        row = f"{size:>10s}" + ''.join(f"{result['stages'][stage]:10.3f}" for stage in STAGES)
+        row += f"{result['total']:10.3f}"
+        print(row)
+        baseline_result = baseline['results'].get(size) if baseline else None
+        if baseline_result is not None:
+            ratios = [result['stages'][stage] / baseline_result['stages'][stage]
+                      if baseline_result['stages'].get(stage) else float('nan') for stage in STAGES]
+            ratios.append(result['total'] / baseline_result['total'] if baseline_result['total'] else float('nan'))
+            print(f"{'x基线':>8s}" + ''.join(f"{ratio:10.2f}" for ratio in ratios))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='计算流程性能基准')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='班级数（每个规模一个工作簿）')
+    parser.add_argument('--repeat', type=int, default=3, help='每个规模的运行次数（取各阶段最短耗时）')
+    parser.add_argument('--seed', type=int, default=0, help='合成数据随机种子')
+    parser.add_argument('--data-dir', default=None, help='合成工作簿目录（已存在的工作簿直接复用），默认使用临时目录')
+    parser.add_argument('--extra-columns', type=int, default=0, help='每个科目工作表追加的无关列个数')
+    parser.add_argument('--drop-unused-columns', action='store_true', help='丢弃科目计算用不到的列')
+    parser.add_argument('--memory', action='store_true', help='同时统计内存峰值（tracemalloc 会影响耗时）')
+    parser.add_argument('--output', help='把结果保存为JSON基线')
+    parser.add_argument('--baseline', help='与该JSON基线比较')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='回归阈值（相对基线增加的比例）')
+    parser.add_argument('--min-seconds', type=float, default=MIN_REGRESSION_SECONDS,
+                        help='视为回归的最小绝对增量（秒），避免毫秒级阶段的测量噪声')
+    args = parser.parse_args()
+
+    logging.getLogger('data_cleaner').setLevel(logging.WARNING)
+    current = {
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'environment': environment_info(),
+        'parameters': {'seed': args.seed, 'repeat': args.repeat, 'subjects': DEFAULT_SUBJECTS,
+                       'exams': DEFAULT_EXAMS, 'extra_columns': args.extra_columns,
+                       'drop_unused_columns': args.drop_unused_columns},
+        'results': {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = args.data_dir or tmp_dir
+        os.makedirs(data_dir, exist_ok=True)
+        for size in args.sizes:
+            print(f"测量 {size} 个班级...")
+            path = prepare_workbook(data_dir, size, args.seed, args.extra_columns)
+            current['results'][str(size)] = benchmark_size(path, args.repeat, args.memory, args.drop_unused_columns)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_results(current, baseline)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到: {args.output}")
+
+    if baseline is not None:
+        if baseline.get('environment') != current['environment']:
+            print("注意: 基线的运行环境与本次不同，比较结果仅供参考")
+        regressions = compare_to_baseline(baseline, current, args.threshold, args.min_seconds)
+        if regressions:
+            print(f"❌ 发现性能回归（阈值 {args.threshold:.0%}）:")
+            for size, stage, baseline_seconds, seconds in regressions:
+                print(f"  {size} 个班级 {stage}: {baseline_seconds:.3f}s -> {seconds:.3f}s")
+            sys.exit(1)
+        print(f"✅ 未发现性能回归（阈值 {args.threshold:.0%}）")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,15 @@ import pandas as pd
 import numpy as np
 import os
 
+from column_resolver import ColumnResolver, METRIC_SUFFIX_LETTERS
+from scoring_engine import SCORING_METHOD_FIXED, build_scoring_intervals
+
+# 指标名称
+METRIC_NAMES = ['平均分', '优秀率', '优良率', '合格率', '低分率']
+
+# 各考试列名的后缀序号
+EXAM_SUFFIX_INDEX = {'中考': 1, '二模': 2, '九年上': 3, '八年下': 4}
+
 class TeacherScoreCalculator:
     """教师教学成绩排名赋分计算器"""
     
@@ -24,30 +33,8 @@ class TeacherScoreCalculator:
             return False
     
     def get_scoring_rules(self, total_count):
-        """根据总人数确定赋分区间"""
-        if total_count <= 20:
-            # 小规模调整
-            intervals = [
-                (1, 3, 8, 8.9),
-                (4, 7, 6, 6.9),
-                (8, 12, 5, 5.9),
-                (13, 18, 4, 4.9),
-                (19, 25, 3, 3.9),
-                (26, 30, 2, 2.9),
-                (31, total_count, 0, 0)
-            ]
-        else:
-            # 原始176人规则
-            intervals = [
-                (1, 18, 8, 8.9),
-                (19, 43, 6, 6.9),
-                (44, 71, 5, 5.9),
-                (72, 106, 4, 4.9),
-                (107, 134, 3, 3.9),
-                (135, 159, 2, 2.9),
-                (160, total_count, 0, 0)
-            ]
-        return intervals
+        """根据总人数确定赋分区间（固定区间规则：20人及以下使用小规模区间，否则使用176人规则）"""
+        return build_scoring_intervals(total_count, SCORING_METHOD_FIXED)
     
     def assign_score(self, rank, intervals, is_jinshan):
         """根据排名和学校类型赋分"""
@@ -57,88 +44,33 @@ class TeacherScoreCalculator:
         return 0
     
     def get_exam_columns(self, exam_name, subject):
-        """获取指定考试的指标列名"""
-        if exam_name == "中考":
-            # 检查是否有后缀的列名（如语文）
-            suffix_cols = [
-                f'{exam_name}   {subject}   平均分   p1',
-                f'{exam_name}   {subject}   优秀率   y1', 
-                f'{exam_name}   {subject}   优良率   l1',
-                f'{exam_name}   {subject}   合格率  h1',
-                f'{exam_name}   {subject}   低分率    d1'
-            ]
-            # 检查无后缀的列名（如生物、地理）
-            no_suffix_cols = [
-                f'{exam_name}   {subject}   平均分',
-                f'{exam_name}   {subject}   优秀率',
-                f'{exam_name}   {subject}   优良率',
-                f'{exam_name}   {subject}   合格率',
-                f'{exam_name}   {subject}   低分率'
-            ]
-            return suffix_cols, no_suffix_cols
-            
-        elif exam_name == "二模":
-            suffix_cols = [
-                f'{exam_name}   {subject}   平均分   p2',
-                f'{exam_name}   {subject}   优秀率   y2',
-                f'{exam_name}   {subject}   优良率   l2', 
-                f'{exam_name}   {subject}   合格率h2',
-                f'{exam_name}     {subject}   低分率   d2'
-            ]
-            no_suffix_cols = [
-                f'{exam_name}   {subject}   平均分',
-                f'{exam_name}   {subject}   优秀率',
-                f'{exam_name}   {subject}   优良率',
-                f'{exam_name}   {subject}   合格率',
-                f'{exam_name}   {subject}   低分率'
-            ]
-            return suffix_cols, no_suffix_cols
-            
-        elif exam_name == "九年上":
-            suffix_cols = [
-                f'{exam_name}   {subject}   平均分   p3',
-                f'{exam_name}   {subject}   优秀率   y3',
-                f'{exam_name}   {subject}   优良率   l3',
-                f'{exam_name}   {subject}   合格率   h3',
-                f'{exam_name}   {subject}   低分率   d3'
-            ]
-            no_suffix_cols = [
-                f'{exam_name}   {subject}   平均分',
-                f'{exam_name}   {subject}   优秀率',
-                f'{exam_name}   {subject}   优良率',
-                f'{exam_name}   {subject}   合格率',
-                f'{exam_name}   {subject}   低分率'
-            ]
-            return suffix_cols, no_suffix_cols
-            
-        elif exam_name == "八年下":
-            suffix_cols = [
-                f'{exam_name}   {subject}   平均分   p4',
-                f'{exam_name}   {subject}   优秀率   y4',
-                f'{exam_name}   {subject}   优良率   l4',
-                f'{exam_name}   {subject}   合格率   h4',
-                f'{exam_name}   {subject}   低分率   d4'
-            ]
-            no_suffix_cols = [
-                f'{exam_name}   {subject}   平均分',
-                f'{exam_name}   {subject}   优秀率',
-                f'{exam_name}   {subject}   优良率',
-                f'{exam_name}   {subject}   合格率',
-                f'{exam_name}   {subject}   低分率'
-            ]
-            return suffix_cols, no_suffix_cols
+        """获取指定考试的指标列名（标准写法，实际列名由 find_existing_columns 按结构化键匹配）"""
+        suffix_index = EXAM_SUFFIX_INDEX.get(exam_name)
+        if suffix_index is None:
+            return [], []
         
-        return [], []
+        # 有后缀的列名（如语文）
+        suffix_cols = [
+            f'{exam_name}   {subject}   {metric}   {METRIC_SUFFIX_LETTERS[metric]}{suffix_index}'
+            for metric in METRIC_NAMES
+        ]
+        # 无后缀的列名（如生物、地理）
+        no_suffix_cols = [f'{exam_name}   {subject}   {metric}' for metric in METRIC_NAMES]
+        return suffix_cols, no_suffix_cols
     
     def find_existing_columns(self, df, suffix_cols, no_suffix_cols):
-        """查找实际存在的列名"""
+        """查找实际存在的列名（按结构化键匹配，兼容“合格率  h1”“合格率h2”等空格不一致的写法）"""
+        resolver = ColumnResolver(df.columns)
+        
         # 优先查找有后缀的列名
-        existing_cols = [col for col in suffix_cols if col in df.columns]
+        existing_cols = [resolver.resolve_exact(col) for col in suffix_cols]
+        existing_cols = [col for col in existing_cols if col is not None]
         if len(existing_cols) == 5:
             return existing_cols, True  # True表示有后缀
         
         # 如果没有找到有后缀的列，查找无后缀的列
-        existing_cols = [col for col in no_suffix_cols if col in df.columns]
+        existing_cols = [resolver.resolve_exact(col) for col in no_suffix_cols]
+        existing_cols = [col for col in existing_cols if col is not None]
         if len(existing_cols) == 5:
             return existing_cols, False  # False表示无后缀
         
@@ -333,6 +265,43 @@ class TeacherScoreCalculator:
         
         return df
     
+    def score_dataframe(self, df, subject):
+        """对已读取的科目数据依次计算各考试得分、差值得分和综合得分（不读写文件）"""
+        # 1. 计算第一个考试（中考）的得分
+        print(f"1. 计算中考得分...")
+        df = self.calculate_exam_scores(df, "中考", subject)
+        
+        # 检查是否有更多考试
+        suffix_cols, no_suffix_cols = self.get_exam_columns("二模", subject)
+        existing_cols, has_suffix = self.find_existing_columns(df, suffix_cols, no_suffix_cols)
+        
+        if len(existing_cols) == 5:
+            # 2. 计算第二个考试（二模）的差值得分
+            print(f"2. 计算二模差值得分...")
+            df = self.calculate_difference_scores(df, "中考", "二模", subject)
+            
+            # 检查是否有第三次考试
+            suffix_cols3, no_suffix_cols3 = self.get_exam_columns("九年上", subject)
+            existing_cols3, has_suffix3 = self.find_existing_columns(df, suffix_cols3, no_suffix_cols3)
+            
+            if len(existing_cols3) == 5:
+                # 3. 计算第三个考试（九年上）的差值得分
+                print(f"3. 计算九年上差值得分...")
+                df = self.calculate_difference_scores(df, "二模", "九年上", subject)
+                
+                # 检查是否有第四次考试
+                suffix_cols4, no_suffix_cols4 = self.get_exam_columns("八年下", subject)
+                existing_cols4, has_suffix4 = self.find_existing_columns(df, suffix_cols4, no_suffix_cols4)
+                
+                if len(existing_cols4) == 5:
+                    # 4. 计算第四个考试（八年下）的差值得分
+                    print(f"4. 计算八年下差值得分...")
+                    df = self.calculate_difference_scores(df, "九年上", "八年下", subject)
+        
+        # 5. 计算综合得分和排名
+        print(f"5. 计算综合得分和排名...")
+        return self.calculate_comprehensive_score(df, subject)
+    
     def process_subject(self, subject):
         """处理单个科目的计算"""
         print(f"\n开始处理科目: {subject}")
@@ -352,40 +321,7 @@ class TeacherScoreCalculator:
                 '班   别': '班别'
             })
             
-            # 1. 计算第一个考试（中考）的得分
-            print(f"1. 计算中考得分...")
-            df = self.calculate_exam_scores(df, "中考", subject)
-            
-            # 检查是否有更多考试
-            suffix_cols, no_suffix_cols = self.get_exam_columns("二模", subject)
-            existing_cols, has_suffix = self.find_existing_columns(df, suffix_cols, no_suffix_cols)
-            
-            if len(existing_cols) == 5:
-                # 2. 计算第二个考试（二模）的差值得分
-                print(f"2. 计算二模差值得分...")
-                df = self.calculate_difference_scores(df, "中考", "二模", subject)
-                
-                # 检查是否有第三次考试
-                suffix_cols3, no_suffix_cols3 = self.get_exam_columns("九年上", subject)
-                existing_cols3, has_suffix3 = self.find_existing_columns(df, suffix_cols3, no_suffix_cols3)
-                
-                if len(existing_cols3) == 5:
-                    # 3. 计算第三个考试（九年上）的差值得分
-                    print(f"3. 计算九年上差值得分...")
-                    df = self.calculate_difference_scores(df, "二模", "九年上", subject)
-                    
-                    # 检查是否有第四次考试
-                    suffix_cols4, no_suffix_cols4 = self.get_exam_columns("八年下", subject)
-                    existing_cols4, has_suffix4 = self.find_existing_columns(df, suffix_cols4, no_suffix_cols4)
-                    
-                    if len(existing_cols4) == 5:
-                        # 4. 计算第四个考试（八年下）的差值得分
-                        print(f"4. 计算八年下差值得分...")
-                        df = self.calculate_difference_scores(df, "九年上", "八年下", subject)
-            
-            # 5. 计算综合得分和排名
-            print(f"5. 计算综合得分和排名...")
-            df = self.calculate_comprehensive_score(df, subject)
+            df = self.score_dataframe(df, subject)
             
             # 保存结果
             output_file = f'{subject}排名赋分结果.xlsx'
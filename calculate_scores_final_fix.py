@@ -2,79 +2,153 @@ import pandas as pd
 import numpy as np
 import os
 import re
+import time
+import logging
+import multiprocessing
+from fractions import Fraction
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-# 导入数据清洗模块
-try:
-    from data_cleaner import DataCleaner, clean_excel_data
-    DATA_CLEANER_AVAILABLE = True
-except ImportError:
-    print("警告: 数据清洗模块未找到，将使用原始数据处理方式")
-    DATA_CLEANER_AVAILABLE = False
+from scoring_engine import (DEFAULT_SCORING_METHOD, JINSHAN_SCHOOL, batch_min_rank, batch_rank_and_score,
+                            from_score_units, get_score_table, validate_scoring_method, weight_fractions,
+                            weighted_totals_units)
+from column_resolver import ColumnResolver, classify_header
+from workbook_loader import WorkbookSession, clean_subject_dataframe, read_projected_sheets
+from result_writer import write_result_workbook
+from pipeline_profiler import StageProfiler, format_profile
 
+# 各科目结果文件的默认路径（{subject} 替换为科目名称）
+DEFAULT_OUTPUT_PATTERN = '{subject}排名赋分结果_动态识别版.xlsx'
 
+# 综合得分：第一个考试总分占0.4，其余考试总分平分0.6（只有一次考试时即为该次总分）
+FIRST_EXAM_WEIGHT = Fraction(2, 5)
 
-def extract_exam_names(df, subject):
-    """动态识别Excel表格中的考试名称"""
+# 教育阶段配置：参与计算的指标及其在单次考试总分中的权重
+EDUCATION_CONFIGS = {
+    'middle': {  # 初中
+        'label': '初中',
+        'metrics': ['平均分', '优秀率', '优良率', '合格率', '低分率'],
+        'weights': [0.3, 0.2, 0.2, 0.2, 0.1]  # 平均分0.3
+    },
+    'primary': {  # 小学
+        'label': '小学',
+        'metrics': ['平均分', '优秀率', '合格率', '低分率'],  # 去掉优良率
+        'weights': [0.5, 0.2, 0.2, 0.1]  # 平均分0.5
+    }
+}
+
+# 单个科目的处理阶段（按执行顺序）及完成时该科目的进度比例
+STAGE_READ = 'read'
+STAGE_CLEAN = 'clean'
+STAGE_DETECT_EXAMS = 'detect_exams'
+STAGE_RANK = 'rank'
+STAGE_COMPREHENSIVE = 'comprehensive'
+STAGE_WRITE = 'write'
+
+# 整个运行的阶段（性能统计用）
+STAGE_LOAD_WORKBOOK = 'load_workbook'
+STAGE_SUBJECTS = 'subjects'
+STAGE_WRITE_OUTPUT = 'write_output'
+
+# 并行处理子进程的启动方式：Web服务中作业管理、预读取等线程持有锁时 fork 可能导致子进程死锁，
+# 因此使用 spawn 启动干净的解释器
+PROCESS_START_METHOD = 'spawn'
+
+STAGE_LABELS = {
+    STAGE_LOAD_WORKBOOK: '读取工作簿',
+    STAGE_SUBJECTS: '科目计算',
+    STAGE_WRITE_OUTPUT: '写出汇总',
+    STAGE_READ: '读取数据',
+    STAGE_CLEAN: '数据清洗',
+    STAGE_DETECT_EXAMS: '识别考试',
+    STAGE_RANK: '排名赋分',
+    STAGE_COMPREHENSIVE: '综合得分',
+    STAGE_WRITE: '写出结果',
+}
+
+# 排名赋分阶段按已完成的考试指标数在 [识别考试, 综合得分] 之间线性推进
+_STAGE_FRACTIONS = {
+    STAGE_READ: 0.05,
+    STAGE_CLEAN: 0.15,
+    STAGE_DETECT_EXAMS: 0.2,
+    STAGE_COMPREHENSIVE: 0.9,
+    STAGE_WRITE: 1.0,
+}
+
+
+class StageProgress:
+    """单个科目的阶段进度回报：每个阶段完成时调用
+    callback(subject, stage, fraction, elapsed, detail)
+
+    fraction 为该科目已完成的比例（0~1），elapsed 为该科目开始处理以来的秒数，
+    detail 为阶段说明（排名赋分阶段为本批排名的考试和指标数）。callback 为 None 时不回报。
+    传入 profiler（StageProfiler）时同时统计每个阶段的耗时和内存。
+    """
+
+    def __init__(self, subject, callback=None, profiler=None):
+        self.subject = subject
+        self.callback = callback
+        self.profiler = profiler
+        self.start_time = time.perf_counter()
+        self.rank_steps = 0
+        self.rank_completed = 0
+
+    def report(self, stage, detail='', fraction=None):
+        if self.profiler is not None:
+            self.profiler.mark(stage)
+        if self.callback is None:
+            return
+        if fraction is None:
+            fraction = _STAGE_FRACTIONS[stage]
+        self.callback(self.subject, stage, fraction, time.perf_counter() - self.start_time, detail)
+
+    def rank_step(self, detail):
+        """排名赋分阶段完成一批排名（第一个考试的全部指标，或全部差值）"""
+        self.rank_completed += 1
+        start = _STAGE_FRACTIONS[STAGE_DETECT_EXAMS]
+        span = _STAGE_FRACTIONS[STAGE_COMPREHENSIVE] - start
+        fraction = start + span * self.rank_completed / max(1, self.rank_steps)
+        self.report(STAGE_RANK, detail, fraction)
+
+
+
+def comprehensive_weights(exam_count):
+    """综合得分权重（精确分数）：2次 0.4/0.6，3次 0.4/0.3/0.3，4次 0.4/0.2/0.2/0.2，以此类推"""
+    if exam_count <= 1:
+        return [Fraction(1)] * exam_count
+    rest = (1 - FIRST_EXAM_WEIGHT) / (exam_count - 1)
+    return [FIRST_EXAM_WEIGHT] + [rest] * (exam_count - 1)
+
+def extract_exam_names(df, subject, verbose=True):
+    """动态识别Excel表格中的考试名称
     
-    # 定义可能的考试关键词
-    exam_keywords = [
-        '中考', '二模', '九年上', '八年下', '八年上', '七年下', '七年上', 
-        '六年下', '六年上', '五年下', '五年上', '四年下', '四年上', 
-        '三年下', '三年上','七年入' 
-    ]
+    每个表头只扫描一次：考试关键词和指标同义词分别由一个预编译正则匹配，
+    分类结果按列名缓存，同一工作簿的各科目共享
+    
+    Args:
+        verbose: 是否输出识别结果和未匹配的列名（预检时关闭）
+    """
     
     # 存储找到的考试名称和对应的列
     found_exams = {}
     
-    # 定义指标的同义词映射，提高容错性
-    metric_synonyms = {
-        '平均分': ['平均分', '平均', '均分', 'mean', '平均分'],
-        '优秀率': ['优秀率', '优秀', '优秀率', 'excellent', '优秀率'],
-        '优良率': ['优良率', '优良', '良好率', 'good', '优良率'],
-        '合格率': ['合格率', '合格', '及格率', 'pass', '合格率'],
-        '低分率': ['低分率', '低分', '不及格率', 'fail', '低分率']
-    }
-    
-    # 改进的指标匹配函数，增强容错性
-    def find_metric_in_column(col_name, target_metrics):
-        # 预处理列名：去除多余空格，标准化格式
-        col_processed = col_name.lower().strip()
-        
-        # 处理列名中的多个空格，将其合并为单个空格
-        import re
-        col_processed = re.sub(r'\s+', ' ', col_processed)
-        
-        for metric, synonyms in target_metrics.items():
-            for syn in synonyms:
-                syn_lower = syn.lower().strip()
-                # 检查是否包含同义词（支持空格分隔的情况）
-                if syn_lower in col_processed:
-                    return metric
-                # 检查是否包含同义词的字符组合（处理空格分隔的情况）
-                if syn_lower.replace(' ', '') in col_processed.replace(' ', ''):
-                    return metric
-        return None
-    
     # 记录匹配失败的列名，便于调试
     unmatched_columns = []
     
     # 遍历所有列名，寻找包含考试关键词的列
     for col in df.columns:
         if isinstance(col, str) and subject in col:
-            for keyword in exam_keywords:
-                if keyword in col:
-                    # 使用改进的指标匹配逻辑
-                    metric = find_metric_in_column(col, metric_synonyms)
-                    if metric:
-                        if keyword not in found_exams:
-                            found_exams[keyword] = []
-                        found_exams[keyword].append(col)
-                    else:
-                        unmatched_columns.append(col)
-                    break
+            keyword, has_metric = classify_header(col)
+            if keyword is None:
+                continue
+            if has_metric:
+                if keyword not in found_exams:
+                    found_exams[keyword] = []
+                found_exams[keyword].append(col)
+            else:
+                unmatched_columns.append(col)
     
     # 输出匹配失败的列名，帮助用户了解数据格式
-    if unmatched_columns:
+    if unmatched_columns and verbose:
         print(f"警告：以下列名未能匹配到指标：{unmatched_columns}")
     
     # 按考试顺序排序（中考第一，二模第二，其他按年级和学期排序）
@@ -94,19 +168,43 @@ def extract_exam_names(df, subject):
     
     sorted_exams = sorted(found_exams.keys(), key=sort_exam_key)
     
-    print(f"识别到的考试顺序: {sorted_exams}")
-    for exam in sorted_exams:
-        print(f"  {exam}: {len(found_exams[exam])} 个指标列")
+    if verbose:
+        print(f"识别到的考试顺序: {sorted_exams}")
+        for exam in sorted_exams:
+            print(f"  {exam}: {len(found_exams[exam])} 个指标列")
     
     return sorted_exams, found_exams
 
-def calculate_scores_final_fix(input_file_path=None, subject=None, education_level='middle'):
-    """最终修复版本，使用统一的百分比赋分规则
+def calculate_scores_final_fix(input_file_path=None, subject=None, education_level='middle', workbook=None,
+                               parallel=False, max_workers=None, output_pattern=DEFAULT_OUTPUT_PATTERN,
+                               stage_callback=None, return_profile=False, profile_memory=False,
+                               drop_unused_columns=False, scoring_method=DEFAULT_SCORING_METHOD, scoring_table=None,
+                               education_levels=None):
+    """最终修复版本，默认使用统一的百分比赋分规则
     
     Args:
         input_file_path: 输入文件路径
         subject: 科目名称
         education_level: 教育阶段，'primary'为小学，'middle'为初中（默认）
+        workbook: 已打开的WorkbookSession，传入时不再重复解析Excel文件
+        parallel: 处理所有科目时是否使用进程池并行计算
+        max_workers: 并行进程数
+        output_pattern: 结果文件路径模板，{subject} 替换为科目名称；为None时不写出单科结果文件
+        stage_callback: 阶段进度回调，见 StageProgress
+        return_profile: 是否同时返回各阶段的耗时、CPU时间和内存峰值统计
+        profile_memory: 性能统计是否包含内存峰值（tracemalloc，默认关闭）
+        drop_unused_columns: 是否丢弃科目计算用不到的列（未传入workbook时有效，结果中不再附带这些列）
+        scoring_method: 赋分方式，'percentage' 统一百分比区间（默认）、'fixed' 固定176人区间、
+            'custom' 自定义百分比赋分表
+        scoring_table: 自定义百分比赋分表 [(开始比例, 结束比例, 常规赋分, 金山赋分)]
+        education_levels: 多场景模式的教育阶段列表（如 ['middle', 'primary']），传入时忽略 education_level，
+            每个指标只排名赋分一次，各教育阶段的结果由共用的得分计算
+    
+    Returns:
+        结果（return_profile 为True时为 (结果, 性能统计)）；多场景模式下每个科目的结果为 {教育阶段: DataFrame}
+    
+    Raises:
+        ValueError: 赋分方式不支持或自定义赋分表格式不正确
     """
     
     if input_file_path is None:
@@ -114,42 +212,98 @@ def calculate_scores_final_fix(input_file_path=None, subject=None, education_lev
     
     if subject is None:
         # 如果没有指定科目，处理所有科目
-        return process_all_subjects(input_file_path)
+        return process_all_subjects(input_file_path, workbook=workbook, education_level=education_level,
+                                    education_levels=education_levels,
+                                    parallel=parallel, max_workers=max_workers,
+                                    output_pattern=output_pattern, stage_callback=stage_callback,
+                                    return_profile=return_profile, profile_memory=profile_memory,
+                                    drop_unused_columns=drop_unused_columns, scoring_method=scoring_method,
+                                    scoring_table=scoring_table)
     else:
         # 处理指定科目
-        return process_single_subject(input_file_path, subject)
+        return process_single_subject(input_file_path, subject, education_level, workbook=workbook,
+                                      education_levels=education_levels, stage_callback=stage_callback, return_profile=return_profile,
+                                      profile_memory=profile_memory, drop_unused_columns=drop_unused_columns,
+                                      scoring_method=scoring_method, scoring_table=scoring_table,
+                                      **_output_options(output_pattern, subject))
 
-def process_single_subject(input_file_path, subject, education_level='middle'):
-    """处理单个科目"""
+def process_single_subject(input_file_path, subject, education_level='middle', workbook=None,
+                           subject_df=None, cleaned=False, output_file=None, write_output=True,
+                           stage_callback=None, return_profile=False, profile_memory=False,
+                           drop_unused_columns=False, scoring_method=DEFAULT_SCORING_METHOD, scoring_table=None,
+                           education_levels=None):
+    """处理单个科目
+    
+    Args:
+        workbook: 已解析的WorkbookSession，传入时直接使用其中的科目数据
+        subject_df: 已解析的科目数据（优先于workbook和文件读取）
+        cleaned: subject_df 是否已经过数据清洗
+        output_file: 结果文件路径，默认为 DEFAULT_OUTPUT_PATTERN
+        write_output: 是否写出结果文件（由调用方统一写出汇总工作簿时为False）
+        stage_callback: 阶段进度回调 callback(subject, stage, fraction, elapsed, detail)，见 StageProgress
+        return_profile: 是否同时返回各阶段的耗时、CPU时间和内存峰值统计（StageProfiler.to_dict()）
+        profile_memory: 性能统计是否包含内存峰值（tracemalloc 会使计算变慢，默认只统计耗时和CPU时间）
+        drop_unused_columns: 从文件读取时是否丢弃科目计算用不到的列，结果中不再附带这些列
+            （见 read_projected_sheets）
+        scoring_method: 赋分方式（见 scoring_engine.SCORING_METHODS）
+        scoring_table: 自定义百分比赋分表（scoring_method 为 'custom' 时使用）
+        education_levels: 多场景模式的教育阶段列表，传入时忽略 education_level：每个指标和差值只排名赋分一次，
+            各教育阶段按自己的指标和权重由共用的得分计算总分和综合得分（一次矩阵乘法），
+            结果文件中每个教育阶段一个工作表
+    
+    Returns:
+        结果DataFrame（多场景模式下为 {教育阶段: 结果DataFrame}），处理失败时为None；
+        return_profile 为True时为 (结果, 性能统计)
+    
+    Raises:
+        ValueError: 赋分方式不支持或自定义赋分表格式不正确（在读取数据之前检查）
+    """
+    validate_scoring_method(scoring_method, scoring_table)
+    profiler = StageProfiler(track_memory=profile_memory).start() if return_profile else None
+    try:
+        result = _process_single_subject(input_file_path, subject, education_level, education_levels,
+                                         workbook, subject_df, cleaned, output_file, write_output,
+                                         drop_unused_columns, scoring_method, scoring_table,
+                                         StageProgress(subject, stage_callback, profiler))
+    finally:
+        if profiler is not None:
+            profiler.stop()
+    if return_profile:
+        return result, profiler.to_dict()
+    return result
+
+def _process_single_subject(input_file_path, subject, education_level, education_levels,
+                            workbook, subject_df, cleaned, output_file, write_output,
+                            drop_unused_columns, scoring_method, scoring_table, stages):
+    """处理单个科目（参数见 process_single_subject，stages 为 StageProgress）"""
     print(f"开始处理科目: {subject}")
     
     try:
-        # 读取科目数据
-        df = pd.read_excel(input_file_path, sheet_name=subject)
+        # 读取科目数据（优先使用已解析的工作簿）
+        if subject_df is not None:
+            df = subject_df
+        elif workbook is not None:
+            df = workbook.get_sheet(subject)
+            cleaned = workbook.cleaned
+        elif drop_unused_columns:
+            df = read_projected_sheets(input_file_path, [subject])[subject]
+        else:
+            df = pd.read_excel(input_file_path, sheet_name=subject)
         print(f"成功读取 {subject} 数据，共 {len(df)} 行")
+        stages.report(STAGE_READ, f'{len(df)} 行')
         
-        # 数据清洗预处理
-        if DATA_CLEANER_AVAILABLE:
-            print("开始数据清洗...")
-            cleaner = DataCleaner()
-            df = cleaner.clean_dataframe(df)
-            print("数据清洗完成")
-        else:
-            # 原始处理方式（兼容性）
-            print("使用原始数据处理方式")
-            # 标准化列名
-            df.columns = [col.strip() if isinstance(col, str) else col for col in df.columns]
-            
-            # 重命名关键列
-            df = df.rename(columns={
-                '学校   代码': '学校代码',
-                '学校名称': '学校名称',
-                '班   别': '班别'
-            })
+        # 数据清洗预处理（工作簿加载时已清洗则跳过）
+        if not cleaned:
+            df = clean_subject_dataframe(df)
+        stages.report(STAGE_CLEAN)
         
         # 动态识别考试名称
         exam_names, exam_columns = extract_exam_names(df, subject)
         
+        # 一次性解析全部表头，建立考试指标列索引
+        resolver = ColumnResolver(df.columns)
+        stages.report(STAGE_DETECT_EXAMS, f'{len(exam_names)} 个考试')
+        
         if len(exam_names) == 0:
             print(f"警告: 未找到任何考试数据")
             return None
@@ -157,86 +311,28 @@ def process_single_subject(input_file_path, subject, education_level='middle'):
         # 获取总人数
         total_count = len(df)
         
-        # 定义教育阶段配置
-        education_configs = {
-            'middle': {  # 初中
-                'metrics': ['平均分', '优秀率', '优良率', '合格率', '低分率'],
-                'weights': [0.3, 0.2, 0.2, 0.2, 0.1]  # 平均分0.3
-            },
-            'primary': {  # 小学
-                'metrics': ['平均分', '优秀率', '合格率', '低分率'],  # 去掉优良率
-                'weights': [0.5, 0.2, 0.2, 0.1]  # 平均分0.5
-            }
-        }
-        
-        # 根据教育阶段选择配置
-        if education_level not in education_configs:
-            print(f"警告: 未知的教育阶段 '{education_level}'，使用初中配置")
-            education_level = 'middle'
-        
-        current_config = education_configs[education_level]
-        base_metrics = current_config['metrics']
-        current_weights = current_config['weights']
-        
-        print(f"使用教育阶段: {education_level}")
-        print(f"指标: {base_metrics}")
-        print(f"权重: {current_weights}")
-        
-        # 定义统一的百分比赋分规则
-        # 百分比区间：10%, 14%, 16%, 20%, 16%, 14%, 10%
-        # 对应赋分：8/8.9, 6/6.9, 5/5.9, 4/4.9, 3/3.9, 2/2.9, 0/0
-        percentage_intervals = [
-            (0, 0.10, 8, 8.9),      # 前10%
-            (0.10, 0.24, 6, 6.9),   # 10%-24%
-            (0.24, 0.40, 5, 5.9),   # 24%-40%
-            (0.40, 0.60, 4, 4.9),   # 40%-60%
-            (0.60, 0.76, 3, 3.9),   # 60%-76%
-            (0.76, 0.90, 2, 2.9),   # 76%-90%
-            (0.90, 1.00, 0, 0)      # 90%-100%
-        ]
+        # 根据教育阶段选择配置（多场景模式下每个教育阶段一个场景）
+        scenarios = []
+        for level in (education_levels or [education_level]):
+            if level not in EDUCATION_CONFIGS:
+                print(f"警告: 未知的教育阶段 '{level}'，使用初中配置")
+                level = 'middle'
+            if level not in scenarios:
+                scenarios.append(level)
         
-        def generate_scoring_intervals(total_count):
-            """根据总人数生成赋分区间，使用四舍五入法，确保无重叠"""
-            intervals = []
-            current_start = 1
-            
-            for start_pct, end_pct, regular_score, jinshan_score in percentage_intervals:
-                # 计算区间长度（人数）
-                interval_length = round((end_pct - start_pct) * total_count)
-                
-                # 确保区间至少包含1个人
-                if interval_length < 1:
-                    interval_length = 1
-                
-                # 计算结束排名
-                end_rank = current_start + interval_length - 1
-                
-                # 确保结束排名不超过总人数
-                if end_rank > total_count:
-                    end_rank = total_count
-                
-                intervals.append((current_start, end_rank, regular_score, jinshan_score))
-                
-                # 下一个区间的开始排名是当前区间结束排名+1
-                current_start = end_rank + 1
-                
-                # 如果已经覆盖了所有人数，退出循环
-                if current_start > total_count:
-                    break
-            
-            return intervals
-        
-        def assign_score(rank, is_jinshan):
-            """统一的赋分函数，基于修复后的区间，确保无重叠"""
-            # 使用生成的区间而不是百分比区间
-            for start, end, regular_score, jinshan_score in intervals:
-                if start <= rank <= end:
-                    return jinshan_score if is_jinshan else regular_score
-            
-            return 0
+        # 各场景指标的并集：每个指标只排名赋分一次，各场景共用
+        base_metrics = []
+        for level in scenarios:
+            print(f"使用教育阶段: {level}")
+            print(f"指标: {EDUCATION_CONFIGS[level]['metrics']}")
+            print(f"权重: {EDUCATION_CONFIGS[level]['weights']}")
+            base_metrics.extend(metric for metric in EDUCATION_CONFIGS[level]['metrics'] if metric not in base_metrics)
+        # 第一个考试和全部差值各一次批量排名，每批完成时回报一次进度
+        stages.rank_steps = 2 if len(exam_names) > 1 else 1
         
-        # 生成当前总人数对应的区间（用于调试和兼容性）
-        intervals = generate_scoring_intervals(total_count)
+        # 当前总人数对应的排名→赋分查找表（按赋分方式编译一次并缓存，各指标共用）
+        score_table = get_score_table(total_count, scoring_method, scoring_table)
+        print(f"赋分方式: {scoring_method}")
         
         # 根据科目确定科任列名
         if subject == '语文':
@@ -262,316 +358,174 @@ def process_single_subject(input_file_path, subject, education_level='middle'):
         else:
             teacher_col = f'{subject}科任'
         
-        # 创建新的列列表
-        new_cols = ['学校代码', '学校名称', '班别', teacher_col]
+        # 定点分数：得分、总分和综合得分以百分之一分为单位的整数计算和排名，写回结果时才换算为小数
+        jinshan_mask = (df['学校名称'] == JINSHAN_SCHOOL).to_numpy()
+        # 低分率从低到高排名（差值负值表示进步）并排除金山中学：金山中学排名为空值，得分为0分
+        low_rate = np.array(['低分率' in metric_name for metric_name in base_metrics])
+        
+        # 所有考试的指标列叠成 (考试, 指标, 班级) 数组
+        stacked = np.full((len(exam_names), len(base_metrics), total_count), np.nan)
+        exam_cols = {}
+        for i, exam in enumerate(exam_names):
+            for m, metric_name in enumerate(base_metrics):
+                # 通过预先建立的列名索引查找（支持下划线和空格两种格式，后缀序号为i+1）
+                col_name = resolver.resolve(exam, subject, metric_name, i + 1)
+                if col_name is not None:
+                    exam_cols[i, m] = col_name
+                    stacked[i, m] = df[col_name].to_numpy(dtype=float)
         
-        # 存储每个考试的总分列名
-        total_score_cols = []
+        # 排名和定点得分：{(考试序号, 指标序号): (排名, 得分)}，第一个考试为指标本身，后续考试为与前一次考试的差值
+        ranked = {}
         
-        # 处理第一个考试（通常是中考）
+        # 处理第一个考试（通常是中考）：全部指标一次排名赋分（method='min'，与综合排名一致）
         first_exam = exam_names[0]
         print(f"\n处理第一个考试: {first_exam}")
+        first_metrics = [m for m in range(len(base_metrics))
+                         if (0, m) in exam_cols and not np.isnan(stacked[0, m]).all()]
+        if first_metrics:
+            first_ranks, first_units = batch_rank_and_score(
+                stacked[0, first_metrics], low_rate[first_metrics], low_rate[first_metrics],
+                jinshan_mask, score_table, units=True
+            )
+            ranked.update({(0, m): (first_ranks[k], first_units[k]) for k, m in enumerate(first_metrics)})
+        stages.rank_step(f'{first_exam} {len(first_metrics)} 个指标')
         
-        # 第一个考试的处理逻辑
-        exam1_scores = []
-        # 使用当前教育阶段的指标定义
-        
-        for metric_name in base_metrics:
-            # 尝试不同的列名格式（支持下划线和空格两种格式）
-            possible_col_names = [
-                f'{first_exam}_{subject}_{metric_name}_p1',      # 下划线格式
-                f'{first_exam}_{subject}_{metric_name}_y1', 
-                f'{first_exam}_{subject}_{metric_name}_l1',
-                f'{first_exam}_{subject}_{metric_name}_h1',
-                f'{first_exam}_{subject}_{metric_name}_d1',
-                f'{first_exam}_{subject}_{metric_name}',        # 无后缀格式
-                # 兼容性：同时支持空格格式
-                f'{first_exam}   {subject}   {metric_name}   p1',
-                f'{first_exam}   {subject}   {metric_name}   y1', 
-                f'{first_exam}   {subject}   {metric_name}   l1',
-                f'{first_exam}   {subject}   {metric_name}   h1',
-                f'{first_exam}   {subject}   {metric_name}   d1',
-                f'{first_exam}   {subject}   {metric_name}'  # 无后缀格式
-            ]
-            
-            col_name = None
-            for possible_name in possible_col_names:
-                if possible_name in df.columns:
-                    col_name = possible_name
-                    break
+        # 处理后续考试（计算差值）：一次相减得到全部相邻考试的差值，一次批量排名赋分
+        if len(exam_names) > 1:
+            # diffs[i-1, m] 为 前一个考试 - 当前考试
+            diffs = stacked[:-1] - stacked[1:]
+            for i in range(1, len(exam_names)):
+                print(f"\n处理考试: {exam_names[i]} (与 {exam_names[i-1]} 比较)")
+                for m, metric_name in enumerate(base_metrics):
+                    if (i, m) in exam_cols:
+                        print(f"  找到当前考试列: {exam_cols[i, m]}")
+                        if (i - 1, m) in exam_cols:
+                            print(f"  找到前一个考试列: {exam_cols[i - 1, m]}")
+                        else:
+                            print(f"  警告: 未找到前一个考试列: {metric_name}，跳过差值计算")
             
-            if col_name is not None:
-                new_cols.append(col_name)
-                
-                # 计算排名和得分
-                col_data = df[col_name].dropna()
-                if len(col_data) > 0:
-                    # 确定排序方向
-                    if '低分率' in metric_name:
-                        ascending = True  # 低分率从低到高
-                    else:
-                        ascending = False  # 其他从高到低
-                    
-                    # 对于低分率，排除金山中学
-                    if '低分率' in metric_name:
-                        # 排除金山中学，只对其他学校进行排名
-                        non_jinshan_df = df[df['学校名称'] != '金山中学'].copy()
-                        sorted_df = non_jinshan_df.sort_values(col_name, ascending=ascending)
-                        sorted_df = sorted_df.reset_index(drop=True)
-                        
-                        # 计算排名和得分（只对非金山中学）
-                        rank_col = f'{first_exam}_{metric_name}_排名'
-                        score_col = f'{first_exam}_{metric_name}_得分'
-                        
-                        # 使用pandas.rank(method='min')计算排名，保持与综合排名一致
-                        sorted_df[rank_col] = sorted_df[col_name].rank(ascending=ascending, method='min')
-                        
-                        for idx, row in sorted_df.iterrows():
-                            rank = row[rank_col]
-                            score = assign_score(rank, False)  # 非金山中学使用常规赋分
-                            
-                            # 找到对应的原始行索引
-                            original_idx = df[(df['学校代码'] == row['学校代码']) & (df['班别'] == row['班别'])].index[0]
-                            df.loc[original_idx, rank_col] = rank
-                            df.loc[original_idx, score_col] = score
-                        
-                        # 金山中学的低分率排名设为空值，得分设为0分（用于总分计算）
-                        jinshan_mask = df['学校名称'] == '金山中学'
-                        df.loc[jinshan_mask, rank_col] = None
-                        df.loc[jinshan_mask, score_col] = 0.0
+            # 需要排名的差值：前后两次考试都有该指标列，且差值不全为空值
+            ranked_pairs = [(i, m) for i in range(1, len(exam_names)) for m in range(len(base_metrics))
+                            if (i, m) in exam_cols and (i - 1, m) in exam_cols
+                            and not np.isnan(diffs[i - 1, m]).all()]
+            if ranked_pairs:
+                pair_low_rate = np.array([low_rate[m] for _, m in ranked_pairs])
+                diff_ranks, diff_units = batch_rank_and_score(
+                    np.stack([diffs[i - 1, m] for i, m in ranked_pairs]), pair_low_rate, pair_low_rate,
+                    jinshan_mask, score_table, units=True
+                )
+                ranked.update({pair: (diff_ranks[k], diff_units[k]) for k, pair in enumerate(ranked_pairs)})
+            stages.rank_step(f'{len(exam_names) - 1} 次考试差值 {len(ranked_pairs)} 个指标')
+        
+        # 各场景按自己的指标组织结果列：全部指标都有得分的考试计算总分
+        score_units = {}
+        layouts = {}
+        total_requests = []  # (教育阶段, 总分列, 得分列, 权重)
+        for level in scenarios:
+            metrics = EDUCATION_CONFIGS[level]['metrics']
+            weights = EDUCATION_CONFIGS[level]['weights']
+            new_cols = ['学校代码', '学校名称', '班别', teacher_col]
+            new_columns = {}
+            for i, exam in enumerate(exam_names):
+                exam_scores = []
+                for metric_name in metrics:
+                    m = base_metrics.index(metric_name)
+                    col_name = exam_cols.get((i, m))
+                    if col_name is None:
+                        continue
+                    new_cols.append(col_name)
+                    if i == 0:
+                        prefix = f'{exam}_{metric_name}_'
+                    elif (i - 1, m) in exam_cols:
+                        diff_col = f'{exam_names[i-1]}-{exam}_{metric_name}_差值'
+                        new_columns[diff_col] = diffs[i - 1, m]
+                        prefix = diff_col
                     else:
-                        # 其他指标正常计算（包括金山中学）
-                        sorted_df = df.sort_values(col_name, ascending=ascending)
-                        sorted_df = sorted_df.reset_index(drop=True)
-                        
-                        # 计算排名和得分
-                        rank_col = f'{first_exam}_{metric_name}_排名'
-                        score_col = f'{first_exam}_{metric_name}_得分'
-                        
-                        # 使用pandas.rank(method='min')计算排名，保持与综合排名一致
-                        sorted_df[rank_col] = sorted_df[col_name].rank(ascending=ascending, method='min')
-                        
-                        for idx, row in sorted_df.iterrows():
-                            rank = row[rank_col]
-                            is_jinshan = row['学校名称'] == '金山中学'
-                            score = assign_score(rank, is_jinshan)
-                            
-                            # 找到对应的原始行索引
-                            original_idx = df[(df['学校代码'] == row['学校代码']) & (df['班别'] == row['班别'])].index[0]
-                            df.loc[original_idx, rank_col] = rank
-                            df.loc[original_idx, score_col] = score
-                    
-                    # 添加排名和得分列
-                    new_cols.append(rank_col)
-                    new_cols.append(score_col)
-                    
-                    # 收集得分用于计算总分
-                    exam1_scores.append(score_col)
+                        continue
+                    if (i, m) in ranked:
+                        ranks, units = ranked[i, m]
+                        rank_col = f'{prefix}排名'
+                        score_col = f'{prefix}得分'
+                        new_columns[rank_col] = ranks
+                        new_columns[score_col] = from_score_units(units)
+                        score_units[score_col] = units
+                        # 添加（差值、）排名、得分列
+                        if i > 0:
+                            new_cols.append(diff_col)
+                        new_cols.append(rank_col)
+                        new_cols.append(score_col)
+                        exam_scores.append(score_col)
+                if len(exam_scores) == len(weights):
+                    total_score_col = f'{exam}_{subject}总分'
+                    new_cols.append(total_score_col)
+                    total_requests.append((level, total_score_col, exam_scores, weights))
+            layouts[level] = (new_cols, new_columns)
         
-        # 计算第一个考试总分
-        if len(exam1_scores) == len(current_weights):
-            total_score_col = f'{first_exam}_{subject}总分'
-            # 使用当前教育阶段的权重计算总分
-            total_score = 0
-            for i, score_col in enumerate(exam1_scores):
-                total_score += df[score_col] * current_weights[i]
-            # 统一精度到3位小数，避免浮点数精度问题导致的排名不一致
-            df[total_score_col] = total_score.round(2)
-            new_cols.append(total_score_col)
-            total_score_cols.append(total_score_col)
+        # 全部场景、全部考试的总分：(班级, 得分列) 定点得分矩阵一次乘以权重矩阵（每个总分一组权重），
+        # 再一次乘以各场景的综合得分权重；整数加权后四舍五入到0.01分
+        if total_requests:
+            score_cols = list(dict.fromkeys(col for _, _, cols, _ in total_requests for col in cols))
+            position = {col: k for k, col in enumerate(score_cols)}
+            total_vectors = []
+            for _, _, cols, weights in total_requests:
+                vector = [0] * len(score_cols)
+                for col, weight in zip(cols, weight_fractions(weights)):
+                    vector[position[col]] = weight
+                total_vectors.append(vector)
+            total_units = weighted_totals_units(np.column_stack([score_units[col] for col in score_cols]),
+                                                total_vectors)
+            # 综合得分支持任意考试次数（按该场景能计算总分的考试次数确定权重）
+            comprehensive_vectors = []
+            for level in scenarios:
+                positions = [k for k, request in enumerate(total_requests) if request[0] == level]
+                vector = [0] * len(total_requests)
+                for k, weight in zip(positions, comprehensive_weights(len(positions))):
+                    vector[k] = weight
+                comprehensive_vectors.append(vector)
+            comprehensive_units = weighted_totals_units(total_units, comprehensive_vectors)
+        else:
+            comprehensive_units = np.zeros((total_count, len(scenarios)), dtype=np.int64)
         
-        # 处理后续考试（计算差值）
-        for i in range(1, len(exam_names)):
-            current_exam = exam_names[i]
-            previous_exam = exam_names[i-1]
+        results = {}
+        for j, level in enumerate(scenarios):
+            new_cols, new_columns = layouts[level]
+            level_totals = [k for k, request in enumerate(total_requests) if request[0] == level]
+            for k in level_totals:
+                new_columns[total_requests[k][1]] = from_score_units(total_units[:, k])
+            if not level_totals:
+                print(f"警告: {subject} 没有生成任何总分列，无法计算综合得分")
+            new_columns[f'{subject}综合得分'] = from_score_units(comprehensive_units[:, j])
+            # 计算综合排名（按整数定点得分排名，同分一定并列）
+            new_columns[f'{subject}综合排名'] = batch_min_rank(comprehensive_units[np.newaxis, :, j], False)[0]
             
-            print(f"\n处理考试: {current_exam} (与 {previous_exam} 比较)")
+            # 添加综合列
+            new_cols.append(f'{subject}综合得分')
+            new_cols.append(f'{subject}综合排名')
             
-            exam_scores = []
+            # 一次性写回全部新增列（已存在的同名列被替换）
+            scenario_df = pd.concat([df.drop(columns=[col for col in new_columns if col in df.columns]),
+                                     pd.DataFrame(new_columns, index=df.index)], axis=1)
             
-            for metric_name in base_metrics:
-                # 尝试不同的列名格式（支持下划线和空格两种格式）
-                possible_col_names = [
-                    f'{current_exam}_{subject}_{metric_name}_p{i+1}',      # 下划线格式
-                    f'{current_exam}_{subject}_{metric_name}_y{i+1}', 
-                    f'{current_exam}_{subject}_{metric_name}_l{i+1}',
-                    f'{current_exam}_{subject}_{metric_name}_h{i+1}',
-                    f'{current_exam}_{subject}_{metric_name}_d{i+1}',
-                    f'{current_exam}_{subject}_{metric_name}',             # 无后缀格式
-                    # 兼容性：同时支持空格格式
-                    f'{current_exam}   {subject}   {metric_name}   p{i+1}',
-                    f'{current_exam}   {subject}   {metric_name}   y{i+1}', 
-                    f'{current_exam}   {subject}   {metric_name}   l{i+1}',
-                    f'{current_exam}   {subject}   {metric_name}   h{i+1}',
-                    f'{current_exam}   {subject}   {metric_name}   d{i+1}',
-                    f'{current_exam}   {subject}   {metric_name}'  # 无后缀格式
-                ]
-                
-                col_name = None
-                for possible_name in possible_col_names:
-                    if possible_name in df.columns:
-                        col_name = possible_name
-                        break
-                
-                if col_name is not None:
-                    new_cols.append(col_name)
-                    print(f"  找到当前考试列: {col_name}")
-                    
-                    # 获取对应的前一个考试列名
-                    # 尝试不同的前一个考试列名格式（支持下划线和空格两种格式）
-                    prev_exam_possible_names = [
-                        f'{previous_exam}_{subject}_{metric_name}_p{i}',      # 下划线格式
-                        f'{previous_exam}_{subject}_{metric_name}_y{i}', 
-                        f'{previous_exam}_{subject}_{metric_name}_l{i}',
-                        f'{previous_exam}_{subject}_{metric_name}_h{i}',
-                        f'{previous_exam}_{subject}_{metric_name}_d{i}',
-                        f'{previous_exam}_{subject}_{metric_name}',             # 无后缀格式
-                        # 兼容性：同时支持空格格式
-                        f'{previous_exam}   {subject}   {metric_name}   p{i}',
-                        f'{previous_exam}   {subject}   {metric_name}   y{i}', 
-                        f'{previous_exam}   {subject}   {metric_name}   l{i}',
-                        f'{previous_exam}   {subject}   {metric_name}   h{i}',
-                        f'{previous_exam}   {subject}   {metric_name}   d{i}',
-                        f'{previous_exam}   {subject}   {metric_name}'  # 无后缀格式
-                    ]
-                    
-                    prev_exam_col = None
-                    for possible_name in prev_exam_possible_names:
-                        if possible_name in df.columns:
-                            prev_exam_col = possible_name
-                            break
-                    
-                    if prev_exam_col is not None:
-                        print(f"  找到前一个考试列: {prev_exam_col}")
-                        # 计算差值
-                        diff_col = f'{previous_exam}-{current_exam}_{metric_name}_差值'
-                        df[diff_col] = df[prev_exam_col] - df[col_name]
-                        
-                        # 计算差值排名和得分
-                        diff_data = df[diff_col].dropna()
-                        if len(diff_data) > 0:
-                            # 确定排序方向
-                            if '低分率' in metric_name:
-                                ascending = True  # 低分率差值负值表示进步
-                            else:
-                                ascending = False  # 其他差值正值表示进步
-                            
-                            # 对于低分率，排除金山中学
-                            if '低分率' in metric_name:
-                                # 排除金山中学，只对其他学校进行排名
-                                non_jinshan_df = df[df['学校名称'] != '金山中学'].copy()
-                                sorted_df = non_jinshan_df.sort_values(diff_col, ascending=ascending)
-                                sorted_df = sorted_df.reset_index(drop=True)
-                                
-                                # 计算排名和得分（只对非金山中学）
-                                diff_rank_col = f'{previous_exam}-{current_exam}_{metric_name}_差值排名'
-                                diff_score_col = f'{previous_exam}-{current_exam}_{metric_name}_差值得分'
-                                
-                                # 使用pandas.rank(method='min')计算排名，保持与综合排名一致
-                                sorted_df[diff_rank_col] = sorted_df[diff_col].rank(ascending=ascending, method='min')
-                                
-                                for idx, row in sorted_df.iterrows():
-                                    rank = row[diff_rank_col]
-                                    score = assign_score(rank, False)  # 非金山中学使用常规赋分
-                                    
-                                    # 找到对应的原始行索引
-                                    original_idx = df[(df['学校代码'] == row['学校代码']) & (df['班别'] == row['班别'])].index[0]
-                                    df.loc[original_idx, diff_rank_col] = rank
-                                    df.loc[original_idx, diff_score_col] = score
-                                
-                                # 金山中学的低分率排名设为空值，得分设为0分（用于总分计算）
-                                jinshan_mask = df['学校名称'] == '金山中学'
-                                df.loc[jinshan_mask, diff_rank_col] = None
-                                df.loc[jinshan_mask, diff_score_col] = 0.0
-                            else:
-                                # 其他指标正常计算（包括金山中学）
-                                sorted_df = df.sort_values(diff_col, ascending=ascending)
-                                sorted_df = sorted_df.reset_index(drop=True)
-                                
-                                # 计算排名和得分
-                                diff_rank_col = f'{previous_exam}-{current_exam}_{metric_name}_差值排名'
-                                diff_score_col = f'{previous_exam}-{current_exam}_{metric_name}_差值得分'
-                                
-                                # 使用pandas.rank(method='min')计算排名，保持与综合排名一致
-                                sorted_df[diff_rank_col] = sorted_df[diff_col].rank(ascending=ascending, method='min')
-                                
-                                for idx, row in sorted_df.iterrows():
-                                    rank = row[diff_rank_col]
-                                    is_jinshan = row['学校名称'] == '金山中学'
-                                    score = assign_score(rank, is_jinshan)
-                                    
-                                    # 找到对应的原始行索引
-                                    original_idx = df[(df['学校代码'] == row['学校代码']) & (df['班别'] == row['班别'])].index[0]
-                                    df.loc[original_idx, diff_rank_col] = rank
-                                    df.loc[original_idx, diff_score_col] = score
-                            
-                            # 添加差值、差值排名、差值得分列
-                            new_cols.append(diff_col)
-                            new_cols.append(diff_rank_col)
-                            new_cols.append(diff_score_col)
-                            
-                            # 收集差值得分用于计算总分
-                            exam_scores.append(diff_score_col)
-                    else:
-                        print(f"  警告: 未找到前一个考试列: {metric_name}，跳过差值计算")
+            # 添加剩余的列（如果有的话）
+            remaining_cols = [col for col in scenario_df.columns if col not in new_cols]
             
-            # 计算当前考试总分
-            if len(exam_scores) == len(current_weights):
-                total_score_col = f'{current_exam}_{subject}总分'
-                # 使用当前教育阶段的权重计算总分
-                total_score = 0
-                for i, score_col in enumerate(exam_scores):
-                    total_score += df[score_col] * current_weights[i]
-                # 统一精度到3位小数，避免浮点数精度问题导致的排名不一致
-                df[total_score_col] = total_score.round(2)
-                new_cols.append(total_score_col)
-                total_score_cols.append(total_score_col)
-        
-        # 计算综合得分
-        if len(total_score_cols) == 4:
-            df[f'{subject}综合得分'] = (
-                df[total_score_cols[0]] * 0.4 +  # 第一个考试总分
-                df[total_score_cols[1]] * 0.2 +  # 第二个考试总分
-                df[total_score_cols[2]] * 0.2 +  # 第三个考试总分
-                df[total_score_cols[3]] * 0.2    # 第四个考试总分
-            ).round(2)  # 统一精度到3位小数
-        elif len(total_score_cols) == 3:
-            df[f'{subject}综合得分'] = (
-                df[total_score_cols[0]] * 0.4 +  # 第一个考试总分
-                df[total_score_cols[1]] * 0.3 +  # 第二个考试总分
-                df[total_score_cols[2]] * 0.3    # 第三个考试总分
-            ).round(2)  # 统一精度到3位小数
-        elif len(total_score_cols) == 2:
-            df[f'{subject}综合得分'] = (
-                df[total_score_cols[0]] * 0.4 +  # 第一个考试总分
-                df[total_score_cols[1]] * 0.6    # 第二个考试总分
-            ).round(2)  # 统一精度到3位小数
-        elif len(total_score_cols) == 1:
-            df[f'{subject}综合得分'] = df[total_score_cols[0]].round(2)  # 统一精度到3位小数
-        else:
-            print(f"警告: {subject} 没有生成任何总分列，无法计算综合得分")
-            df[f'{subject}综合得分'] = 0.0
-        
-        # 计算综合排名
-        df[f'{subject}综合排名'] = df[f'{subject}综合得分'].rank(ascending=False, method='min')
-        
-        # 添加综合列
-        new_cols.append(f'{subject}综合得分')
-        new_cols.append(f'{subject}综合排名')
-        
-        # 添加剩余的列（如果有的话）
-        remaining_cols = [col for col in df.columns if col not in new_cols]
-        new_cols.extend(remaining_cols)
+            # 创建最终的DataFrame
+            results[level] = scenario_df[new_cols + remaining_cols].copy()
+        stages.report(STAGE_COMPREHENSIVE)
         
-        # 创建最终的DataFrame
-        final_df = df[new_cols].copy()
-        
-        # 保存结果
-        output_file = f'{subject}排名赋分结果_动态识别版.xlsx'
-        final_df.to_excel(output_file, index=False)
-        print(f"结果已保存到: {output_file}")
+        # 保存结果（流式写出）：多场景模式下每个教育阶段一个工作表
+        if write_output:
+            if output_file is None:
+                output_file = DEFAULT_OUTPUT_PATTERN.format(subject=subject)
+            if education_levels is None:
+                write_result_workbook(output_file, results[scenarios[0]])
+            else:
+                write_result_workbook(output_file, {EDUCATION_CONFIGS[level]['label']: result
+                                                    for level, result in results.items()})
+            print(f"结果已保存到: {output_file}")
+        stages.report(STAGE_WRITE, os.path.basename(output_file) if write_output else '')
         
-        return final_df
+        return results[scenarios[0]] if education_levels is None else results
         
     except Exception as e:
         print(f"处理科目 {subject} 时出错: {e}")
@@ -579,44 +533,150 @@ def process_single_subject(input_file_path, subject, education_level='middle'):
         traceback.print_exc()
         return None
 
-def process_all_subjects(input_file_path):
-    """处理所有科目"""
+def _output_options(output_pattern, subject):
+    """由结果文件路径模板得到 process_single_subject 的输出参数"""
+    if output_pattern is None:
+        return {'write_output': False}
+    return {'output_file': output_pattern.format(subject=subject)}
+
+def _process_subject_worker(input_file_path, subject, subject_df, cleaned, output_options,
+                            profile_options, scoring_options):
+    """进程池工作函数：在子进程中处理单个科目（数据由主进程解析后传入）"""
+    return process_single_subject(input_file_path, subject, subject_df=subject_df, cleaned=cleaned,
+                                  **output_options, **profile_options, **scoring_options)
+
+def _first_result(result):
+    """单个科目的结果DataFrame（多场景模式下取第一个教育阶段的结果）"""
+    if isinstance(result, dict):
+        return next(iter(result.values()))
+    return result
+
+def _report_subject_result(subject, result):
+    """输出单个科目的处理结果摘要"""
+    if result is None:
+        print(f"❌ {subject} 处理失败！")
+        return
+    
+    if isinstance(result, dict):
+        print(f"   教育阶段: {list(result)}")
+    result = _first_result(result)
+    print(f"✅ {subject} 处理成功！")
+    print(f"   结果列数: {len(result.columns)}")
+    
+    # 检查差值列
+    diff_cols = [col for col in result.columns if '差值' in col]
+    print(f"   差值列数量: {len(diff_cols)}")
+    
+    # 检查是否所有指标都有差值列
+    # 使用默认的初中教育阶段指标定义
+    default_metrics = ['平均分', '优秀率', '优良率', '合格率', '低分率']
+    for metric in default_metrics:
+        diff_cols_for_metric = [col for col in diff_cols if metric in col]
+        print(f"   {metric}: {len(diff_cols_for_metric)} 个差值列")
+
+def process_all_subjects(input_file_path, workbook=None, parallel=False, max_workers=None,
+                         progress_callback=None, output_pattern=DEFAULT_OUTPUT_PATTERN,
+                         stage_callback=None, return_profile=False, profile_memory=False,
+                         drop_unused_columns=False, scoring_method=DEFAULT_SCORING_METHOD, scoring_table=None,
+                         education_level='middle', education_levels=None):
+    """处理所有科目（整个工作簿只解析一次）
+    
+    Args:
+        workbook: 已打开的WorkbookSession
+        parallel: 是否使用进程池并行处理各科目（默认顺序处理）
+        max_workers: 并行进程数，默认取科目数与CPU核数的较小值
+        progress_callback: 每个科目完成时调用 progress_callback(subject, completed, total, success)
+        output_pattern: 结果文件路径模板，{subject} 替换为科目名称；为None时不写出单科结果文件
+        stage_callback: 各科目的阶段进度回调，见 StageProgress（并行模式下各科目在子进程中处理，
+            不回报阶段进度，只调用 progress_callback）
+        return_profile: 是否同时返回性能统计：读取工作簿和科目计算阶段，以及 'subjects' 中每个科目的阶段统计
+        profile_memory: 性能统计是否包含内存峰值（并行模式下为各子进程内的峰值）
+        drop_unused_columns: 未传入workbook时，是否丢弃科目计算用不到的列（见 read_projected_sheets）
+        scoring_method: 赋分方式（见 scoring_engine.SCORING_METHODS），所有科目相同
+        scoring_table: 自定义百分比赋分表（scoring_method 为 'custom' 时使用）
+        education_level: 教育阶段，'primary'为小学，'middle'为初中（默认），所有科目相同
+        education_levels: 多场景模式的教育阶段列表（见 process_single_subject）
+    
+    Returns:
+        {科目: 结果DataFrame}（多场景模式下为 {科目: {教育阶段: 结果DataFrame}}），按工作表顺序排列；
+        return_profile 为True时为 (结果, 性能统计)
+    
+    Raises:
+        ValueError: 赋分方式不支持或自定义赋分表格式不正确（在读取工作簿之前检查）
+    """
+    validate_scoring_method(scoring_method, scoring_table)
+    profiler = StageProfiler(track_memory=profile_memory).start() if return_profile else None
+    profile_options = {'return_profile': return_profile, 'profile_memory': profile_memory}
+    scoring_options = {'scoring_method': scoring_method, 'scoring_table': scoring_table,
+                       'education_level': education_level, 'education_levels': education_levels}
+    subject_profiles = {}
+    
     # 获取Excel文件中的所有科目
-    xl_file = pd.ExcelFile(input_file_path)
-    subjects = [sheet for sheet in xl_file.sheet_names if sheet != 'sheet1']
+    if workbook is None:
+        workbook = WorkbookSession(input_file_path, drop_unused_columns=drop_unused_columns)
+        if profiler is not None:
+            profiler.mark(STAGE_LOAD_WORKBOOK)
+    subjects = workbook.subjects
     
     print(f"发现科目: {subjects}")
-    print("使用统一百分比赋分规则")
+    print(f"赋分方式: {scoring_method}")
     print("=" * 50)
     
-    all_results = {}
-    
-    # 处理每个科目
-    for subject in subjects:
-        print(f"\n开始处理科目: {subject}")
-        try:
-            result = process_single_subject(input_file_path, subject)
-            if result is not None:
-                all_results[subject] = result
-                print(f"✅ {subject} 处理成功！")
-                print(f"   结果列数: {len(result.columns)}")
-                
-                # 检查差值列
-                diff_cols = [col for col in result.columns if '差值' in col]
-                print(f"   差值列数量: {len(diff_cols)}")
-                
-                # 检查是否所有指标都有差值列
-                # 使用默认的初中教育阶段指标定义
-                default_metrics = ['平均分', '优秀率', '优良率', '合格率', '低分率']
-                for metric in default_metrics:
-                    diff_cols_for_metric = [col for col in diff_cols if metric in col]
-                    print(f"   {metric}: {len(diff_cols_for_metric)} 个差值列")
-            else:
-                print(f"❌ {subject} 处理失败！")
-        except Exception as e:
-            print(f"❌ {subject} 处理出错: {e}")
-            import traceback
-            traceback.print_exc()
+    results = {}
+    total = len(subjects)
+    
+    def on_subject_done(subject, result):
+        if return_profile:
+            result, subject_profiles[subject] = result
+        results[subject] = result
+        _report_subject_result(subject, result)
+        if progress_callback is not None:
+            progress_callback(subject, len(results), total, result is not None)
+    
+    if parallel and total > 1:
+        if max_workers is None:
+            max_workers = min(total, os.cpu_count() or 1)
+        print(f"并行处理模式，进程数: {max_workers}")
+        
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 mp_context=multiprocessing.get_context(PROCESS_START_METHOD)) as executor:
+            futures = {
+                executor.submit(_process_subject_worker, input_file_path, subject,
+                                workbook.get_sheet(subject), workbook.cleaned,
+                                _output_options(output_pattern, subject), profile_options,
+                                scoring_options): subject
+                for subject in subjects
+            }
+            for future in as_completed(futures):
+                subject = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"❌ {subject} 处理出错: {e}")
+                    result = (None, None) if return_profile else None
+                on_subject_done(subject, result)
+    else:
+        # 处理每个科目
+        for subject in subjects:
+            print(f"\n开始处理科目: {subject}")
+            try:
+                result = process_single_subject(input_file_path, subject, workbook=workbook,
+                                                stage_callback=stage_callback, **profile_options,
+                                                **scoring_options,
+                                                **_output_options(output_pattern, subject))
+            except Exception as e:
+                print(f"❌ {subject} 处理出错: {e}")
+                import traceback
+                traceback.print_exc()
+                result = (None, None) if return_profile else None
+            on_subject_done(subject, result)
+    
+    # 按科目顺序合并结果，保证输出顺序与并行完成顺序无关
+    all_results = {subject: results[subject] for subject in subjects
+                   if results.get(subject) is not None}
+    if profiler is not None:
+        profiler.mark(STAGE_SUBJECTS)
+        profiler.stop()
     
     print("\n" + "=" * 50)
     print("所有科目处理完成！")
@@ -628,19 +688,30 @@ def process_all_subjects(input_file_path):
     if len(all_results) > 0:
         print(f"\n第一个成功科目的详细信息:")
         first_subject = list(all_results.keys())[0]
-        first_result = all_results[first_subject]
+        first_result = _first_result(all_results[first_subject])
         print(f"科目: {first_subject}")
         print(f"列数: {len(first_result.columns)}")
         print("前30列名:")
         for i, col in enumerate(first_result.columns[:30]):
             print(f"{i:2d}: {col}")
     
+    if return_profile:
+        profile = profiler.to_dict()
+        profile['subjects'] = {subject: subject_profiles[subject] for subject in subjects
+                               if subject_profiles.get(subject) is not None}
+        return all_results, profile
     return all_results
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
     # 直接运行命令行模式
     print("教师排名赋分计算器启动...")
-    result = calculate_scores_final_fix()
+    # 与Web服务相同：PROFILE_MEMORY=1 时同时统计内存峰值（tracemalloc 会使计算变慢）
+    profile_memory = os.environ.get('PROFILE_MEMORY', '0') == '1'
+    result, profile = calculate_scores_final_fix(return_profile=True, profile_memory=profile_memory)
+    print("\n各阶段耗时与内存峰值:" if profile_memory else "\n各阶段耗时:")
+    print(format_profile(profile, STAGE_LABELS))
     if result is not None:
         print("\n计算成功！")
         print(f"结果列数: {len(result)}")
@@ -0,0 +1,164 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# 考试关键词（列表顺序即匹配优先级）
+EXAM_KEYWORDS = [
+    '中考', '二模', '九年上', '八年下', '八年上', '七年下', '七年上', 
+    '六年下', '六年上', '五年下', '五年上', '四年下', '四年上', 
+    '三年下', '三年上','七年入' 
+]
+
+# 指标的同义词映射，提高容错性
+METRIC_SYNONYMS = {
+    '平均分': ['平均分', '平均', '均分', 'mean', '平均分'],
+    '优秀率': ['优秀率', '优秀', '优秀率', 'excellent', '优秀率'],
+    '优良率': ['优良率', '优良', '良好率', 'good', '优良率'],
+    '合格率': ['合格率', '合格', '及格率', 'pass', '合格率'],
+    '低分率': ['低分率', '低分', '不及格率', 'fail', '低分率']
+}
+
+# 各指标列名的标准后缀字母
+METRIC_SUFFIX_LETTERS = {
+    '平均分': 'p',
+    '优秀率': 'y',
+    '优良率': 'l',
+    '合格率': 'h',
+    '低分率': 'd',
+}
+
+# 查找列名时后缀字母的优先顺序（与原列名探测顺序一致）
+SUFFIX_LETTER_ORDER = ['p', 'y', 'l', 'h', 'd']
+
+# 结构化列名：考试名、科目、指标、后缀字母、后缀序号（无后缀时后两项为None）
+ColumnKey = namedtuple('ColumnKey', ['exam', 'subject', 'metric', 'suffix_letter', 'suffix_index'])
+
+# 考试列名格式：考试名 分隔 科目 分隔 指标 [分隔] [后缀字母+序号]
+# 分隔符为下划线或任意空白（兼容“中考   语文   合格率  h1”“二模   语文   合格率h2”等写法）
+_COLUMN_PATTERN = re.compile(
+    r'^(?P<exam>[^_\s]+)[_\s]+(?P<subject>[^_\s]+)[_\s]+(?P<metric>[^_\s]+?)'
+    r'(?:[_\s]*(?P<letter>[pylhd])(?P<index>\d+))?$'
+)
+
+
+@lru_cache(maxsize=4096)
+def parse_column_name(column_name):
+    """将考试列名解析为 ColumnKey，无法解析时返回 None（结果按列名缓存）"""
+    if not isinstance(column_name, str):
+        return None
+    match = _COLUMN_PATTERN.match(column_name.strip())
+    if match is None:
+        return None
+    index = match.group('index')
+    return ColumnKey(
+        match.group('exam'),
+        match.group('subject'),
+        match.group('metric'),
+        match.group('letter'),
+        int(index) if index is not None else None,
+    )
+
+
+# 表头分类用的合并正则：所有考试关键词一个，所有指标同义词一个
+_EXAM_KEYWORD_PATTERN = re.compile('|'.join(re.escape(keyword) for keyword in EXAM_KEYWORDS))
+_EXAM_KEYWORD_PRIORITY = {keyword: i for i, keyword in enumerate(EXAM_KEYWORDS)}
+_METRIC_SYNONYM_PATTERN = re.compile('|'.join(sorted(
+    {re.escape(synonym.lower().strip().replace(' ', ''))
+     for synonyms in METRIC_SYNONYMS.values() for synonym in synonyms},
+    key=len, reverse=True
+)))
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=8192)
+def classify_header(column_name):
+    """单次扫描对表头分类（结果按列名缓存，同一工作簿各科目共享）
+
+    Returns:
+        (考试关键词, 是否包含指标)：考试关键词取列表中优先级最高的一个，未找到时为None；
+        指标匹配忽略大小写和空白字符
+    """
+    keywords = _EXAM_KEYWORD_PATTERN.findall(column_name)
+    if not keywords:
+        return None, False
+    # 考试关键词之间不存在重叠，findall 能找到所有出现的关键词
+    exam = min(keywords, key=_EXAM_KEYWORD_PRIORITY.__getitem__)
+    has_metric = _METRIC_SYNONYM_PATTERN.search(_WHITESPACE_PATTERN.sub('', column_name.lower())) is not None
+    return exam, has_metric
+
+
+# 科目计算用到的基本信息列（去除空白后比较；“班级”在清洗时映射为“班别”）
+BASE_INFO_COLUMNS = ('学校代码', '学校名称', '班别', '班级')
+
+
+def subject_column_positions(columns, subject):
+    """列投影：科目计算实际用到的列在原始表头中的位置
+
+    只保留学校代码、学校名称、班别、{科目}科任，以及包含科目名称、考试关键词和指标的考试列，
+    判断方式与 extract_exam_names 相同，清洗前的表头（如“学校   代码”）同样适用。
+    按位置而不是列名投影，表头存在重名列时也不会混淆。
+    """
+    wanted = set(BASE_INFO_COLUMNS) | {f'{subject}科任'}
+    positions = []
+    for position, column in enumerate(columns):
+        if not isinstance(column, str):
+            continue
+        if _WHITESPACE_PATTERN.sub('', column) in wanted:
+            positions.append(position)
+        elif subject in column:
+            keyword, has_metric = classify_header(column)
+            if keyword is not None and has_metric:
+                positions.append(position)
+    return positions
+
+
+def _column_priority(column_name, key):
+    """同一指标存在多种写法时的优先级：下划线格式优先，带后缀优先（按p/y/l/h/d顺序）"""
+    style = 0 if not re.search(r'\s', column_name.strip()) else 1
+    if key.suffix_letter is None:
+        letter_rank = len(SUFFIX_LETTER_ORDER)
+    else:
+        letter_rank = SUFFIX_LETTER_ORDER.index(key.suffix_letter)
+    return style * (len(SUFFIX_LETTER_ORDER) + 1) + letter_rank
+
+
+class ColumnResolver:
+    """考试列名解析器：一次性解析全部表头并建立索引，按(考试, 科目, 指标, 后缀序号)O(1)查找"""
+
+    def __init__(self, columns):
+        self.keys = {}
+        # (考试, 科目, 指标, 后缀序号) -> (优先级, 列名)，后缀序号为None的条目匹配任意序号
+        self._index = {}
+        # 完整ColumnKey -> 列名（按后缀字母精确查找）
+        self._exact_index = {}
+
+        for column in columns:
+            key = parse_column_name(column)
+            if key is None:
+                continue
+            self.keys[column] = key
+
+            priority = _column_priority(column, key)
+            index_key = (key.exam, key.subject, key.metric, key.suffix_index)
+            if index_key not in self._index or priority < self._index[index_key][0]:
+                self._index[index_key] = (priority, column)
+
+            exact_priority, _ = self._exact_index.get(key, (None, None))
+            if exact_priority is None or priority < exact_priority:
+                self._exact_index[key] = (priority, column)
+
+    def resolve(self, exam, subject, metric, suffix_index):
+        """查找指标列：带指定后缀序号的列或无后缀的列，不存在时返回 None"""
+        candidates = [
+            self._index.get((exam, subject, metric, suffix_index)),
+            self._index.get((exam, subject, metric, None)),
+        ]
+        candidates = [candidate for candidate in candidates if candidate is not None]
+        if not candidates:
+            return None
+        return min(candidates)[1]
+
+    def resolve_exact(self, key):
+        """按完整 ColumnKey（含后缀字母）查找列，不存在时返回 None"""
+        entry = self._exact_index.get(parse_column_name(key) if isinstance(key, str) else key)
+        return entry[1] if entry is not None else None
@@ -3,14 +3,104 @@ import numpy as np
 import re
 import logging
 
-# 配置日志
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from column_resolver import parse_column_name
+
+# 日志由调用方（命令行入口、Web应用）配置，导入时不修改全局日志设置
 logger = logging.getLogger(__name__)
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# 日志详细程度：quiet 只生成清洗报告不输出日志，summary 每次清洗输出一条汇总记录，
+# detailed 逐项输出每个列名映射、数值列和类型转换
+VERBOSITY_LEVELS = ('quiet', 'summary', 'detailed')
+
+# 清洗规则版本号：修改清洗逻辑后需递增，使已缓存的清洗结果失效
+CLEANER_VERSION = '2'
+
+# 数值文本的字符替换：去除百分号，中英文逗号转为小数点
+_NUMERIC_TEXT_TRANSLATION = str.maketrans({'%': None, '，': '.', ',': '.'})
+
+# 清理后视为空值的文本
+NA_TOKENS = ['', 'nan', 'None', 'NULL', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN',
+             '-NaN', '-nan', '1.#IND', '1.#QNAN', 'N/A', 'NA', 'NaN']
+
+
+def _is_text_dtype(series):
+    """是否为文本列（object 或 pandas 字符串类型）"""
+    return pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype)
+
+
+class CleaningReport:
+    """数据清洗报告：收集清洗过程中的事件（映射、转换、异常值等），可汇总为一条日志记录"""
+    
+    def __init__(self):
+        self.original_columns = 0
+        self.header_mapping = {}
+        self.duplicate_renames = {}
+        self.numeric_columns = []
+        self.dtype_changes = {}
+        self.conversion_errors = {}
+        self.inf_columns = []
+        self.outliers = {}
+        self.null_values = 0
+        self.exam_columns = []
+    
+    @property
+    def has_warnings(self):
+        """是否存在需要关注的问题（重复列名、转换失败、无穷大值、异常值）"""
+        return bool(self.duplicate_renames or self.conversion_errors or self.inf_columns or self.outliers)
+    
+    def to_dict(self):
+        """转换为可序列化的字典"""
+        return {
+            'original_columns': self.original_columns,
+            'header_mapping': {str(k): str(v) for k, v in self.header_mapping.items()},
+            'duplicate_renames': dict(self.duplicate_renames),
+            'numeric_columns': list(self.numeric_columns),
+            'dtype_changes': {col: [str(old), str(new)] for col, (old, new) in self.dtype_changes.items()},
+            'conversion_errors': dict(self.conversion_errors),
+            'inf_columns': list(self.inf_columns),
+            'outliers': dict(self.outliers),
+            'null_values': self.null_values,
+            'exam_columns': len(self.exam_columns),
+        }
+    
+    def summary(self):
+        """一行汇总"""
+        parts = [
+            f"数据清洗完成: {self.original_columns} 列",
+            f"表头标准化 {len(self.header_mapping)} 个",
+            f"数值列转换 {len(self.numeric_columns)} 个",
+            f"类型转换 {len(self.dtype_changes)} 个",
+            f"空值 {self.null_values} 个",
+            f"考试列名 {len(self.exam_columns)} 个",
+        ]
+        if self.duplicate_renames:
+            parts.append(f"重复列名 {len(self.duplicate_renames)} 个")
+        if self.conversion_errors:
+            parts.append(f"转换失败 {len(self.conversion_errors)} 列")
+        if self.inf_columns:
+            parts.append(f"含无穷大值 {len(self.inf_columns)} 列")
+        if self.outliers:
+            parts.append(f"异常值 {sum(self.outliers.values())} 个（{len(self.outliers)} 列）")
+        return '，'.join(parts)
+    
+    def __str__(self):
+        return self.summary()
 
 class DataCleaner:
     """数据清洗器：处理表头标准化和数据类型转换"""
     
-    def __init__(self):
+    def __init__(self, batch_mode=True, verbosity='detailed'):
+        if verbosity not in VERBOSITY_LEVELS:
+            raise ValueError(f"不支持的日志详细程度: {verbosity}，可选: {VERBOSITY_LEVELS}")
+        
+        # 数值列批量转换（False 时逐列转换）
+        self.batch_mode = batch_mode
+        self.verbosity = verbosity
+        
+        # 最近一次清洗的报告
+        self.report = CleaningReport()
+        
         # 表头标准化映射
         self.header_mapping = {
             # 学校相关
@@ -79,9 +169,19 @@ class DataCleaner:
                                'l1', 'l2', 'l3', 'l4', 'h1', 'h2', 'h3', 'h4', 
                                'd1', 'd2', 'd3', 'd4']
     
+    def _log(self, level, msg, *args):
+        """逐项日志：仅 detailed 模式输出，低于日志级别时不格式化参数"""
+        if self.verbosity == 'detailed':
+            logger.log(level, msg, *args)
+    
+    def _detailed_enabled(self, level=logging.INFO):
+        """detailed 模式且该级别日志会被输出（用于跳过只为日志服务的计算）"""
+        return self.verbosity == 'detailed' and logger.isEnabledFor(level)
+    
     def clean_headers(self, df):
         """清洗和标准化表头"""
-        logger.info("开始清洗表头...")
+        self._log(logging.INFO, "开始清洗表头...")
+        self.report.original_columns = len(df.columns)
         
         # 创建新的列名列表
         new_columns = []
@@ -98,7 +198,7 @@ class DataCleaner:
             # 2. 先应用标准化映射（在空格处理之前）
             if cleaned_col in self.header_mapping:
                 cleaned_col = self.header_mapping[cleaned_col]
-                logger.info(f"应用列名映射: '{original_col}' -> '{cleaned_col}'")
+                self._log(logging.INFO, "应用列名映射: '%s' -> '%s'", original_col, cleaned_col)
             else:
                 # 3. 对于非关键列名，处理空格和特殊字符
                 if isinstance(col, str):
@@ -117,17 +217,18 @@ class DataCleaner:
             # 4. 记录清洗映射关系
             if original_col != cleaned_col:
                 cleaned_mapping[original_col] = cleaned_col
-                logger.info(f"表头清洗: '{original_col}' -> '{cleaned_col}'")
+                self._log(logging.INFO, "表头清洗: '%s' -> '%s'", original_col, cleaned_col)
             
             new_columns.append(cleaned_col)
         
         # 更新DataFrame的列名
         df.columns = new_columns
+        self.report.header_mapping.update(cleaned_mapping)
         
         # 检查是否有重复列名
         duplicate_cols = df.columns[df.columns.duplicated()].tolist()
         if duplicate_cols:
-            logger.warning(f"发现重复列名: {duplicate_cols}")
+            self._log(logging.WARNING, "发现重复列名: %s", duplicate_cols)
             # 为重复列名添加后缀（简单方法）
             new_columns = []
             seen_columns = {}
@@ -137,20 +238,21 @@ class DataCleaner:
                     seen_columns[col] += 1
                     new_col = f"{col}_{seen_columns[col]}"
                     new_columns.append(new_col)
-                    logger.info(f"重命名重复列: '{col}' -> '{new_col}'")
+                    self.report.duplicate_renames[col] = new_col
+                    self._log(logging.INFO, "重命名重复列: '%s' -> '%s'", col, new_col)
                 else:
                     seen_columns[col] = 0
                     new_columns.append(col)
             
             df.columns = new_columns
-            logger.info("已自动处理重复列名")
+            self._log(logging.INFO, "已自动处理重复列名")
         
-        logger.info(f"表头清洗完成，共处理 {len(cleaned_mapping)} 个列名")
+        self._log(logging.INFO, "表头清洗完成，共处理 %d 个列名", len(cleaned_mapping))
         return df, cleaned_mapping
     
     def convert_data_types(self, df):
         """转换数据类型和验证数据"""
-        logger.info("开始数据类型转换和验证...")
+        self._log(logging.INFO, "开始数据类型转换和验证...")
         
         conversion_stats = {
             'numeric_converted': 0,
@@ -158,26 +260,16 @@ class DataCleaner:
             'invalid_values_fixed': 0
         }
         
-        for col in df.columns:
-            if not isinstance(col, str):
-                continue
-                
-            # 1. 识别数值列
-            is_numeric_col = False
-            for pattern in self.numeric_patterns:
-                if re.match(pattern, col):
-                    is_numeric_col = True
-                    break
-            
-            # 检查列后缀
-            if not is_numeric_col:
-                for suffix in self.numeric_suffixes:
-                    if col.endswith(suffix) or f'   {suffix}' in col:
-                        is_numeric_col = True
-                        break
-            
-            if is_numeric_col:
-                logger.info(f"处理数值列: {col}")
+        # 1. 识别数值列（一个合并正则完成列名模式和后缀检查）
+        numeric_column_pattern = self._compile_numeric_column_pattern()
+        numeric_cols = [col for col in df.columns
+                        if isinstance(col, str) and numeric_column_pattern.search(col)]
+        
+        if self.batch_mode:
+            df = self._convert_numeric_block(df, numeric_cols, conversion_stats)
+        else:
+            for col in numeric_cols:
+                self._log(logging.INFO, "处理数值列: %s", col)
                 
                 # 2. 数据类型转换
                 original_dtype = df[col].dtype
@@ -189,31 +281,129 @@ class DataCleaner:
                 try:
                     df[col] = pd.to_numeric(df[col], errors='coerce')
                     conversion_stats['numeric_converted'] += 1
+                    self.report.numeric_columns.append(col)
                     
                     # 检查转换后的数据类型
                     new_dtype = df[col].dtype
                     if original_dtype != new_dtype:
-                        logger.info(f"  类型转换: {original_dtype} -> {new_dtype}")
+                        self.report.dtype_changes[col] = (original_dtype, new_dtype)
+                        self._log(logging.INFO, "  类型转换: %s -> %s", original_dtype, new_dtype)
                     
                     # 3. 数值范围验证
                     self._validate_numeric_range(df[col], col)
                     
                 except Exception as e:
-                    logger.error(f"  列 {col} 数值转换失败: {e}")
+                    self.report.conversion_errors[col] = str(e)
+                    self._log(logging.ERROR, "  列 %s 数值转换失败: %s", col, e)
         
         # 4. 处理空值
         null_counts = df.isnull().sum()
         total_null = null_counts.sum()
         if total_null > 0:
-            logger.info(f"发现 {total_null} 个空值")
+            self._log(logging.INFO, "发现 %d 个空值", total_null)
             conversion_stats['null_values_filled'] = total_null
+        self.report.null_values = int(total_null)
         
-        logger.info(f"数据类型转换完成:")
-        logger.info(f"  数值列转换: {conversion_stats['numeric_converted']}")
-        logger.info(f"  空值处理: {conversion_stats['null_values_filled']}")
+        self._log(logging.INFO, "数据类型转换完成:")
+        self._log(logging.INFO, "  数值列转换: %d", conversion_stats['numeric_converted'])
+        self._log(logging.INFO, "  空值处理: %d", conversion_stats['null_values_filled'])
         
         return df, conversion_stats
     
+    def _compile_numeric_column_pattern(self):
+        """将数值列模式和后缀检查合并为一个正则
+        
+        等价于：任一模式 re.match 列名，或列名以后缀结尾，或包含“三个空格+后缀”
+        """
+        name_alternation = '|'.join(f'(?:{pattern})' for pattern in self.numeric_patterns)
+        suffix_alternation = '|'.join(re.escape(suffix) for suffix in self.numeric_suffixes)
+        return re.compile(f'\\A(?:{name_alternation})|(?:{suffix_alternation})\\Z|   (?:{suffix_alternation})')
+    
+    def _convert_numeric_block(self, df, numeric_cols, conversion_stats):
+        """批量转换数值列：所有文本数值列拼成一个二维块，一次清理、一次 to_numeric
+        
+        结果与逐列调用 _clean_numeric_column + pd.to_numeric 一致
+        （全部为整数文本的列同样转换为 int64）
+        """
+        text_cols = [col for col in numeric_cols if _is_text_dtype(df[col])]
+        self._log(logging.INFO, "批量处理数值列: %d 个（其中文本列 %d 个）", len(numeric_cols), len(text_cols))
+        
+        if text_cols:
+            original_dtypes = df[text_cols].dtypes
+            
+            # 按行展开为一维并去重（成绩数据重复值很多），只对不同的文本做一次清理：
+            # 去除百分号、逗号转小数点、去除空格和空值标记替换
+            codes, uniques = pd.factorize(df[text_cols].astype(str).to_numpy().ravel())
+            texts = pd.Series(uniques, dtype=object).str.translate(_NUMERIC_TEXT_TRANSLATION).str.strip()
+            texts = texts.mask(texts.isin(NA_TOKENS))
+            unique_values = np.append(pd.to_numeric(texts, errors='coerce').to_numpy(dtype=float), np.nan)
+            block = unique_values[codes].reshape(len(df), len(text_cols))
+            
+            # 逐列转换时全部为整数文本的列会得到 int64，这里保持一致
+            candidates = ~np.isnan(block).any(axis=0) & (block == np.floor(block)).all(axis=0)
+            int_cols = set()
+            if candidates.any():
+                is_integer_text = texts.str.fullmatch(r'[+-]?\d+').fillna(False).to_numpy(dtype=bool)
+                is_integer_text = np.append(is_integer_text, False)[codes]
+                is_integer_text = is_integer_text.reshape(len(df), len(text_cols)).all(axis=0)
+                int_cols = {col for col, candidate, integer in zip(text_cols, candidates, is_integer_text)
+                            if candidate and integer}
+            
+            converted = pd.DataFrame(block, columns=text_cols, index=df.index)
+            for col in int_cols:
+                converted[col] = converted[col].astype('int64')
+            df[text_cols] = converted
+            
+            for col in text_cols:
+                if original_dtypes[col] != df[col].dtype:
+                    self.report.dtype_changes[col] = (original_dtypes[col], df[col].dtype)
+                    self._log(logging.DEBUG, "  %s 类型转换: %s -> %s", col, original_dtypes[col], df[col].dtype)
+        
+        # 其余非 int64/float64 的列（如布尔、日期）保持逐列转换
+        text_col_set = set(text_cols)
+        for col in numeric_cols:
+            if col in text_col_set or df[col].dtype in ['int64', 'float64']:
+                continue
+            original_dtype = df[col].dtype
+            try:
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+            except Exception as e:
+                self.report.conversion_errors[col] = str(e)
+                self._log(logging.ERROR, "  列 %s 数值转换失败: %s", col, e)
+                numeric_cols = [c for c in numeric_cols if c != col]
+                continue
+            if original_dtype != df[col].dtype:
+                self.report.dtype_changes[col] = (original_dtype, df[col].dtype)
+        
+        conversion_stats['numeric_converted'] += len(numeric_cols)
+        self.report.numeric_columns.extend(numeric_cols)
+        self._validate_numeric_block(df, numeric_cols)
+        return df
+    
+    def _validate_numeric_block(self, df, numeric_cols):
+        """批量验证数值范围：无穷大值替换为空值，统计超过3个标准差的异常值"""
+        valid_cols = [col for col in numeric_cols if df[col].dtype in ['int64', 'float64']]
+        if not valid_cols:
+            return
+        
+        block = df[valid_cols]
+        inf_cols = [col for col, has_inf in zip(valid_cols, np.isinf(block.to_numpy(dtype=float)).any(axis=0))
+                    if has_inf]
+        for col in inf_cols:
+            self.report.inf_columns.append(col)
+            self._log(logging.WARNING, "  列 %s 包含无穷大值", col)
+            df[col] = df[col].replace([np.inf, -np.inf], np.nan)
+        if inf_cols:
+            block = df[valid_cols]
+        
+        mean_vals = block.mean()
+        std_vals = block.std()
+        outlier_counts = ((block < mean_vals - 3 * std_vals) | (block > mean_vals + 3 * std_vals)).sum()
+        for col in valid_cols:
+            if std_vals[col] > 0 and outlier_counts[col] > 0:
+                self.report.outliers[col] = int(outlier_counts[col])
+                self._log(logging.WARNING, "  列 %s 发现 %d 个异常值", col, outlier_counts[col])
+    
     def _standardize_exam_column_name(self, column_name):
         """标准化考试列名，确保格式一致"""
         if not isinstance(column_name, str):
@@ -232,6 +422,18 @@ class DataCleaner:
         if not is_exam_column:
             return standardized_col
         
+        # 快速路径：已是结构化的“考试名 科目 指标 [后缀]”格式且各部分均为已知名称时，直接重新组装
+        parsed = parse_column_name(standardized_col)
+        if (parsed is not None
+                and parsed.exam in self.exam_column_patterns['exam_names']
+                and parsed.subject in self.exam_column_patterns['subjects']
+                and parsed.metric in self.exam_column_patterns['metrics']):
+            suffix = f"{parsed.suffix_letter}{parsed.suffix_index}" if parsed.suffix_letter else None
+            if suffix is None:
+                return f"{parsed.exam}_{parsed.subject}_{parsed.metric}"
+            if suffix in self.exam_column_patterns['suffixes']:
+                return f"{parsed.exam}_{parsed.subject}_{parsed.metric}_{suffix}"
+        
         # 标准化考试列名格式
         # 目标格式: "考试名_科目_指标_后缀"
         
@@ -270,7 +472,7 @@ class DataCleaner:
             else:
                 standardized_col = f"{exam_name}_{subject_name}_{metric_name}"
             
-            logger.debug(f"考试列名标准化: '{column_name}' -> '{standardized_col}'")
+            self._log(logging.DEBUG, "考试列名标准化: '%s' -> '%s'", column_name, standardized_col)
         
         return standardized_col
     
@@ -280,7 +482,7 @@ class DataCleaner:
             return series
         
         # 处理字符串类型的数值
-        if series.dtype == 'object':
+        if _is_text_dtype(series):
             # 去除百分号
             series = series.astype(str).str.replace('%', '')
             
@@ -306,7 +508,8 @@ class DataCleaner:
         if series.dtype in ['int64', 'float64']:
             # 检查是否有无穷大值
             if np.isinf(series).any():
-                logger.warning(f"  列 {col_name} 包含无穷大值")
+                self.report.inf_columns.append(col_name)
+                self._log(logging.WARNING, "  列 %s 包含无穷大值", col_name)
                 series.replace([np.inf, -np.inf], np.nan, inplace=True)
             
             # 检查异常值（超过3个标准差）
@@ -317,13 +520,15 @@ class DataCleaner:
                     outliers = series[(series < mean_val - 3*std_val) | 
                                     (series > mean_val + 3*std_val)]
                     if len(outliers) > 0:
-                        logger.warning(f"  列 {col_name} 发现 {len(outliers)} 个异常值")
+                        self.report.outliers[col_name] = len(outliers)
+                        self._log(logging.WARNING, "  列 %s 发现 %d 个异常值", col_name, len(outliers))
     
     def clean_dataframe(self, df):
-        """完整的数据清洗流程"""
-        logger.info("=" * 50)
-        logger.info("开始数据清洗流程")
-        logger.info("=" * 50)
+        """完整的数据清洗流程（清洗报告保存在 self.report）"""
+        self.report = CleaningReport()
+        self._log(logging.INFO, "=" * 50)
+        self._log(logging.INFO, "开始数据清洗流程")
+        self._log(logging.INFO, "=" * 50)
         
         # 1. 表头清洗
         df, header_mapping = self.clean_headers(df)
@@ -334,65 +539,86 @@ class DataCleaner:
         # 3. 生成清洗报告
         self._generate_cleaning_report(df, header_mapping, conversion_stats)
         
-        logger.info("=" * 50)
-        logger.info("数据清洗流程完成")
-        logger.info("=" * 50)
+        self._log(logging.INFO, "=" * 50)
+        self._log(logging.INFO, "数据清洗流程完成")
+        self._log(logging.INFO, "=" * 50)
         
         return df
     
     def _generate_cleaning_report(self, df, header_mapping, conversion_stats):
-        """生成清洗报告"""
-        logger.info("\n📊 数据清洗报告:")
-        logger.info(f"  原始列数: {len(df.columns)}")
-        logger.info(f"  清洗后列数: {len(df.columns)}")
-        logger.info(f"  表头标准化: {len(header_mapping)} 个列名被修改")
-        logger.info(f"  数值列转换: {conversion_stats['numeric_converted']} 个")
-        logger.info(f"  空值处理: {conversion_stats['null_values_filled']} 个")
-        
+        """生成清洗报告：summary 模式输出一条汇总记录，detailed 模式逐项输出"""
         # 统计考试列名标准化情况
-        exam_columns = [col for col in df.columns if any(exam in col for exam in self.exam_column_patterns['exam_names'])]
-        logger.info(f"  考试列名: {len(exam_columns)} 个")
+        exam_names = self.exam_column_patterns['exam_names']
+        exam_columns = [col for col in df.columns
+                        if isinstance(col, str) and any(exam in col for exam in exam_names)]
+        self.report.exam_columns = exam_columns
+        
+        if self.verbosity == 'summary':
+            # 汇总记录在输出时才格式化
+            logger.log(logging.WARNING if self.report.has_warnings else logging.INFO, '%s', self.report)
+            return
+        if not self._detailed_enabled():
+            return
+        
+        logger.info("\n📊 数据清洗报告:")
+        logger.info("  原始列数: %d", len(df.columns))
+        logger.info("  清洗后列数: %d", len(df.columns))
+        logger.info("  表头标准化: %d 个列名被修改", len(header_mapping))
+        logger.info("  数值列转换: %d 个", conversion_stats['numeric_converted'])
+        logger.info("  空值处理: %d 个", conversion_stats['null_values_filled'])
+        logger.info("  考试列名: %d 个", len(exam_columns))
         
         # 显示前几列作为示例
-        logger.info(f"\n前10列名示例:")
+        logger.info("\n前10列名示例:")
         for i, col in enumerate(df.columns[:10]):
-            logger.info(f"  {i+1:2d}: {col}")
+            logger.info("  %2d: %s", i + 1, col)
         
         if len(df.columns) > 10:
-            logger.info(f"  ... 还有 {len(df.columns) - 10} 列")
+            logger.info("  ... 还有 %d 列", len(df.columns) - 10)
         
         # 显示考试列名示例
         if exam_columns:
-            logger.info(f"\n考试列名示例:")
+            logger.info("\n考试列名示例:")
             for i, col in enumerate(exam_columns[:5]):
-                logger.info(f"  {i+1:2d}: {col}")
+                logger.info("  %2d: %s", i + 1, col)
             if len(exam_columns) > 5:
-                logger.info(f"  ... 还有 {len(exam_columns) - 5} 个考试列名")
+                logger.info("  ... 还有 %d 个考试列名", len(exam_columns) - 5)
 
-def clean_excel_data(file_path, sheet_name=None):
-    """便捷函数：清洗Excel数据"""
+def clean_excel_data(file_path, sheet_name=None, verbosity='detailed', return_report=False):
+    """便捷函数：清洗Excel数据
+    
+    Args:
+        verbosity: 日志详细程度（quiet/summary/detailed）
+        return_report: 为True时返回 (清洗后数据, CleaningReport)
+    """
     try:
+        # 创建清洗器（同时校验日志详细程度）
+        cleaner = DataCleaner(verbosity=verbosity)
+        
         # 读取Excel文件
         if sheet_name:
             df = pd.read_excel(file_path, sheet_name=sheet_name)
-            logger.info(f"成功读取工作表: {sheet_name}")
+            cleaner._log(logging.INFO, "成功读取工作表: %s", sheet_name)
         else:
             df = pd.read_excel(file_path)
-            logger.info(f"成功读取Excel文件")
+            cleaner._log(logging.INFO, "成功读取Excel文件")
         
-        logger.info(f"原始数据形状: {df.shape}")
+        cleaner._log(logging.INFO, "原始数据形状: %s", df.shape)
         
-        # 创建清洗器并执行清洗
-        cleaner = DataCleaner()
+        # 执行清洗
         cleaned_df = cleaner.clean_dataframe(df)
         
+        if return_report:
+            return cleaned_df, cleaner.report
         return cleaned_df
         
     except Exception as e:
-        logger.error(f"数据清洗失败: {e}")
+        logger.error("数据清洗失败: %s", e)
         raise
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    
     # 测试代码
     print("数据清洗模块测试")
     
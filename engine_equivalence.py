@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+计算引擎等价性对照
+用相同的已清洗数据运行两个或多个计算引擎，逐个单元格比较所有 排名/得分/总分/综合得分 列，
+报告不一致的列、单元格数和最大误差。默认在合成工作簿上对照当前实现与参考实现，几秒内完成。
+
+参考实现保持基线规则；当前实现相对基线的有意改动（INTENDED_DIFFERENCES）在对照参考实现时逐单元格核实，
+核实通过的差异在报告中单独列出（不计为不一致），其余差异照常报告：
+
+    python3 engine_equivalence.py                                   # current 对照 reference
+    python3 engine_equivalence.py --engines current legacy --classes 176
+    python3 engine_equivalence.py --workbook data/2025Mid3.xls      # 同时对照真实数据
+"""
+
+import argparse
+import contextlib
+import io
+import math
+import os
+import sys
+import tempfile
+from collections import namedtuple
+from fractions import Fraction
+
+import numpy as np
+import pandas as pd
+
+from calculate_scores import TeacherScoreCalculator
+from calculate_scores_final_fix import extract_exam_names, process_single_subject
+from reference_scoring import REFERENCE_EDUCATION_CONFIGS, reference_score_subject
+from synthetic_workbook import generate_workbook
+from workbook_loader import WorkbookSession
+
+# 参与比较的结果列：列名包含以下关键词（综合得分包含“得分”）
+RESULT_COLUMN_KEYWORDS = ('排名', '得分', '总分')
+
+# 数值比较的默认绝对误差
+DEFAULT_ATOL = 1e-9
+
+# 默认对照的合成数据规模（班级数）：小规模、恰好176个班级、较大规模
+DEFAULT_CLASS_COUNTS = [30, 176, 500]
+
+# 默认对照的真实数据（不存在时跳过）
+DEFAULT_REAL_WORKBOOK = 'data/2025Mid3.xls'
+
+# 每列最多列出的不一致单元格数
+MAX_EXAMPLES = 5
+
+# 按基线规则计算的参考引擎：与它们对照时核实当前实现的有意差异
+BASELINE_ENGINES = ('reference', 'reference_fixed')
+
+# 当前实现相对基线规则的有意差异：只有逐单元格核实符合说明的差异才被接受
+INTENDED_DIFFERENCES = {
+    'half_up': '总分和综合得分按精确分数四舍五入（.5 进位），与基线的浮点 round(2) 最多相差0.01',
+    'any_exam_count': '综合得分支持任意考试次数（第一次考试0.4，其余平分0.6），基线多于4次考试时综合得分为0',
+    'comprehensive_rank': '综合排名随综合得分的上述差异变化（当前实现的综合排名与其综合得分一致）',
+}
+
+
+def run_current_engine(df, subject):
+    """当前实现：calculate_scores_final_fix.process_single_subject"""
+    return process_single_subject(None, subject, subject_df=df, cleaned=True, write_output=False)
+
+
+def run_current_fixed_engine(df, subject):
+    """当前实现的固定区间赋分"""
+    return process_single_subject(None, subject, subject_df=df, cleaned=True, write_output=False,
+                                  scoring_method='fixed')
+
+
+def run_legacy_engine(df, subject):
+    """早期实现：calculate_scores.TeacherScoreCalculator（固定176人赋分表、顺序名次）"""
+    return TeacherScoreCalculator(None).score_dataframe(df, subject)
+
+
+def run_reference_engine(df, subject):
+    """参考实现：reference_scoring.reference_score_subject（逐行直接计算）"""
+    exam_names, _ = extract_exam_names(df, subject)
+    return reference_score_subject(df, subject, exam_names)
+
+
+def run_reference_fixed_engine(df, subject):
+    """参考实现的固定区间赋分"""
+    exam_names, _ = extract_exam_names(df, subject)
+    return reference_score_subject(df, subject, exam_names, scoring_method='fixed')
+
+
+# 可对照的计算引擎：engine(已清洗的科目数据, 科目) -> 结果 DataFrame
+ENGINES = {
+    'legacy': run_legacy_engine,
+    'current': run_current_engine,
+    'reference': run_reference_engine,
+    'current_fixed': run_current_fixed_engine,
+    'reference_fixed': run_reference_fixed_engine,
+}
+
+
+def register_engine(name, engine):
+    """注册一个计算引擎（如新的优化实现），之后可用名称参与对照"""
+    ENGINES[name] = engine
+
+
+# 一列的比较结果：不一致单元格数、最大绝对误差、示例 [(行号, 左值, 右值)]
+ColumnDifference = namedtuple('ColumnDifference', ['column', 'mismatches', 'max_abs_diff', 'examples'])
+
+
+class EquivalenceReport:
+    """两个引擎在一个科目上的对照结果"""
+
+    def __init__(self, label, subject, left, right):
+        self.label = label
+        self.subject = subject
+        self.left = left
+        self.right = right
+        self.compared_columns = []
+        self.missing_columns = {left: [], right: []}  # 另一个引擎有、本引擎没有的结果列
+        self.differences = []
+        self.intended = []  # [(ColumnDifference, 有意差异名称)]：已核实的有意差异，不计为不一致
+        self.row_count_mismatch = None
+        self.error = None
+
+    @property
+    def is_equivalent(self):
+        return (self.error is None and self.row_count_mismatch is None and self.compared_columns
+                and not self.differences and not any(self.missing_columns.values()))
+
+    def summary(self):
+        """多行文本报告"""
+        title = f"[{self.label}] {self.subject}: {self.left} vs {self.right}"
+        if self.error is not None:
+            return f"{title} ❌ 运行出错: {self.error}"
+        if self.row_count_mismatch is not None:
+            return f"{title} ❌ 行数不同: {self.row_count_mismatch}"
+        if self.is_equivalent:
+            lines = [f"{title} ✅ {len(self.compared_columns)} 列全部一致"
+                     + (f"（{len(self.intended)} 列有意差异）" if self.intended else '')]
+        else:
+            lines = [f"{title} ❌ {len(self.differences)}/{len(self.compared_columns)} 列不一致"]
+        for difference, names in self.intended:
+            lines.append(f"  有意差异 {difference.column}: {difference.mismatches} 个单元格（{'、'.join(names)}）")
+            for row, left_value, right_value in difference.examples:
+                lines.append(f"    行{row}: {left_value} != {right_value}")
+        if self.is_equivalent:
+            return '\n'.join(lines)
+        for engine, columns in self.missing_columns.items():
+            if columns:
+                lines.append(f"  {engine} 缺少 {len(columns)} 列: {columns[:MAX_EXAMPLES]}")
+        for difference in self.differences:
+            lines.append(f"  {difference.column}: {difference.mismatches} 个单元格不一致，"
+                         f"最大误差 {difference.max_abs_diff:.6g}")
+            for row, left_value, right_value in difference.examples:
+                lines.append(f"    行{row}: {left_value} != {right_value}")
+        return '\n'.join(lines)
+
+
+def result_columns(df):
+    """结果中的排名/得分/总分/综合得分列（按出现顺序）"""
+    return [column for column in df.columns
+            if isinstance(column, str) and any(keyword in column for keyword in RESULT_COLUMN_KEYWORDS)]
+
+
+def _numeric(values):
+    return pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)
+
+
+def _mismatch_mask(left_values, right_values, atol):
+    both_nan = np.isnan(left_values) & np.isnan(right_values)
+    with np.errstate(invalid='ignore'):
+        abs_diff = np.abs(left_values - right_values)
+    return ~both_nan & ~(abs_diff <= atol), abs_diff
+
+
+def compare_columns(column, left_values, right_values, atol=DEFAULT_ATOL):
+    """逐单元格比较一列（两边都为空值视为一致），一致时返回 None"""
+    left_values = _numeric(left_values)
+    right_values = _numeric(right_values)
+    mismatch, abs_diff = _mismatch_mask(left_values, right_values, atol)
+    if not mismatch.any():
+        return None
+    # 一边为空值时误差记为无穷大
+    max_abs_diff = float(np.nanmax(np.where(np.isnan(abs_diff), np.inf, abs_diff)[mismatch]))
+    rows = np.flatnonzero(mismatch)
+    examples = [(int(row), left_values[row], right_values[row]) for row in rows[:MAX_EXAMPLES]]
+    return ColumnDifference(column, int(mismatch.sum()), max_abs_diff, examples)
+
+
+def intended_comprehensive_weights(exam_count):
+    """当前规则的综合得分权重（精确分数）：第一次考试2/5，其余考试平分3/5；只有一次考试时为1"""
+    if exam_count == 1:
+        return [Fraction(1)]
+    return [Fraction(2, 5)] + [Fraction(3, 5) / (exam_count - 1)] * (exam_count - 1)
+
+
+def _weighted_inputs(result, column, subject):
+    """总分或综合得分列的输入列和精确权重，无法确定时返回 None
+
+    单次考试总分的输入为该总分列之前、上一个总分列之后的得分列（指标权重按参考实现的教育阶段配置），
+    综合得分的输入为全部考试总分列。
+    """
+    columns = result_columns(result)
+    if column == f'{subject}综合得分':
+        totals = [name for name in columns if name.endswith(f'_{subject}总分')]
+        return (totals, intended_comprehensive_weights(len(totals))) if totals else None
+    inputs = []
+    for name in reversed(columns[:columns.index(column)]):
+        if name.endswith('总分'):
+            break
+        if name.endswith('得分'):
+            inputs.append(name)
+    inputs.reverse()
+    metrics = [name.rsplit('_', 2)[-2] for name in inputs]
+    for config_metrics, weights in REFERENCE_EDUCATION_CONFIGS.values():
+        if metrics == config_metrics:
+            return inputs, [Fraction(str(weight)) for weight in weights]
+    return None
+
+
+def _half_up_total(values, weights):
+    """按精确分数计算加权和，四舍五入（.5 进位）保留两位小数"""
+    total = sum(Fraction(repr(float(value))) * weight for value, weight in zip(values, weights))
+    return math.floor(total * 100 + Fraction(1, 2)) / 100
+
+
+def explain_intended_difference(left_df, right_df, column, subject, rows):
+    """核实左侧（当前实现）与右侧（基线规则的参考实现）在 rows 行的差异是否都属于有意差异
+
+    Returns:
+        涉及的有意差异名称列表（见 INTENDED_DIFFERENCES），有任何一行无法解释时返回 None
+    """
+    left_values = _numeric(left_df[column].to_numpy())[rows]
+    right_values = _numeric(right_df[column].to_numpy())[rows]
+    if column == f'{subject}综合排名':
+        # 综合排名只能随已核实的综合得分差异变化，且与当前实现自己的综合得分一致
+        score_column = f'{subject}综合得分'
+        if score_column not in left_df.columns or score_column not in right_df.columns:
+            return None
+        mismatch, _ = _mismatch_mask(_numeric(left_df[score_column].to_numpy()),
+                                     _numeric(right_df[score_column].to_numpy()), DEFAULT_ATOL)
+        if not mismatch.any() or explain_intended_difference(left_df, right_df, score_column, subject,
+                                                             np.flatnonzero(mismatch)) is None:
+            return None
+        expected = left_df[score_column].rank(ascending=False, method='min').to_numpy()[rows]
+        return ['comprehensive_rank'] if np.array_equal(left_values, expected) else None
+
+    if not (column == f'{subject}综合得分' or column.endswith(f'_{subject}总分')):
+        return None
+    weighted = _weighted_inputs(left_df, column, subject)
+    if weighted is None:
+        return None
+    inputs, weights = weighted
+    input_values = left_df[inputs].to_numpy(dtype=float)[rows]
+    names = set()
+    for left_value, right_value, values in zip(left_values, right_values, input_values):
+        # 当前实现的值必须等于按精确分数四舍五入的结果
+        if left_value != _half_up_total(values, weights):
+            return None
+        if abs(left_value - right_value) <= 0.01 + DEFAULT_ATOL:
+            names.add('half_up')
+        elif column == f'{subject}综合得分' and len(inputs) > 4 and right_value == 0:
+            names.add('any_exam_count')
+        else:
+            return None
+    return sorted(names)
+
+
+def compare_results(left_df, right_df, label='', subject='', left='left', right='right', atol=DEFAULT_ATOL,
+                    intended=False):
+    """比较两个引擎的结果（按行位置对齐），返回 EquivalenceReport
+
+    Args:
+        intended: 右侧为基线规则的参考实现时为True，核实并单独列出有意差异
+    """
+    report = EquivalenceReport(label, subject, left, right)
+    if len(left_df) != len(right_df):
+        report.row_count_mismatch = f"{len(left_df)} != {len(right_df)}"
+        return report
+
+    left_columns = result_columns(left_df)
+    right_columns = set(result_columns(right_df))
+    report.missing_columns[right] = [column for column in left_columns if column not in right_columns]
+    report.missing_columns[left] = [column for column in result_columns(right_df) if column not in set(left_columns)]
+    for column in left_columns:
+        if column not in right_columns:
+            continue
+        report.compared_columns.append(column)
+        difference = compare_columns(column, left_df[column].to_numpy(), right_df[column].to_numpy(), atol)
+        if difference is None:
+            continue
+        names = None
+        if intended:
+            mismatch, _ = _mismatch_mask(_numeric(left_df[column].to_numpy()), _numeric(right_df[column].to_numpy()),
+                                         atol)
+            names = explain_intended_difference(left_df, right_df, column, subject, np.flatnonzero(mismatch))
+        if names is None:
+            report.differences.append(difference)
+        else:
+            report.intended.append((difference, names))
+    return report
+
+
+def run_engine(name, df, subject):
+    """运行引擎（输入数据的副本，不输出计算过程的打印信息）"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = ENGINES[name](df.copy(), subject)
+    if result is None:
+        raise RuntimeError(f"引擎 {name} 未返回结果")
+    return result
+
+
+def compare_engines(sheets, engines=('current', 'reference'), label='', atol=DEFAULT_ATOL):
+    """在每个科目上以第一个引擎为基准，与其余引擎逐一对照
+
+    Args:
+        sheets: {科目: 已清洗的科目数据}
+        engines: 引擎名称（见 ENGINES）
+
+    Returns:
+        [EquivalenceReport]
+    """
+    unknown = [name for name in engines if name not in ENGINES]
+    if unknown:
+        raise ValueError(f"未知的计算引擎: {unknown}，可选: {list(ENGINES)}")
+
+    reports = []
+    base, others = engines[0], engines[1:]
+    for subject, df in sheets.items():
+        try:
+            base_result = run_engine(base, df, subject)
+        except Exception as e:
+            for other in others:
+                report = EquivalenceReport(label, subject, base, other)
+                report.error = f"{base}: {e}"
+                reports.append(report)
+            continue
+        for other in others:
+            try:
+                other_result = run_engine(other, df, subject)
+            except Exception as e:
+                report = EquivalenceReport(label, subject, base, other)
+                report.error = f"{other}: {e}"
+            else:
+                report = compare_results(base_result, other_result, label, subject, base, other, atol,
+                                         intended=other in BASELINE_ENGINES and base not in BASELINE_ENGINES)
+            reports.append(report)
+    return reports
+
+
+def load_sheets(path):
+    """读取并清洗工作簿中的全部科目"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        with WorkbookSession(path, clean=True) as workbook:
+            return dict(workbook.load())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='计算引擎等价性对照')
+    parser.add_argument('--engines', nargs='+', default=['current', 'reference'],
+                        help=f'参与对照的引擎，第一个为基准（可选: {", ".join(ENGINES)}）')
+    parser.add_argument('--classes', type=int, nargs='*', default=DEFAULT_CLASS_COUNTS,
+                        help='合成工作簿的班级数（不指定时不使用合成数据）')
+    parser.add_argument('--workbook', nargs='*', default=None,
+                        help=f'真实工作簿路径，默认使用 {DEFAULT_REAL_WORKBOOK}（存在时）')
+    parser.add_argument('--seed', type=int, default=0, help='合成数据随机种子')
+    parser.add_argument('--atol', type=float, default=DEFAULT_ATOL, help='数值比较的绝对误差')
+    args = parser.parse_args()
+
+    if len(args.engines) < 2:
+        parser.error('至少需要两个引擎')
+    workbooks = args.workbook
+    if workbooks is None:
+        workbooks = [DEFAULT_REAL_WORKBOOK] if os.path.exists(DEFAULT_REAL_WORKBOOK) else []
+
+    reports = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_classes in args.classes:
+            path = generate_workbook(os.path.join(tmp_dir, f'synthetic_{n_classes}.xlsx'), n_classes, seed=args.seed)
+            reports.extend(compare_engines(load_sheets(path), args.engines, f'合成 {n_classes} 班', args.atol))
+    for path in workbooks:
+        reports.extend(compare_engines(load_sheets(path), args.engines, os.path.basename(path), args.atol))
+
+    for report in reports:
+        print(report.summary())
+    failed = [report for report in reports if not report.is_equivalent]
+    print(f"\n共对照 {len(reports)} 项，不一致 {len(failed)} 项")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
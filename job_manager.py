@@ -0,0 +1,188 @@
+import collections
+import math
+import queue
+import shutil
+import threading
+import time
+import uuid
+
+# 任务状态
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+
+
+class QueueFullError(Exception):
+    """任务队列已满，retry_after 为建议的重试等待秒数"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"任务队列已满，请 {retry_after} 秒后重试")
+        self.retry_after = retry_after
+
+
+class Job:
+    """单个处理任务：状态、进度、消息和输出文件（各字段由工作线程更新，读取时加锁）"""
+
+    def __init__(self, job_id, output_dir=None):
+        self.job_id = job_id
+        self.output_dir = output_dir
+        self.state = JOB_QUEUED
+        self.progress = 0
+        self.message = '排队等待处理...'
+        self.error = None
+        self.output_files = []
+        self.download_all_file = None
+        self.profile = None  # 各阶段耗时、CPU时间和内存峰值（任务结束时记录）
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # 每次更新递增版本号并通知等待者（用于推送进度事件）
+        self.version = 0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    @property
+    def is_finished(self):
+        return self.state in (JOB_COMPLETED, JOB_FAILED)
+
+    def update(self, **fields):
+        """更新任务字段并通知等待更新的线程"""
+        with self._changed:
+            for name, value in fields.items():
+                if not hasattr(self, name):
+                    raise AttributeError(f"未知的任务字段: {name}")
+                setattr(self, name, value)
+            self.version += 1
+            self._changed.notify_all()
+
+    def wait_for_update(self, version, timeout=None):
+        """等待任务版本号不同于 version（或超时），返回当前版本号"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def to_dict(self):
+        """任务状态（兼容原 processing_status 的字段）"""
+        with self._lock:
+            return {
+                'job_id': self.job_id,
+                'state': self.state,
+                'is_processing': not self.is_finished,
+                'progress': self.progress,
+                'message': self.message,
+                'error': self.error,
+                'output_files': list(self.output_files),
+                'download_all_file': self.download_all_file,
+                'profile': self.profile,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+            }
+
+
+class JobManager:
+    """任务管理器：有界工作线程池 + 先进先出的有界队列
+
+    Args:
+        max_workers: 同时处理的任务数
+        max_queue: 排队任务数上限，队列满时 submit 抛出 QueueFullError
+        max_history: 保留的已完成任务数（超过时淘汰最早完成的任务记录，并删除其输出目录）
+        default_retry_after: 尚无完成任务可供估算时建议的重试等待秒数
+    """
+
+    def __init__(self, max_workers=2, max_queue=20, max_history=200, default_retry_after=30):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max_queue
+        self.max_history = max_history
+        self.default_retry_after = default_retry_after
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs = collections.OrderedDict()
+        self._pending = collections.deque()  # 排队中的任务ID（用于计算排队位置）
+        self._durations = collections.deque(maxlen=20)  # 最近任务耗时（用于估算重试时间）
+        self._lock = threading.Lock()
+        self._workers = []
+
+    def _ensure_workers(self):
+        """首次提交任务时启动工作线程"""
+        if self._workers:
+            return
+        for i in range(self.max_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f'job-worker-{i}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, target, *args, output_dir=None, **kwargs):
+        """提交任务，target(job, *args, **kwargs) 在工作线程中执行
+
+        Returns:
+            Job
+        Raises:
+            QueueFullError: 队列已满
+        """
+        job = Job(uuid.uuid4().hex, output_dir=output_dir)
+        with self._lock:
+            self._ensure_workers()
+            try:
+                self._queue.put_nowait((job, target, args, kwargs))
+            except queue.Full:
+                raise QueueFullError(self.estimate_retry_after()) from None
+            self._jobs[job.job_id] = job
+            self._pending.append(job.job_id)
+            pruned = self._prune_history()
+        # 在锁外删除被淘汰任务的输出文件，避免磁盘占用随运行时间无限增长
+        for old_job in pruned:
+            if old_job.output_dir:
+                shutil.rmtree(old_job.output_dir, ignore_errors=True)
+        return job
+
+    def get(self, job_id):
+        """按ID获取任务，不存在时返回 None"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def queue_position(self, job):
+        """任务在队列中的位置（1表示下一个处理），未排队时返回 0"""
+        with self._lock:
+            try:
+                return self._pending.index(job.job_id) + 1
+            except ValueError:
+                return 0
+
+    def status(self, job):
+        """任务状态字典（含排队位置）"""
+        status = job.to_dict()
+        status['queue_position'] = self.queue_position(job)
+        return status
+
+    def estimate_retry_after(self):
+        """按最近任务平均耗时估算队列空出位置所需的秒数"""
+        if not self._durations:
+            return self.default_retry_after
+        average = sum(self._durations) / len(self._durations)
+        return max(1, math.ceil(average / self.max_workers))
+
+    def _prune_history(self):
+        """淘汰最早完成的任务记录（调用方持有锁），返回被淘汰的任务"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.is_finished]
+        return [self._jobs.pop(job_id) for job_id in finished[:max(0, len(self._jobs) - self.max_history)]]
+
+    def _worker_loop(self):
+        while True:
+            job, target, args, kwargs = self._queue.get()
+            with self._lock:
+                self._pending.remove(job.job_id)
+                # 排队位置变化，通知仍在排队的任务
+                waiting = [self._jobs[job_id] for job_id in self._pending if job_id in self._jobs]
+            for waiting_job in waiting:
+                waiting_job.update()
+            job.update(state=JOB_RUNNING, started_at=time.time(), message='开始处理...')
+            try:
+                target(job, *args, **kwargs)
+                final_fields = {'state': JOB_FAILED if job.error else JOB_COMPLETED}
+            except Exception as e:
+                final_fields = {'state': JOB_FAILED, 'error': f'处理过程中出现错误: {str(e)}', 'progress': 0}
+            job.update(finished_at=time.time(), **final_fields)
+            with self._lock:
+                self._durations.append(job.finished_at - job.started_at)
+            self._queue.task_done()
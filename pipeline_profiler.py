@@ -0,0 +1,142 @@
+import threading
+import time
+import tracemalloc
+
+# 统计内存的 StageProfiler 共用 tracemalloc，最后一个结束时才停止跟踪
+_tracing_lock = threading.Lock()
+_tracing_profilers = []
+_tracing_started_here = False
+
+
+def _observe_memory_peak():
+    """读取峰值并计入所有统计中的 profiler 后重置峰值，返回当前占用（调用方持有锁）
+
+    tracemalloc 只有一个全局峰值，嵌套（如整体运行和其中的科目）或同时运行的 profiler
+    在重置前先把峰值记到每个 profiler 的当前阶段，互不丢失。
+    """
+    current, peak = tracemalloc.get_traced_memory()
+    for profiler in _tracing_profilers:
+        profiler._stage_peak = max(profiler._stage_peak, peak)
+    tracemalloc.reset_peak()
+    return current
+
+
+class StageProfiler:
+    """按阶段统计耗时、CPU时间和内存峰值
+
+    每次 mark(stage) 结束从上一次 mark（或 start）开始的区间并计入该阶段，
+    同名阶段多次 mark 时累加耗时、取最大内存峰值。CPU时间为当前线程的CPU时间；
+    内存峰值为阶段内 tracemalloc 跟踪到的峰值减去阶段开始时的占用（多个任务同时运行时为进程级峰值）。
+
+    Args:
+        track_memory: 是否用 tracemalloc 统计内存峰值（会使内存分配变慢，默认关闭）
+    """
+
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.stages = {}
+        self._running = False
+
+    def start(self):
+        global _tracing_started_here
+        self._peak_memory = 0
+        if self.track_memory:
+            with _tracing_lock:
+                if not _tracing_profilers and not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    _tracing_started_here = True
+                self._last_memory = self._start_memory = self._stage_peak = _observe_memory_peak()
+                _tracing_profilers.append(self)
+        self._start_wall = self._last_wall = time.perf_counter()
+        self._start_cpu = self._last_cpu = time.thread_time()
+        self._running = True
+        return self
+
+    def mark(self, stage):
+        """结束当前阶段区间并计入 stage"""
+        if not self._running:
+            return
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        peak = None
+        if self.track_memory:
+            with _tracing_lock:
+                current = _observe_memory_peak()
+                peak = max(0, self._stage_peak - self._last_memory)
+                self._peak_memory = max(self._peak_memory, self._stage_peak - self._start_memory)
+                self._last_memory = self._stage_peak = current
+
+        stats = self.stages.setdefault(stage, {'stage': stage, 'wall_time': 0.0, 'cpu_time': 0.0,
+                                               'peak_memory': peak})
+        stats['wall_time'] += wall - self._last_wall
+        stats['cpu_time'] += cpu - self._last_cpu
+        if peak is not None:
+            stats['peak_memory'] = max(stats['peak_memory'], peak)
+
+        self._last_wall = wall
+        self._last_cpu = cpu
+
+    def stop(self):
+        """停止统计（未 mark 的区间不计入任何阶段）"""
+        global _tracing_started_here
+        if not self._running:
+            return self
+        self._total_wall = time.perf_counter() - self._start_wall
+        self._total_cpu = time.thread_time() - self._start_cpu
+        self._running = False
+        if self.track_memory:
+            with _tracing_lock:
+                _observe_memory_peak()
+                self._peak_memory = max(self._peak_memory, self._stage_peak - self._start_memory)
+                _tracing_profilers.remove(self)
+                if not _tracing_profilers and _tracing_started_here:
+                    tracemalloc.stop()
+                    _tracing_started_here = False
+        return self
+
+    def to_dict(self):
+        """统计结果：{'stages': [各阶段], 'wall_time', 'cpu_time', 'peak_memory'}（时间单位秒，内存单位字节）"""
+        if self._running:
+            wall = time.perf_counter() - self._start_wall
+            cpu = time.thread_time() - self._start_cpu
+        else:
+            wall, cpu = self._total_wall, self._total_cpu
+        return {
+            'stages': [dict(stats) for stats in self.stages.values()],
+            'wall_time': wall,
+            'cpu_time': cpu,
+            'peak_memory': self._peak_memory if self.track_memory else None,
+        }
+
+
+def _format_memory(peak_memory):
+    if peak_memory is None:
+        return '-'
+    return f'{peak_memory / (1024 * 1024):.1f}MB'
+
+
+def _format_stage_rows(stages, labels, indent):
+    lines = []
+    for stats in stages:
+        label = labels.get(stats['stage'], stats['stage'])
+        lines.append(f"{indent}{label:<10s} 耗时 {stats['wall_time']:8.3f}s  CPU {stats['cpu_time']:8.3f}s  "
+                     f"内存峰值 {_format_memory(stats['peak_memory'])}")
+    return lines
+
+
+def format_profile(profile, labels=None):
+    """把统计结果格式化为多行文本（含各科目的阶段统计）
+
+    Args:
+        profile: StageProfiler.to_dict() 的结果，可包含 'subjects': {科目: 科目统计}
+        labels: {阶段: 显示名称}
+    """
+    labels = labels or {}
+    lines = [f"总耗时 {profile['wall_time']:.3f}s  CPU {profile['cpu_time']:.3f}s  "
+             f"内存峰值 {_format_memory(profile['peak_memory'])}"]
+    lines.extend(_format_stage_rows(profile['stages'], labels, '  '))
+    for subject, subject_profile in profile.get('subjects', {}).items():
+        lines.append(f"  {subject}: 耗时 {subject_profile['wall_time']:.3f}s  CPU {subject_profile['cpu_time']:.3f}s  "
+                     f"内存峰值 {_format_memory(subject_profile['peak_memory'])}")
+        lines.extend(_format_stage_rows(subject_profile['stages'], labels, '    '))
+    return '\n'.join(lines)
@@ -0,0 +1,136 @@
+"""
+参考计算实现：按赋分规则逐行直接计算排名和得分，不做任何性能优化
+
+只用于等价性对照（engine_equivalence.py），与 process_single_subject 保持相同的规则：
+排名为 method='min'（并列取最小名次），低分率排除金山中学，总分和综合得分保留两位小数。
+
+加权总分和综合得分保持最初的基线规则（浮点加权后 round(2)，综合得分只支持1~4次考试），不随当前实现的
+有意改动修改；当前实现与基线规则的差异由 engine_equivalence.INTENDED_DIFFERENCES 逐单元格核实。
+"""
+
+import numpy as np
+import pandas as pd
+
+from column_resolver import ColumnResolver
+from scoring_engine import (FIXED_INTERVALS, FIXED_SMALL_COHORT_INTERVALS, FIXED_SMALL_COHORT_SIZE, JINSHAN_SCHOOL,
+                            SCORING_METHOD_CUSTOM, SCORING_METHOD_FIXED, generate_scoring_intervals)
+
+# 各教育阶段的指标和权重
+REFERENCE_EDUCATION_CONFIGS = {
+    'middle': (['平均分', '优秀率', '优良率', '合格率', '低分率'], [0.3, 0.2, 0.2, 0.2, 0.1]),
+    'primary': (['平均分', '优秀率', '合格率', '低分率'], [0.5, 0.2, 0.2, 0.1]),
+}
+
+# 按考试次数确定的综合得分权重
+REFERENCE_COMPREHENSIVE_WEIGHTS = {
+    1: [1.0],
+    2: [0.4, 0.6],
+    3: [0.4, 0.3, 0.3],
+    4: [0.4, 0.2, 0.2, 0.2],
+}
+
+
+def reference_ranks(values, ascending, participants):
+    """排名 = 1 + 严格优于自己的参与者个数（并列取最小名次），空值和未参与者为 NaN"""
+    values = np.asarray(values, dtype=float)
+    valid = participants & ~np.isnan(values)
+    ranks = np.full(len(values), np.nan)
+    pool = values[valid]
+    for i in np.flatnonzero(valid):
+        better = pool < values[i] if ascending else pool > values[i]
+        ranks[i] = 1 + np.count_nonzero(better)
+    return ranks
+
+
+def reference_score(rank, is_jinshan, intervals):
+    """逐个区间查找排名所在的区间，不在任何区间内（含空值）得0分"""
+    for start, end, regular_score, jinshan_score in intervals:
+        if start <= rank <= end:
+            return jinshan_score if is_jinshan else regular_score
+    return 0.0
+
+
+def reference_intervals(total_count, scoring_method='percentage', scoring_table=None):
+    """赋分区间：固定区间直接使用原始排名表（结束排名为None时到最后一名，reference_score 逐个区间查找），
+    百分比区间按比例换算"""
+    if scoring_method == SCORING_METHOD_FIXED:
+        table = FIXED_SMALL_COHORT_INTERVALS if total_count <= FIXED_SMALL_COHORT_SIZE else FIXED_INTERVALS
+        return [(start, total_count if end is None else end, regular, jinshan)
+                for start, end, regular, jinshan in table]
+    if scoring_method == SCORING_METHOD_CUSTOM:
+        return generate_scoring_intervals(total_count, [tuple(row) for row in scoring_table])
+    return generate_scoring_intervals(total_count)
+
+
+def _rank_and_score(df, column, metric_name, intervals):
+    jinshan = (df['学校名称'] == JINSHAN_SCHOOL).to_numpy()
+    exclude_jinshan = '低分率' in metric_name
+    participants = ~jinshan if exclude_jinshan else np.ones(len(df), dtype=bool)
+    ranks = reference_ranks(df[column], '低分率' in metric_name, participants)
+    scores = [0.0 if exclude_jinshan and is_jinshan else reference_score(rank, is_jinshan, intervals)
+              for rank, is_jinshan in zip(ranks, jinshan)]
+    return pd.Series(ranks, index=df.index), pd.Series(scores, index=df.index, dtype=float)
+
+
+def _weighted_total(df, score_cols, weights):
+    total = 0
+    for score_col, weight in zip(score_cols, weights):
+        total += df[score_col] * weight
+    return total.round(2)
+
+
+def reference_score_subject(df, subject, exam_names, education_level='middle', scoring_method='percentage',
+                            scoring_table=None):
+    """按参考实现计算一个科目的全部排名/得分/总分/综合得分列
+
+    Args:
+        df: 已清洗的科目数据
+        subject: 科目名称
+        exam_names: 按计算顺序排列的考试名称（第 i 次考试的后缀序号为 i+1）
+        education_level: 'middle' 或 'primary'
+        scoring_method: 'percentage'、'fixed' 或 'custom'（使用 scoring_table）
+
+    Returns:
+        添加了结果列的 DataFrame 副本
+    """
+    df = df.copy()
+    metrics, weights = REFERENCE_EDUCATION_CONFIGS.get(education_level, REFERENCE_EDUCATION_CONFIGS['middle'])
+    intervals = reference_intervals(len(df), scoring_method, scoring_table)
+    resolver = ColumnResolver(df.columns)
+    total_cols = []
+
+    for i, exam in enumerate(exam_names):
+        score_cols = []
+        for metric_name in metrics:
+            column = resolver.resolve(exam, subject, metric_name, i + 1)
+            if column is None:
+                continue
+            if i == 0:
+                value_col = column
+                prefix = f'{exam}_{metric_name}_'
+            else:
+                previous_exam = exam_names[i - 1]
+                previous_column = resolver.resolve(previous_exam, subject, metric_name, i)
+                if previous_column is None:
+                    continue
+                value_col = f'{previous_exam}-{exam}_{metric_name}_差值'
+                df[value_col] = df[previous_column] - df[column]
+                prefix = f'{value_col}'
+            if df[value_col].notna().sum() == 0:
+                continue
+            rank_col, score_col = f'{prefix}排名', f'{prefix}得分'
+            df[rank_col], df[score_col] = _rank_and_score(df, value_col, metric_name, intervals)
+            score_cols.append(score_col)
+        if len(score_cols) == len(weights):
+            total_col = f'{exam}_{subject}总分'
+            df[total_col] = _weighted_total(df, score_cols, weights)
+            total_cols.append(total_col)
+
+    comprehensive_col = f'{subject}综合得分'
+    if len(total_cols) in REFERENCE_COMPREHENSIVE_WEIGHTS:
+        df[comprehensive_col] = _weighted_total(df, total_cols, REFERENCE_COMPREHENSIVE_WEIGHTS[len(total_cols)])
+    else:
+        df[comprehensive_col] = 0.0
+    participants = np.ones(len(df), dtype=bool)
+    df[f'{subject}综合排名'] = reference_ranks(df[comprehensive_col], False, participants)
+    return df
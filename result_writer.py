@@ -0,0 +1,119 @@
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
+# 列名包含关键词时使用的数字格式（按顺序匹配第一个）
+COLUMN_NUMBER_FORMATS = [
+    ('排名', '0'),
+    ('得分', '0.00'),
+    ('总分', '0.00'),
+]
+
+# 汇总工作簿中教师汇总工作表的名称
+TEACHER_SUMMARY_SHEET = '教师汇总'
+
+# 教师汇总工作表中从各科目结果复制的基本信息列
+SUMMARY_INFO_COLUMNS = ['学校代码', '学校名称', '班别']
+
+# 每次转换写入的行数（避免一次性把整个表转换为Python对象）
+ROW_CHUNK_SIZE = 5000
+
+# 表头样式与 DataFrame.to_excel 一致：加粗、细边框、居中
+_THIN_SIDE = Side(style='thin')
+_HEADER_FONT = Font(bold=True)
+_HEADER_BORDER = Border(left=_THIN_SIDE, right=_THIN_SIDE, top=_THIN_SIDE, bottom=_THIN_SIDE)
+_HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='top')
+
+
+def column_number_format(column_name):
+    """列的数字格式，不需要特殊格式时返回 None"""
+    if not isinstance(column_name, str):
+        return None
+    for keyword, number_format in COLUMN_NUMBER_FORMATS:
+        if keyword in column_name:
+            return number_format
+    return None
+
+
+def _write_sheet(worksheet, df):
+    """逐行写入一个工作表"""
+    header = []
+    for column in df.columns:
+        cell = WriteOnlyCell(worksheet, value=str(column))
+        cell.font = _HEADER_FONT
+        cell.border = _HEADER_BORDER
+        cell.alignment = _HEADER_ALIGNMENT
+        header.append(cell)
+    worksheet.append(header)
+
+    # 每个需要数字格式的列只构造一个带格式的单元格，逐行复用：
+    # 只写模式下 append 会立即序列化整行，单元格对象可以在下一行继续使用
+    styled_cells = []
+    for i, column in enumerate(df.columns):
+        number_format = column_number_format(column)
+        if number_format is not None:
+            cell = WriteOnlyCell(worksheet)
+            cell.number_format = number_format
+            styled_cells.append((i, cell))
+
+    for start in range(0, len(df), ROW_CHUNK_SIZE):
+        values = df.iloc[start:start + ROW_CHUNK_SIZE].to_numpy(dtype=object)
+        if not values.flags.writeable:
+            # 只有一个对象列块时 to_numpy 返回只读视图
+            values = values.copy()
+        values[pd.isna(values)] = None  # 空值写为空单元格
+        for row in values.tolist():
+            for i, cell in styled_cells:
+                if row[i] is not None:
+                    cell.value = row[i]
+                    row[i] = cell
+            worksheet.append(row)
+
+
+def write_result_workbook(output_file, sheets):
+    """以只写模式流式写出结果工作簿（内存占用与行数无关）
+
+    Args:
+        output_file: 输出文件路径
+        sheets: DataFrame（写入 Sheet1）或 {工作表名: DataFrame}
+    """
+    if isinstance(sheets, pd.DataFrame):
+        sheets = {'Sheet1': sheets}
+
+    workbook = Workbook(write_only=True)
+    for sheet_name, df in sheets.items():
+        _write_sheet(workbook.create_sheet(title=sheet_name), df)
+    workbook.save(output_file)
+    return output_file
+
+
+def build_teacher_summary(results):
+    """跨科目教师汇总：每个科目每个班级一行，包含科任教师、综合得分和综合排名
+
+    Args:
+        results: {科目: 结果DataFrame}
+    """
+    frames = []
+    for subject, df in results.items():
+        summary = pd.DataFrame(index=df.index)
+        teacher_col = f'{subject}科任'
+        summary['教师'] = df[teacher_col] if teacher_col in df.columns else None
+        summary['科目'] = subject
+        for column in SUMMARY_INFO_COLUMNS:
+            summary[column] = df[column] if column in df.columns else None
+        summary['综合得分'] = df.get(f'{subject}综合得分')
+        summary['综合排名'] = df.get(f'{subject}综合排名')
+        frames.append(summary.sort_values('综合排名', kind='stable'))
+
+    columns = ['教师', '科目'] + SUMMARY_INFO_COLUMNS + ['综合得分', '综合排名']
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)[columns]
+
+
+def write_consolidated_workbook(output_file, results):
+    """写出汇总工作簿：教师汇总工作表在前，随后每个科目一个工作表"""
+    sheets = {TEACHER_SUMMARY_SHEET: build_teacher_summary(results)}
+    sheets.update(results)
+    return write_result_workbook(output_file, sheets)
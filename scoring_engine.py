@@ -0,0 +1,412 @@
+from fractions import Fraction
+from functools import lru_cache
+from math import lcm
+
+import numpy as np
+
+# 金山中学使用单独的赋分表（低分率指标不参与排名）
+JINSHAN_SCHOOL = '金山中学'
+
+# 统一的百分比赋分规则
+# 百分比区间：10%, 14%, 16%, 20%, 16%, 14%, 10%
+# 对应赋分：8/8.9, 6/6.9, 5/5.9, 4/4.9, 3/3.9, 2/2.9, 0/0
+PERCENTAGE_INTERVALS = [
+    (0, 0.10, 8, 8.9),      # 前10%
+    (0.10, 0.24, 6, 6.9),   # 10%-24%
+    (0.24, 0.40, 5, 5.9),   # 24%-40%
+    (0.40, 0.60, 4, 4.9),   # 40%-60%
+    (0.60, 0.76, 3, 3.9),   # 60%-76%
+    (0.76, 0.90, 2, 2.9),   # 76%-90%
+    (0.90, 1.00, 0, 0)      # 90%-100%
+]
+
+# 固定区间赋分（原始176人规则）：[(开始排名, 结束排名, 常规赋分, 金山赋分)]，结束排名为None表示直到最后一名
+FIXED_INTERVALS = [
+    (1, 18, 8, 8.9),
+    (19, 43, 6, 6.9),
+    (44, 71, 5, 5.9),
+    (72, 106, 4, 4.9),
+    (107, 134, 3, 3.9),
+    (135, 159, 2, 2.9),
+    (160, None, 0, 0)
+]
+
+# 总人数不超过 FIXED_SMALL_COHORT_SIZE 时使用的小规模固定区间
+FIXED_SMALL_COHORT_SIZE = 20
+FIXED_SMALL_COHORT_INTERVALS = [
+    (1, 3, 8, 8.9),
+    (4, 7, 6, 6.9),
+    (8, 12, 5, 5.9),
+    (13, 18, 4, 4.9),
+    (19, 25, 3, 3.9),
+    (26, 30, 2, 2.9),
+    (31, None, 0, 0)
+]
+
+# 内置赋分方式：percentage 统一百分比区间（默认）、fixed 固定176人区间（不超过20人时用小规模区间）、
+# small_cohort 始终使用小规模固定区间、custom 自定义百分比赋分表
+SCORING_METHOD_PERCENTAGE = 'percentage'
+SCORING_METHOD_FIXED = 'fixed'
+SCORING_METHOD_SMALL_COHORT = 'small_cohort'
+SCORING_METHOD_CUSTOM = 'custom'
+SCORING_METHODS = [SCORING_METHOD_PERCENTAGE, SCORING_METHOD_FIXED, SCORING_METHOD_SMALL_COHORT,
+                   SCORING_METHOD_CUSTOM]
+DEFAULT_SCORING_METHOD = SCORING_METHOD_PERCENTAGE
+
+# 定点分数：得分、总分和综合得分以百分之一分为单位的整数（int64）计算和排名，输出时才换算为小数
+SCORE_SCALE = 100
+
+# 浮点矩阵乘法结果仍为精确整数的上限（float64 尾数53位）
+_EXACT_FLOAT_LIMIT = 2 ** 53
+
+# 编译后的排名→赋分查找表缓存条目数（按 赋分方式, 赋分表, 总人数 区分）
+SCORE_TABLE_CACHE_SIZE = 256
+
+
+def generate_scoring_intervals(total_count, percentage_intervals=PERCENTAGE_INTERVALS):
+    """根据总人数生成赋分区间，使用四舍五入法，确保无重叠
+
+    Returns:
+        [(开始排名, 结束排名, 常规赋分, 金山赋分), ...]，区间首尾相接
+    """
+    intervals = []
+    current_start = 1
+
+    for start_pct, end_pct, regular_score, jinshan_score in percentage_intervals:
+        # 计算区间长度（人数）
+        interval_length = round((end_pct - start_pct) * total_count)
+
+        # 确保区间至少包含1个人
+        if interval_length < 1:
+            interval_length = 1
+
+        # 计算结束排名
+        end_rank = current_start + interval_length - 1
+
+        # 确保结束排名不超过总人数
+        if end_rank > total_count:
+            end_rank = total_count
+
+        intervals.append((current_start, end_rank, regular_score, jinshan_score))
+
+        # 下一个区间的开始排名是当前区间结束排名+1
+        current_start = end_rank + 1
+
+        # 如果已经覆盖了所有人数，退出循环
+        if current_start > total_count:
+            break
+
+    return intervals
+
+
+def generate_fixed_intervals(total_count, table=None):
+    """固定区间赋分：按排名区间赋分，截断到总人数，去掉超出总人数的区间
+
+    Args:
+        table: 固定排名区间，默认按总人数选择176人规则或小规模区间
+
+    Returns:
+        与 generate_scoring_intervals 格式相同的首尾相接区间
+    """
+    if table is None:
+        table = FIXED_SMALL_COHORT_INTERVALS if total_count <= FIXED_SMALL_COHORT_SIZE else FIXED_INTERVALS
+    intervals = []
+    for start, end, regular_score, jinshan_score in table:
+        if start > total_count:
+            break
+        end = total_count if end is None else min(end, total_count)
+        intervals.append((start, end, regular_score, jinshan_score))
+    return intervals
+
+
+def validate_scoring_table(scoring_table):
+    """检查自定义百分比赋分表：比例从0开始、首尾相接、到1结束，赋分为数值
+
+    Returns:
+        [(开始比例, 结束比例, 常规赋分, 金山赋分)]
+
+    Raises:
+        ValueError: 赋分表格式不正确
+    """
+    if not scoring_table:
+        raise ValueError("自定义赋分方式需要提供赋分表")
+    table = []
+    previous_end = 0.0
+    for row in scoring_table:
+        try:
+            start_pct, end_pct, regular_score, jinshan_score = (float(value) for value in row)
+        except (TypeError, ValueError):
+            raise ValueError(f"赋分表的每一行应为 [开始比例, 结束比例, 常规赋分, 金山赋分]: {row}")
+        if abs(start_pct - previous_end) > 1e-9 or end_pct <= start_pct:
+            raise ValueError(f"赋分表的比例区间应从0开始首尾相接且递增: {row}")
+        table.append((start_pct, end_pct, regular_score, jinshan_score))
+        previous_end = end_pct
+    if abs(previous_end - 1.0) > 1e-9:
+        raise ValueError(f"赋分表的比例区间应到1结束，当前到 {previous_end}")
+    return table
+
+
+def _percentage_rule(total_count, scoring_table):
+    return generate_scoring_intervals(total_count)
+
+
+def _fixed_rule(total_count, scoring_table):
+    return generate_fixed_intervals(total_count)
+
+
+def _small_cohort_rule(total_count, scoring_table):
+    return generate_fixed_intervals(total_count, FIXED_SMALL_COHORT_INTERVALS)
+
+
+def _custom_rule(total_count, scoring_table):
+    return generate_scoring_intervals(total_count, validate_scoring_table(scoring_table))
+
+
+# 赋分规则注册表：赋分方式 -> rule(总人数, 自定义赋分表) -> 首尾相接的排名区间
+SCORING_RULES = {
+    SCORING_METHOD_PERCENTAGE: _percentage_rule,
+    SCORING_METHOD_FIXED: _fixed_rule,
+    SCORING_METHOD_SMALL_COHORT: _small_cohort_rule,
+    SCORING_METHOD_CUSTOM: _custom_rule,
+}
+
+
+def register_scoring_rule(name, rule):
+    """注册赋分方式
+
+    Args:
+        name: 赋分方式名称（已存在时覆盖）
+        rule: 百分比赋分表（格式同 PERCENTAGE_INTERVALS），或 rule(总人数, 自定义赋分表) -> 排名区间
+    """
+    if not callable(rule):
+        table = validate_scoring_table(rule)
+
+        def rule(total_count, scoring_table):
+            return generate_scoring_intervals(total_count, table)
+    SCORING_RULES[name] = rule
+    # 同名规则的旧查找表失效
+    _compile_score_table.cache_clear()
+
+
+def validate_scoring_method(scoring_method, scoring_table=None):
+    """检查赋分方式（自定义时同时检查赋分表），不支持时抛出 ValueError"""
+    if scoring_method not in SCORING_RULES:
+        raise ValueError(f"不支持的赋分方式: {scoring_method}，可选: {list(SCORING_RULES)}")
+    if scoring_method == SCORING_METHOD_CUSTOM:
+        validate_scoring_table(scoring_table)
+
+
+def build_scoring_intervals(total_count, scoring_method=DEFAULT_SCORING_METHOD, scoring_table=None):
+    """按赋分方式生成排名赋分区间（首尾相接，assign_scores 和 ScoreTable 都使用这种区间）
+
+    Args:
+        total_count: 参与排名的总人数（班级数）
+        scoring_method: SCORING_RULES 中的赋分方式
+        scoring_table: 自定义百分比赋分表（scoring_method 为 custom 时使用），格式同 PERCENTAGE_INTERVALS
+    """
+    validate_scoring_method(scoring_method, scoring_table)
+    return SCORING_RULES[scoring_method](total_count, scoring_table)
+
+
+def to_score_units(scores):
+    """小数得分 → 以百分之一分为单位的 int64 定点得分（空值按0分）"""
+    scores = np.nan_to_num(np.asarray(scores, dtype=float))
+    return np.rint(scores * SCORE_SCALE).astype(np.int64)
+
+
+def from_score_units(units):
+    """定点得分 → 小数得分（与 round(2) 后的浮点数相同），只在输出时换算"""
+    return np.asarray(units, dtype=np.int64) / SCORE_SCALE
+
+
+def weight_fractions(weights):
+    """权重 → 精确分数：小数按其十进制写法换算（0.3 即 3/10），Fraction 原样保留"""
+    return [weight if isinstance(weight, Fraction) else Fraction(repr(float(weight))) for weight in weights]
+
+
+def weight_matrix(weight_vectors):
+    """多组权重 → 整数权重矩阵
+
+    Args:
+        weight_vectors: 多组等长的权重，每组一列
+
+    Returns:
+        (numerators, denominators)：numerators 为 (项数, 组数) 的 int64 矩阵，
+        第 j 组权重 = numerators[:, j] / denominators[j]
+    """
+    fractions = [weight_fractions(weights) for weights in weight_vectors]
+    if len({len(weights) for weights in fractions}) > 1:
+        raise ValueError(f"各组权重的项数不一致: {[len(weights) for weights in fractions]}")
+    denominators = [lcm(*(weight.denominator for weight in weights)) for weights in fractions]
+    numerators = [[int(weight * denominator) for weight in weights]
+                  for weights, denominator in zip(fractions, denominators)]
+    return np.array(numerators, dtype=np.int64).reshape(len(fractions), -1).T, np.array(denominators, dtype=np.int64)
+
+
+def weighted_totals_units(score_units, weight_vectors):
+    """定点加权和（矩阵形式）：(班级, 项) 得分矩阵乘 (项, 组) 整数权重矩阵，一次算出所有组的加权和
+
+    各组权重换算为整数分子和公共分母，乘积在浮点矩阵乘法（BLAS）中保持精确整数，
+    再按四舍五入（.5 进位）除以分母换算回百分之一分，结果与浮点误差无关。
+
+    Args:
+        score_units: (班级数, 项数) 的定点得分矩阵
+        weight_vectors: 多组权重，每组与项数等长（小数或 Fraction）
+
+    Returns:
+        (班级数, 组数) 的 int64 定点加权和
+    """
+    score_units = np.asarray(score_units, dtype=np.int64).reshape(len(score_units), -1)
+    numerators, denominators = weight_matrix(weight_vectors)
+    bound = np.abs(score_units).max(initial=0) * np.abs(numerators).sum(axis=0).max(initial=0)
+    if bound < _EXACT_FLOAT_LIMIT:
+        products = np.rint(score_units.astype(float) @ numerators.astype(float)).astype(np.int64)
+    else:
+        products = score_units @ numerators
+    return (2 * products + denominators) // (2 * denominators)
+
+
+class ScoreTable:
+    """编译后的排名→赋分查找表：按排名直接下标取分，代替逐个区间比较
+
+    regular[rank]、jinshan[rank] 为该名次的常规赋分和金山赋分；下标0对应空值排名（不参与排名的
+    金山中学），最后一个下标对应超出最后一个区间的排名，均为0分，因此排除金山中学的指标可共用同一张表。
+    """
+
+    def __init__(self, intervals, total_count):
+        self.intervals = intervals
+        self.total_count = total_count
+        size = max([total_count] + [end for _, end, _, _ in intervals]) + 2
+        self.regular = np.zeros(size)
+        self.jinshan = np.zeros(size)
+        for start, end, regular_score, jinshan_score in intervals:
+            self.regular[start:end + 1] = regular_score
+            self.jinshan[start:end + 1] = jinshan_score
+        self.regular_units = to_score_units(self.regular)
+        self.jinshan_units = to_score_units(self.jinshan)
+        for array in (self.regular, self.jinshan, self.regular_units, self.jinshan_units):
+            array.flags.writeable = False
+
+    def _positions(self, ranks):
+        ranks = np.asarray(ranks, dtype=float)
+        positions = np.zeros(ranks.shape, dtype=np.intp)
+        valid = ~np.isnan(ranks)
+        positions[valid] = np.clip(np.ceil(ranks[valid]), 1, len(self.regular) - 1)
+        return positions
+
+    def lookup(self, ranks, is_jinshan):
+        """向量化赋分：与 assign_scores 结果一致（非整数排名按向上取整的名次赋分），ranks 可为二维"""
+        positions = self._positions(ranks)
+        return np.where(np.asarray(is_jinshan, dtype=bool), self.jinshan[positions], self.regular[positions])
+
+    def lookup_units(self, ranks, is_jinshan):
+        """同 lookup，返回以百分之一分为单位的 int64 定点得分"""
+        positions = self._positions(ranks)
+        return np.where(np.asarray(is_jinshan, dtype=bool),
+                        self.jinshan_units[positions], self.regular_units[positions])
+
+
+@lru_cache(maxsize=SCORE_TABLE_CACHE_SIZE)
+def _compile_score_table(scoring_method, table_key, total_count):
+    intervals = build_scoring_intervals(total_count, scoring_method, table_key)
+    return ScoreTable(intervals, total_count)
+
+
+def get_score_table(total_count, scoring_method=DEFAULT_SCORING_METHOD, scoring_table=None):
+    """获取编译后的排名→赋分查找表
+
+    每个 (赋分方式, 自定义赋分表, 总人数) 只编译一次（LRU缓存），
+    同一科目的所有指标以及总人数相同的各科目共用同一张表。
+    """
+    validate_scoring_method(scoring_method, scoring_table)
+    table_key = None
+    if scoring_method == SCORING_METHOD_CUSTOM:
+        table_key = tuple(tuple(row) for row in validate_scoring_table(scoring_table))
+    return _compile_score_table(scoring_method, table_key, total_count)
+
+
+def assign_scores(ranks, is_jinshan, intervals):
+    """向量化赋分：一次 searchsorted 将排名映射到赋分
+
+    区间首尾相接，因此第一个结束排名 >= rank 的区间即为所属区间；
+    超出最后一个区间或排名为空值(NaN)时得0分，与逐行扫描区间的结果一致。
+
+    Args:
+        ranks: 排名数组（可含NaN）
+        is_jinshan: 布尔数组，True 表示使用金山中学赋分
+        intervals: generate_scoring_intervals / build_scoring_intervals 生成的区间
+
+    Returns:
+        与 ranks 等长的 float64 得分数组
+    """
+    ranks = np.asarray(ranks, dtype=float)
+    ends = np.array([end for _, end, _, _ in intervals], dtype=float)
+    # 末尾追加0分，对应超出区间或空值的排名
+    regular_scores = np.array([regular for _, _, regular, _ in intervals] + [0], dtype=float)
+    jinshan_scores = np.array([jinshan for _, _, _, jinshan in intervals] + [0], dtype=float)
+
+    positions = np.searchsorted(ends, ranks, side='left')
+    return np.where(np.asarray(is_jinshan, dtype=bool),
+                    jinshan_scores[positions], regular_scores[positions])
+
+
+def batch_min_rank(values, ascending):
+    """按行批量计算排名(method='min')，与逐列 pandas rank(method='min') 一致
+
+    一次 argsort 对每行排序，相同数值取所在并列段的第一个名次；空值(NaN)排名为空值。
+
+    Args:
+        values: 二维数组 (列数, 班级数)，每行为一个参与排名的列
+        ascending: 每行的排序方向（布尔数组或单个布尔值），True 表示越低越好
+
+    Returns:
+        与 values 同形状的 float64 排名数组
+    """
+    values = np.asarray(values, dtype=float)
+    n_rows, n_classes = values.shape
+    ascending = np.broadcast_to(np.asarray(ascending, dtype=bool), (n_rows,))
+    # 统一按升序排序：越高越好的行取相反数（NaN 排在最后）
+    keys = np.where(ascending[:, None], values, -values)
+    order = np.argsort(keys, axis=1, kind='stable')
+    sorted_keys = np.take_along_axis(keys, order, axis=1)
+
+    # 并列段的起始位置：与前一个值不同处为新段起点，向后传播得到每个位置所在段的起点
+    is_new = np.ones(sorted_keys.shape, dtype=bool)
+    is_new[:, 1:] = sorted_keys[:, 1:] != sorted_keys[:, :-1]
+    positions = np.where(is_new, np.arange(n_classes), 0)
+    sorted_ranks = (np.maximum.accumulate(positions, axis=1) + 1).astype(float)
+    sorted_ranks[np.isnan(sorted_keys)] = np.nan
+
+    ranks = np.empty_like(sorted_ranks)
+    np.put_along_axis(ranks, order, sorted_ranks, axis=1)
+    return ranks
+
+
+def batch_rank_and_score(values, ascending, exclude_jinshan, jinshan_mask, intervals, units=False):
+    """批量计算多个指标列的排名和赋分：一次排序、一次查表，代替逐列排名赋分
+
+    Args:
+        values: 二维数组 (列数, 班级数)
+        ascending: 每行的排序方向，True 表示越低越好（低分率）
+        exclude_jinshan: 每行是否排除金山中学（排除时金山中学排名为空值、得分为0）
+        jinshan_mask: 布尔数组 (班级数,)，True 表示金山中学
+        intervals: 赋分区间，或 get_score_table 编译好的 ScoreTable
+        units: True 时得分为以百分之一分为单位的 int64 定点得分
+
+    Returns:
+        (ranks, scores) 两个与 values 同形状的数组（排名为 float64）
+    """
+    values = np.array(values, dtype=float)
+    jinshan_mask = np.asarray(jinshan_mask, dtype=bool)
+    exclude_jinshan = np.broadcast_to(np.asarray(exclude_jinshan, dtype=bool), (len(values),))
+    # 被排除的金山中学按空值处理，不占名次
+    values[np.outer(exclude_jinshan, jinshan_mask)] = np.nan
+
+    ranks = batch_min_rank(values, ascending)
+    if isinstance(intervals, ScoreTable):
+        if units:
+            return ranks, intervals.lookup_units(ranks, jinshan_mask)
+        scores = intervals.lookup(ranks, jinshan_mask)
+    else:
+        scores = assign_scores(ranks, np.broadcast_to(jinshan_mask, ranks.shape), intervals)
+    return ranks, to_score_units(scores) if units else scores
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成测试工作簿生成器
+按固定随机种子生成与实际数据结构一致的工作簿：每个科目一个工作表，每行一个班级，
+包含学校/班级/科任教师列和各次考试的五项指标列，可选带空格表头、文本数值等需要清洗的写法
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from column_resolver import EXAM_KEYWORDS, METRIC_SUFFIX_LETTERS
+from result_writer import write_result_workbook
+
+DEFAULT_SUBJECTS = ['语文', '数学', '英语']
+# 默认取考试关键词中的前四次考试（中考、二模、九年上、八年下），即综合得分的最大考试数
+DEFAULT_EXAMS = EXAM_KEYWORDS[:4]
+
+# 考试列名的后缀写法
+SUFFIX_STYLES = {
+    'underscore': '{exam}_{subject}_{metric}_{suffix}',   # 中考_语文_平均分_p1
+    'spaced': '{exam}   {subject}   {metric}   {suffix}',  # 中考   语文   平均分   p1
+    'compact': '{exam}   {subject}   {metric}{suffix}',    # 二模   语文   合格率h2
+}
+# mixed：各次考试轮流使用上面三种写法
+MIXED_STYLE = 'mixed'
+
+# 每个学校的班级数，以及学校名称为“金山中学”的学校（低分率排除规则）
+CLASSES_PER_SCHOOL = 8
+JINSHAN_SCHOOL_INTERVAL = 25
+
+# 需要清洗的写法中文本空值和逗号小数所占比例
+MESSY_NA_RATE = 0.005
+MESSY_COMMA_RATE = 0.005
+
+# 与科目计算无关的附加列（模拟区县汇总表中的其他统计列）的列名
+EXTRA_COLUMN_NAME = '附加统计{index}'
+
+
+def _column_name(exam, subject, metric, exam_index, suffix_style):
+    if suffix_style == MIXED_STYLE:
+        suffix_style = list(SUFFIX_STYLES)[exam_index % len(SUFFIX_STYLES)]
+    suffix = f'{METRIC_SUFFIX_LETTERS[metric]}{exam_index + 1}'
+    return SUFFIX_STYLES[suffix_style].format(exam=exam, subject=subject, metric=metric, suffix=suffix)
+
+
+def _metric_values(metric, n_classes, rng):
+    """指标数值：平均分 40~100，各比率 0~100（百分数）"""
+    if metric == '平均分':
+        return np.round(rng.uniform(40, 100, n_classes), 2)
+    return np.round(rng.uniform(0, 100, n_classes), 1)
+
+
+def _messy_text(values, rng):
+    """把数值写成需要清洗的文本：带百分号，夹杂少量空值标记和逗号小数"""
+    text = np.char.add(values.astype(str), '%').astype(object)
+    text[rng.random(len(values)) < MESSY_NA_RATE] = '#N/A'
+    comma = rng.random(len(values)) < MESSY_COMMA_RATE
+    text[comma] = [f" {value:.1f} ".replace('.', '，') for value in values[comma]]
+    return text
+
+
+def generate_subject_sheet(subject, n_classes, exams=None, suffix_style=MIXED_STYLE, messy=True, rng=None,
+                           extra_columns=0):
+    """生成一个科目工作表
+
+    Args:
+        subject: 科目名称
+        n_classes: 班级数（行数）
+        exams: 考试名称，按计算顺序排列（第 i 次考试的后缀序号为 i+1）
+        suffix_style: SUFFIX_STYLES 中的写法或 'mixed'
+        messy: 是否使用需要清洗的写法（带空格表头、比率列为带百分号的文本）
+        rng: numpy 随机数生成器
+        extra_columns: 追加的无关数值列个数（drop_unused_columns 会丢弃这些列）
+    """
+    if exams is None:
+        exams = DEFAULT_EXAMS
+    if suffix_style != MIXED_STYLE and suffix_style not in SUFFIX_STYLES:
+        raise ValueError(f"不支持的后缀写法: {suffix_style}，可选: {list(SUFFIX_STYLES) + [MIXED_STYLE]}")
+    if rng is None:
+        rng = np.random.default_rng(0)
+
+    schools = np.arange(n_classes) // CLASSES_PER_SCHOOL
+    school_codes = np.char.add('S', np.char.zfill(schools.astype(str), 5))
+    school_names = np.char.add('学校', schools.astype(str)).astype(object)
+    school_names[schools % JINSHAN_SCHOOL_INTERVAL == 0] = '金山中学'
+    data = {
+        '学校   代码' if messy else '学校代码': school_codes,
+        '学校名称': school_names,
+        '班   别' if messy else '班别': np.char.add((np.arange(n_classes) % CLASSES_PER_SCHOOL + 1).astype(str), '班'),
+        f'{subject}科任': np.char.add(f'{subject}老师', np.arange(n_classes).astype(str)),
+    }
+    for exam_index, exam in enumerate(exams):
+        for metric in METRIC_SUFFIX_LETTERS:
+            values = _metric_values(metric, n_classes, rng)
+            if messy and metric != '平均分':
+                values = _messy_text(values, rng)
+            data[_column_name(exam, subject, metric, exam_index, suffix_style)] = values
+    for index in range(extra_columns):
+        data[EXTRA_COLUMN_NAME.format(index=index + 1)] = np.round(rng.uniform(0, 100, n_classes), 1)
+    return pd.DataFrame(data)
+
+
+def generate_workbook(path, n_classes=100, subjects=None, exams=None, suffix_style=MIXED_STYLE,
+                      messy=True, seed=0, extra_columns=0):
+    """生成合成工作簿（相同参数生成的数据相同），另含一个非科目工作表 sheet1
+
+    Returns:
+        path
+    """
+    if subjects is None:
+        subjects = DEFAULT_SUBJECTS
+    rng = np.random.default_rng(seed)
+    sheets = {subject: generate_subject_sheet(subject, n_classes, exams, suffix_style, messy, rng, extra_columns)
+              for subject in subjects}
+    sheets['sheet1'] = pd.DataFrame({'说明': [f'合成数据：{n_classes} 个班级，随机种子 {seed}']})
+    return write_result_workbook(path, sheets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成合成测试工作簿')
+    parser.add_argument('output', help='输出文件路径（.xlsx）')
+    parser.add_argument('--classes', type=int, default=100, help='班级数')
+    parser.add_argument('--subjects', nargs='+', default=DEFAULT_SUBJECTS, help='科目')
+    parser.add_argument('--exams', nargs='+', default=DEFAULT_EXAMS, help='考试（按计算顺序）')
+    parser.add_argument('--suffix-style', default=MIXED_STYLE, choices=list(SUFFIX_STYLES) + [MIXED_STYLE],
+                        help='考试列名写法')
+    parser.add_argument('--clean', action='store_true', help='生成不需要清洗的规范写法')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--extra-columns', type=int, default=0, help='每个科目工作表追加的无关列个数')
+    args = parser.parse_args()
+
+    generate_workbook(args.output, args.classes, args.subjects, args.exams, args.suffix_style,
+                      messy=not args.clean, seed=args.seed, extra_columns=args.extra_columns)
+    print(f"已生成: {args.output}（{args.classes} 个班级 x {len(args.subjects)} 个科目）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试数据清洗报告与日志详细程度
+验证 summary 模式只输出一条汇总记录、quiet 模式不输出日志、报告内容完整
+"""
+
+import logging
+import pandas as pd
+from data_cleaner import CleaningReport, DataCleaner
+
+
+class RecordCollector(logging.Handler):
+    """收集 data_cleaner 输出的日志记录"""
+
+    def __init__(self):
+        super().__init__(level=logging.DEBUG)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def create_test_dataframe():
+    """创建需要表头标准化和数值转换的测试数据"""
+    return pd.DataFrame({
+        '学校   代码': ['001', '002', '003'],
+        '班   别': ['1班', '2班', '3班'],
+        '中考   语文   平均分   p1': ['85.5', '92.3', None],
+        '中考   语文   优秀率   y1': ['25%', '35%', '20%'],
+        '中考_语文_优秀率_y1': ['25%', '35%', '20%'],
+    })
+
+
+def clean_with_records(verbosity):
+    """按指定详细程度清洗，返回 (清洗器, 日志记录)"""
+    cleaner_logger = logging.getLogger('data_cleaner')
+    collector = RecordCollector()
+    original_level = cleaner_logger.level
+    cleaner_logger.addHandler(collector)
+    cleaner_logger.setLevel(logging.INFO)
+    try:
+        cleaner = DataCleaner(verbosity=verbosity)
+        cleaner.clean_dataframe(create_test_dataframe())
+    finally:
+        cleaner_logger.removeHandler(collector)
+        cleaner_logger.setLevel(original_level)
+    return cleaner, collector.records
+
+
+def test_summary_mode_emits_one_record():
+    """测试 summary 模式只输出一条汇总记录"""
+    print("🔍 测试汇总日志...")
+    cleaner, records = clean_with_records('summary')
+    messages = [record.getMessage() for record in records]
+    print(f"  日志记录: {messages}")
+    assert len(records) == 1
+    # 存在重复列名，汇总记录以警告级别输出
+    assert records[0].levelno == logging.WARNING
+    assert '数值列转换 3 个' in messages[0]
+    assert '重复列名 1 个' in messages[0]
+
+
+def test_report_contents():
+    """测试清洗报告收集的事件"""
+    print("🔍 测试清洗报告...")
+    cleaner, _ = clean_with_records('quiet')
+    report = cleaner.report
+    assert isinstance(report, CleaningReport)
+    assert report.original_columns == 5
+    assert report.header_mapping['学校   代码'] == '学校代码'
+    assert report.duplicate_renames == {'中考_语文_优秀率_y1': '中考_语文_优秀率_y1_1'}
+    assert report.numeric_columns == ['中考_语文_平均分_p1', '中考_语文_优秀率_y1', '中考_语文_优秀率_y1_1']
+    assert report.null_values == 1
+    assert len(report.exam_columns) == 3
+    assert report.to_dict()['dtype_changes']['中考_语文_平均分_p1'][1] == 'float64'
+    print(f"  {report}")
+
+
+def test_quiet_and_detailed_modes():
+    """测试 quiet 模式不输出日志，detailed 模式逐项输出"""
+    print("🔍 测试日志详细程度...")
+    _, quiet_records = clean_with_records('quiet')
+    _, detailed_records = clean_with_records('detailed')
+    print(f"  quiet: {len(quiet_records)} 条，detailed: {len(detailed_records)} 条")
+    assert quiet_records == []
+    assert len(detailed_records) > 10
+
+    try:
+        DataCleaner(verbosity='loud')
+        assert False, "应拒绝不支持的日志详细程度"
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    test_summary_mode_emits_one_record()
+    test_report_contents()
+    test_quiet_and_detailed_modes()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试考试列名解析器
+验证结构化解析、查找优先级与原列名探测顺序一致、兼容旧版计算器的列名写法，
+以及表头分类器与原逐关键词/逐同义词扫描结果一致
+"""
+
+import re
+import pandas as pd
+from column_resolver import (ColumnKey, ColumnResolver, EXAM_KEYWORDS, METRIC_SYNONYMS,
+                             classify_header, parse_column_name)
+from calculate_scores import TeacherScoreCalculator
+
+
+def legacy_find_column(columns, exam, subject, metric, suffix_index):
+    """原 process_single_subject 的列名探测逻辑（作为对照）"""
+    possible_col_names = [
+        f'{exam}_{subject}_{metric}_{letter}{suffix_index}' for letter in 'pylhd'
+    ] + [f'{exam}_{subject}_{metric}'] + [
+        f'{exam}   {subject}   {metric}   {letter}{suffix_index}' for letter in 'pylhd'
+    ] + [f'{exam}   {subject}   {metric}']
+    for possible_name in possible_col_names:
+        if possible_name in columns:
+            return possible_name
+    return None
+
+
+def test_parse_column_name():
+    """测试列名结构化解析"""
+    print("🔍 测试列名解析...")
+    cases = {
+        '中考_语文_平均分_p1': ColumnKey('中考', '语文', '平均分', 'p', 1),
+        '中考   语文   平均分   p1': ColumnKey('中考', '语文', '平均分', 'p', 1),
+        '中考   语文   合格率  h1': ColumnKey('中考', '语文', '合格率', 'h', 1),
+        '二模   语文   合格率h2': ColumnKey('二模', '语文', '合格率', 'h', 2),
+        '二模     语文   低分率   d2': ColumnKey('二模', '语文', '低分率', 'd', 2),
+        '七年入_生物_优秀率': ColumnKey('七年入', '生物', '优秀率', None, None),
+        '学校代码': None,
+        '语文科任': None,
+        3: None,
+    }
+    for column, expected in cases.items():
+        parsed = parse_column_name(column)
+        print(f"  {column!r} -> {parsed}")
+        assert parsed == expected
+
+
+def test_resolve_matches_legacy_probe_order():
+    """测试多种写法并存时，查找结果与原探测顺序一致"""
+    print("🔍 测试查找优先级...")
+    column_sets = [
+        ['中考_语文_平均分_p1', '中考   语文   平均分   p1', '中考_语文_平均分'],
+        ['中考   语文   平均分   p1', '中考_语文_平均分'],
+        ['中考   语文   平均分', '中考   语文   平均分   y1'],
+        ['中考_语文_平均分_y1', '中考_语文_平均分_p1'],
+        ['中考_语文_平均分_p2', '中考   语文   平均分'],
+        ['中考_语文_平均分_p2'],
+        ['学校代码', '班别'],
+    ]
+    for columns in column_sets:
+        resolver = ColumnResolver(columns)
+        for suffix_index in [1, 2]:
+            expected = legacy_find_column(columns, '中考', '语文', '平均分', suffix_index)
+            actual = resolver.resolve('中考', '语文', '平均分', suffix_index)
+            print(f"  {columns} 序号{suffix_index}: {actual}")
+            assert actual == expected
+
+
+def test_legacy_calculator_columns():
+    """测试旧版计算器能通过解析器找到空格不一致的列名"""
+    print("🔍 测试旧版计算器列名查找...")
+    quirky_columns = [
+        '二模   语文   平均分   p2',
+        '二模   语文   优秀率   y2',
+        '二模   语文   优良率   l2',
+        '二模   语文   合格率h2',
+        '二模     语文   低分率   d2',
+    ]
+    df = pd.DataFrame(columns=['学校代码', '学校名称', '班别'] + quirky_columns)
+    calculator = TeacherScoreCalculator('unused.xls')
+    suffix_cols, no_suffix_cols = calculator.get_exam_columns('二模', '语文')
+    existing_cols, has_suffix = calculator.find_existing_columns(df, suffix_cols, no_suffix_cols)
+    print(f"  找到的列: {existing_cols}")
+    assert existing_cols == quirky_columns
+    assert has_suffix
+
+
+def legacy_classify(column_name):
+    """原 extract_exam_names 的逐关键词、逐同义词扫描逻辑（作为对照）"""
+    for keyword in EXAM_KEYWORDS:
+        if keyword in column_name:
+            col_processed = re.sub(r'\s+', ' ', column_name.lower().strip())
+            for synonyms in METRIC_SYNONYMS.values():
+                for syn in synonyms:
+                    syn_lower = syn.lower().strip()
+                    if syn_lower in col_processed or syn_lower.replace(' ', '') in col_processed.replace(' ', ''):
+                        return keyword, True
+            return keyword, False
+    return None, False
+
+
+def test_classify_header():
+    """测试表头分类与原扫描逻辑一致"""
+    print("🔍 测试表头分类...")
+    columns = [
+        '中考_语文_平均分_p1', '二模   语文   合格率h2', '九年上_数学_MEAN', '七年入_语文_优 秀',
+        '八年下-中考_语文_差值', '中考_语文_备注', '语文科任', '二模中考_语文_低分率',
+        '七年上_英语_Pass', '六年下_物理_不及格率',
+    ]
+    for column in columns:
+        print(f"  {column!r} -> {classify_header(column)}")
+        assert classify_header(column) == legacy_classify(column)
+
+
+if __name__ == "__main__":
+    test_parse_column_name()
+    test_resolve_matches_legacy_probe_order()
+    test_legacy_calculator_columns()
+    test_classify_header()
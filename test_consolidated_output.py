@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试汇总输出工作簿
+验证教师汇总工作表、汇总工作簿的工作表结构，以及Web处理完成后下载全部直接发送已生成的文件
+"""
+
+import io
+import os
+import tempfile
+import time
+import zipfile
+import pandas as pd
+import web_app
+from result_writer import TEACHER_SUMMARY_SHEET, build_teacher_summary, write_consolidated_workbook
+from workbook_cache import WorkbookCache
+from test_workbook_cache import create_test_workbook
+
+
+def create_subject_result(subject, scores):
+    """创建与计算结果结构一致的科目结果"""
+    df = pd.DataFrame({
+        '学校代码': [f'S00{i}' for i in range(len(scores))],
+        '学校名称': [f'学校{i}' for i in range(len(scores))],
+        '班别': [f'{i + 1}班' for i in range(len(scores))],
+        f'{subject}科任': [f'{subject}老师{i}' for i in range(len(scores))],
+        f'{subject}综合得分': scores,
+    })
+    df[f'{subject}综合排名'] = df[f'{subject}综合得分'].rank(ascending=False, method='min')
+    return df
+
+
+def test_teacher_summary():
+    """测试跨科目教师汇总"""
+    print("🔍 测试教师汇总...")
+    results = {'语文': create_subject_result('语文', [5.0, 8.0, 6.5]),
+               '数学': create_subject_result('数学', [7.0, 3.0])}
+    summary = build_teacher_summary(results)
+    print(summary)
+    assert list(summary.columns) == ['教师', '科目', '学校代码', '学校名称', '班别', '综合得分', '综合排名']
+    assert summary['科目'].tolist() == ['语文', '语文', '语文', '数学', '数学']
+    assert summary['教师'].tolist() == ['语文老师1', '语文老师2', '语文老师0', '数学老师0', '数学老师1']
+    assert summary['综合排名'].tolist() == [1.0, 2.0, 3.0, 1.0, 2.0]
+
+
+def test_consolidated_workbook():
+    """测试汇总工作簿：教师汇总在前，每个科目一个工作表"""
+    print("🔍 测试汇总工作簿...")
+    results = {'语文': create_subject_result('语文', [5.0, 8.0]),
+               '数学': create_subject_result('数学', [7.0, 3.0])}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = write_consolidated_workbook(os.path.join(tmp_dir, 'all.xlsx'), results)
+        sheets = pd.read_excel(path, sheet_name=None)
+    assert list(sheets) == [TEACHER_SUMMARY_SHEET, '语文', '数学']
+    pd.testing.assert_frame_equal(sheets['语文'], results['语文'], check_dtype=False)
+    assert len(sheets[TEACHER_SUMMARY_SHEET]) == 4
+
+
+def run_web_processing(tmp_dir, consolidated):
+    """通过 /process 提交任务并等待完成，返回 (任务状态, 下载全部的响应, 任务输出目录中的文件)"""
+    path = os.path.join(tmp_dir, 'test.xlsx')
+    create_test_workbook(path)
+    output_dir = os.path.join(tmp_dir, 'outputs')
+
+    original_output = web_app.app.config['OUTPUT_FOLDER']
+    original_cache = web_app.workbook_cache
+    web_app.app.config['OUTPUT_FOLDER'] = output_dir
+    web_app.workbook_cache = WorkbookCache(os.path.join(tmp_dir, 'cache'))
+    try:
+        client = web_app.app.test_client()
+        response = client.post('/process', json={'filepath': path, 'subject': '', 'consolidated': consolidated})
+        job_id = response.get_json()['job_id']
+        job = web_app.job_manager.get(job_id)
+        deadline = time.time() + 60
+        while not job.is_finished and time.time() < deadline:
+            time.sleep(0.05)
+        status = client.get(f'/status/{job_id}').get_json()
+        download = client.get(f'/download_all/{job_id}')
+        files = sorted(os.listdir(os.path.join(output_dir, job_id)))
+    finally:
+        web_app.app.config['OUTPUT_FOLDER'] = original_output
+        web_app.workbook_cache = original_cache
+    return status, download, files
+
+
+def test_web_download_all_serves_generated_file():
+    """测试下载全部直接发送处理完成时生成的汇总工作簿或ZIP"""
+    print("🔍 测试Web下载全部...")
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            status, download, files = run_web_processing(tmp_dir, consolidated=True)
+            print(f"  汇总模式输出: {files}")
+            assert status['state'] == 'completed'
+            assert status['error'] is None and status['progress'] == 100
+            assert files == [web_app.CONSOLIDATED_FILENAME]
+            assert status['output_files'] == [web_app.CONSOLIDATED_FILENAME]
+            assert download.status_code == 200
+            assert pd.read_excel(io.BytesIO(download.data), sheet_name=None).keys() == {TEACHER_SUMMARY_SHEET, '语文', '数学'}
+
+            status, download, files = run_web_processing(tmp_dir, consolidated=False)
+            print(f"  单科模式输出: {files}")
+            assert files == sorted(['语文_计算结果.xlsx', '数学_计算结果.xlsx', web_app.ZIP_FILENAME])
+            assert download.status_code == 200
+            with zipfile.ZipFile(io.BytesIO(download.data)) as zipf:
+                assert sorted(zipf.namelist()) == ['数学_计算结果.xlsx', '语文_计算结果.xlsx']
+        finally:
+            os.chdir(original_dir)
+
+
+if __name__ == "__main__":
+    test_teacher_summary()
+    test_consolidated_workbook()
+    test_web_download_all_serves_generated_file()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试数值列批量转换
+验证批量模式与逐列模式结果一致（值、类型、统计），并能清理 pandas 字符串类型的文本数值列
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from data_cleaner import DataCleaner
+
+logging.getLogger('data_cleaner').setLevel(logging.WARNING)
+
+
+def create_test_dataframe():
+    """创建包含多种文本数值写法的测试数据"""
+    return pd.DataFrame({
+        '学校代码': ['001', '002', '003', '004'],
+        '班别': ['1班', '2班', '3班', '4班'],
+        '中考_语文_平均分_p1': ['85.5%', ' 92，3 ', '#N/A', None],
+        '中考_语文_优秀率_y1': [25.5, 30, 'NULL', '12,5%'],
+        '二模   语文   合格率h2': ['90', '85', '-3', '+7'],
+        '二模_语文_低分率_d2': [1.5, 2.0, np.nan, 3.25],
+        '备注   p3': ['abc', '', 'nan', '1e3'],
+        '语文科任': ['老师A', '老师B', '老师C', '老师D'],
+    })
+
+
+def test_batch_matches_per_column():
+    """测试批量转换与逐列转换结果一致"""
+    print("🔍 测试批量转换一致性...")
+    df = create_test_dataframe()
+    per_column, per_column_stats = DataCleaner(batch_mode=False).convert_data_types(df.copy())
+    batch, batch_stats = DataCleaner().convert_data_types(df.copy())
+
+    print(batch.dtypes)
+    pd.testing.assert_frame_equal(per_column, batch, check_exact=True)
+    assert per_column_stats == batch_stats
+    assert batch_stats['numeric_converted'] == 5
+    assert batch['二模   语文   合格率h2'].dtype == 'int64'
+    assert batch['中考_语文_平均分_p1'].tolist()[:2] == [85.5, 92.3]
+    assert batch['学校代码'].tolist() == ['001', '002', '003', '004']
+    print("✅ 结果一致")
+
+
+def test_string_dtype_columns():
+    """测试 pandas 字符串类型的列同样按文本数值清理"""
+    print("🔍 测试字符串类型列...")
+    df = pd.DataFrame({'中考_语文_平均分_p1': pd.array(['25.5%', '3,5', None, 'N/A'], dtype='string')})
+    for batch_mode in [False, True]:
+        result, _ = DataCleaner(batch_mode=batch_mode).convert_data_types(df.copy())
+        values = result['中考_语文_平均分_p1'].tolist()
+        print(f"  batch_mode={batch_mode}: {values}")
+        assert values[:2] == [25.5, 3.5]
+        assert np.isnan(values[2]) and np.isnan(values[3])
+
+
+if __name__ == "__main__":
+    test_batch_matches_per_column()
+    test_string_dtype_columns()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试多场景（初中和小学对比）计算
+验证一次计算同时得到各教育阶段的结果且与分别计算一致、每个指标只排名一次，
+处理所有科目时教育阶段参数不再丢失，以及 /process 的对比模式
+"""
+
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import calculate_scores_final_fix as pipeline
+import web_app
+from calculate_scores_final_fix import calculate_scores_final_fix, process_all_subjects, process_single_subject
+from result_writer import write_result_workbook
+from synthetic_workbook import generate_subject_sheet
+from test_engine_equivalence import create_sheets
+from workbook_cache import WorkbookCache
+from workbook_loader import WorkbookSession
+
+
+def create_test_workbook(path):
+    rng = np.random.default_rng(0)
+    return write_result_workbook(path, {subject: generate_subject_sheet(subject, 30, rng=rng)
+                                        for subject in ('语文', '数学')})
+
+
+def test_scenarios_match_separate_runs():
+    """测试多场景结果与分别按初中、小学计算的结果逐列一致，排名赋分只做一次"""
+    print("🔍 测试多场景计算...")
+    df = create_sheets(200, subjects=('语文',), seed=5)['语文']
+    calls = []
+    original_batch = pipeline.batch_rank_and_score
+
+    def counting_batch(values, *args, **kwargs):
+        calls.append(len(values))
+        return original_batch(values, *args, **kwargs)
+
+    pipeline.batch_rank_and_score = counting_batch
+    try:
+        results = process_single_subject(None, '语文', subject_df=df, cleaned=True, write_output=False,
+                                         education_levels=['middle', 'primary'])
+    finally:
+        pipeline.batch_rank_and_score = original_batch
+    # 第一个考试一次、全部差值一次；按初中指标（包含小学的全部指标）计算
+    print(f"  批量排名: {calls}")
+    assert calls == [5, 15]
+
+    assert list(results) == ['middle', 'primary']
+    for level, result in results.items():
+        expected = process_single_subject(None, '语文', level, subject_df=df, cleaned=True, write_output=False)
+        pd.testing.assert_frame_equal(result, expected)
+    assert not any('优良率_排名' in column for column in results['primary'].columns)
+    assert not results['middle']['语文综合得分'].equals(results['primary']['语文综合得分'])
+
+
+def test_education_level_passed_through():
+    """测试处理所有科目和 calculate_scores_final_fix 使用传入的教育阶段，多场景结果文件每个教育阶段一个工作表"""
+    print("🔍 测试教育阶段参数传递...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = create_test_workbook(os.path.join(tmp_dir, 'test.xlsx'))
+        workbook = WorkbookSession(path)
+        primary = process_all_subjects(path, workbook=workbook, output_pattern=None, education_level='primary')
+        assert set(primary) == {'语文', '数学'}
+        for result in primary.values():
+            assert not any('优良率_排名' in column or '优良率_差值排名' in column for column in result.columns)
+
+        result = calculate_scores_final_fix(path, '语文', 'primary', workbook=workbook, output_pattern=None)
+        pd.testing.assert_frame_equal(result, primary['语文'])
+
+        output_pattern = os.path.join(tmp_dir, '{subject}_结果.xlsx')
+        both = calculate_scores_final_fix(path, None, workbook=workbook, output_pattern=output_pattern,
+                                          education_levels=['middle', 'primary'])
+        pd.testing.assert_frame_equal(both['语文']['primary'], primary['语文'])
+        sheets = pd.read_excel(output_pattern.format(subject='数学'), sheet_name=None)
+        assert list(sheets) == ['初中', '小学']
+
+
+def test_process_compare_mode():
+    """测试 /process 对比模式：每个教育阶段一个汇总工作簿，不支持的教育阶段返回400"""
+    print("🔍 测试 /process 对比模式...")
+    original_output = web_app.app.config['OUTPUT_FOLDER']
+    original_cache = web_app.workbook_cache
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = create_test_workbook(os.path.join(tmp_dir, 'test.xlsx'))
+        output_dir = os.path.join(tmp_dir, 'outputs')
+        web_app.app.config['OUTPUT_FOLDER'] = output_dir
+        web_app.workbook_cache = WorkbookCache(os.path.join(tmp_dir, 'cache'))
+        try:
+            client = web_app.app.test_client()
+            for levels in (['middle', 'unknown'], [], 'middle'):
+                response = client.post('/process', json={'filepath': path, 'education_levels': levels})
+                assert response.status_code == 400
+
+            response = client.post('/process', json={'filepath': path, 'subject': '', 'consolidated': True,
+                                                      'education_levels': ['middle', 'primary']})
+            job = web_app.job_manager.get(response.get_json()['job_id'])
+            deadline = time.time() + 60
+            while not job.is_finished and time.time() < deadline:
+                time.sleep(0.05)
+            files = sorted(os.listdir(os.path.join(output_dir, job.job_id)))
+            primary_summary = pd.read_excel(os.path.join(output_dir, job.job_id, '小学_所有计算结果.xlsx'),
+                                            sheet_name=None)
+        finally:
+            web_app.app.config['OUTPUT_FOLDER'] = original_output
+            web_app.workbook_cache = original_cache
+
+    print(f"  任务状态: {job.state}，输出文件: {files}")
+    assert job.error is None and job.progress == 100
+    assert files == ['初中_所有计算结果.xlsx', '小学_所有计算结果.xlsx', '所有计算结果.zip']
+    assert not any('优良率' in column and '排名' in column for column in primary_summary['语文'].columns)
+
+
+if __name__ == "__main__":
+    test_scenarios_match_separate_runs()
+    test_education_level_passed_through()
+    test_process_compare_mode()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试计算引擎等价性对照
+验证当前实现与参考实现逐单元格一致、规则相同的场景下早期实现与当前实现只有已知的精度差异，
+对照能发现排名方式不同的引擎并报告不一致的列，以及有意差异只接受逐单元格核实通过的单元格
+"""
+
+import numpy as np
+from engine_equivalence import (ENGINES, compare_columns, compare_engines, register_engine,
+                                run_current_engine)
+from synthetic_workbook import DEFAULT_EXAMS, generate_subject_sheet
+from workbook_loader import clean_subject_dataframe
+
+
+def create_sheets(n_classes, subjects=('语文', '数学'), exams=None, seed=0):
+    """生成并清洗科目数据（包含并列值、空值和金山中学）"""
+    rng = np.random.default_rng(seed)
+    return {subject: clean_subject_dataframe(generate_subject_sheet(subject, n_classes, exams, rng=rng),
+                                             verbosity='quiet')
+            for subject in subjects}
+
+
+def test_current_matches_reference():
+    """测试当前实现与参考实现在不同规模下逐单元格一致"""
+    print("🔍 测试当前实现与参考实现...")
+    for n_classes in (15, 176, 400):
+        sheets = create_sheets(n_classes, seed=n_classes)
+        # 整数平均分制造大量并列
+        sheets['数学'][sheets['数学'].columns[4]] = np.round(sheets['数学'][sheets['数学'].columns[4]] / 10)
+        reports = compare_engines(sheets, ('current', 'reference'), f'{n_classes} 班')
+        for report in reports:
+            print(report.summary())
+            assert report.is_equivalent
+            assert len(report.compared_columns) > 40
+
+
+def test_legacy_matches_current_when_rules_coincide():
+    """测试176个班级、无并列、无金山中学时早期实现与当前实现的排名、得分、总分一致，
+    综合排名只因早期实现不保留两位小数（浮点误差打破并列）而不同；有金山中学时报告低分率不一致"""
+    print("🔍 测试早期实现...")
+    sheets = create_sheets(176, subjects=('语文',), exams=DEFAULT_EXAMS[:2], seed=1)
+    df = sheets['语文']
+    rng = np.random.default_rng(1)
+    for i, column in enumerate(df.columns[4:]):
+        # 每列数值互不相同；后一次考试按更大的倍数缩放，两次考试的差值也互不相同
+        df[column] = (rng.permutation(176) + 0.5) * 1000 ** (i // 5)
+    jinshan_rows = df['学校名称'] == '金山中学'
+
+    df.loc[jinshan_rows, '学校名称'] = '其他学校'
+    report, = compare_engines({'语文': df}, ('current', 'legacy'), '176 班')
+    print(report.summary())
+    assert [difference.column for difference in report.differences] == ['语文综合排名']
+    assert len(report.compared_columns) == 24
+
+    df.loc[jinshan_rows, '学校名称'] = '金山中学'
+    report, = compare_engines({'语文': df}, ('current', 'legacy'), '176 班（含金山中学）')
+    print(report.summary())
+    assert not report.is_equivalent
+    # 早期实现的低分率不排除金山中学
+    assert any('低分率_排名' in difference.column for difference in report.differences)
+
+
+def test_detects_different_engine():
+    """测试对照能发现排名方式不同的引擎"""
+    print("🔍 测试发现不一致...")
+
+    def dense_rank_engine(df, subject):
+        result = run_current_engine(df, subject)
+        result[f'{subject}综合排名'] = result[f'{subject}综合得分'].rank(ascending=False, method='dense')
+        return result
+
+    register_engine('dense_rank', dense_rank_engine)
+    try:
+        sheets = create_sheets(60, subjects=('语文',))
+        sheets['语文'].iloc[:10, 4:] = sheets['语文'].iloc[0, 4:].to_numpy()  # 前10行完全并列
+        report, = compare_engines(sheets, ('current', 'dense_rank'))
+    finally:
+        del ENGINES['dense_rank']
+    print(report.summary())
+    assert [difference.column for difference in report.differences] == ['语文综合排名']
+    assert report.differences[0].mismatches > 0
+
+    try:
+        compare_engines(sheets, ('current', 'unknown'))
+        assert False, "未知引擎应抛出 ValueError"
+    except ValueError:
+        pass
+
+
+def test_intended_differences_are_verified():
+    """测试与基线规则的参考实现对照时，只有符合有意差异说明的单元格被接受，其余偏差照常报告"""
+    print("🔍 测试有意差异核实...")
+    sheets = create_sheets(1000, subjects=('语文',), exams=['中考', '二模', '九年上'], seed=1000)
+    report, = compare_engines(sheets, ('current', 'reference'))
+    assert report.is_equivalent and report.intended
+
+    def drift_engine(df, subject):
+        # 在一个不是 .xx5 的班级上把综合得分加0.01，并相应更新综合排名
+        result = run_current_engine(df, subject)
+        result.loc[0, f'{subject}综合得分'] += 0.01
+        result[f'{subject}综合排名'] = result[f'{subject}综合得分'].rank(ascending=False, method='min')
+        return result
+
+    def total_drift_engine(df, subject):
+        result = run_current_engine(df, subject)
+        result.loc[1, f'中考_{subject}总分'] += 0.01
+        return result
+
+    register_engine('drift', drift_engine)
+    register_engine('total_drift', total_drift_engine)
+    try:
+        drift, = compare_engines(sheets, ('drift', 'reference'))
+        total_drift, = compare_engines(sheets, ('total_drift', 'reference'))
+        # 当前实现作为右侧时不核实有意差异
+        reversed_report, = compare_engines(sheets, ('reference', 'current'))
+    finally:
+        del ENGINES['drift']
+        del ENGINES['total_drift']
+    print(drift.summary())
+    assert [difference.column for difference in drift.differences] == ['语文综合得分', '语文综合排名']
+    assert [difference.column for difference in total_drift.differences] == ['中考_语文总分']
+    assert not reversed_report.is_equivalent and not reversed_report.intended
+
+
+def test_compare_columns_tolerance():
+    """测试空值和误差容忍"""
+    assert compare_columns('a', [1.0, np.nan], [1.0 + 1e-12, np.nan]) is None
+    difference = compare_columns('a', [1.0, np.nan, 3.0], [1.5, 2.0, 3.0])
+    assert difference.mismatches == 2
+    assert difference.max_abs_diff == np.inf
+    assert compare_columns('a', [1.0], [1.5], atol=0.5) is None
+
+
+if __name__ == "__main__":
+    test_current_matches_reference()
+    test_legacy_matches_current_when_rules_coincide()
+    test_detects_different_engine()
+    test_intended_differences_are_verified()
+    test_compare_columns_tolerance()
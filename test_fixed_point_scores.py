@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试定点分数和矩阵加权
+验证整数加权和按十进制四舍五入（.5 进位），不受浮点误差影响；
+多组权重的矩阵加权和任意考试次数的综合得分，
+3次考试的综合得分出现 .xx5 时与参考实现（基线浮点 round(2)）只有已核实的四舍五入差异
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+from fractions import Fraction
+import numpy as np
+from calculate_scores_final_fix import comprehensive_weights, process_single_subject
+from engine_equivalence import compare_engines
+from scoring_engine import (from_score_units, to_score_units, weight_fractions, weight_matrix,
+                            weighted_totals_units)
+from test_engine_equivalence import create_sheets
+
+
+def test_weighted_total_rounds_half_up():
+    """测试定点加权和与十进制精确计算一致，浮点 round(2) 在 .xx5 时会得到不同结果"""
+    print("🔍 测试定点加权和...")
+    rng = np.random.default_rng(0)
+    weights = [0.4, 0.3, 0.3]
+    units = rng.integers(0, 900, (2000, 3))
+    totals = weighted_totals_units(units, [weights])[:, 0]
+    for row, total in zip(units, totals):
+        exact = sum(Decimal(int(value)) / 100 * Decimal(repr(weight)) for value, weight in zip(row, weights))
+        assert Decimal(int(total)) / 100 == exact.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    # 2.42*0.4 + 1.91*0.3 + 2.28*0.3 = 2.225：浮点数略小于2.225，round(2) 得到2.22
+    assert round(2.42 * 0.4 + 1.91 * 0.3 + 2.28 * 0.3, 2) == 2.22
+    assert from_score_units(weighted_totals_units([[242, 191, 228]], [weights])).tolist() == [[2.23]]
+    float_totals = np.round((units / 100 * weights).sum(axis=1), 2)
+    print(f"  浮点 round(2) 与定点结果不同: {np.count_nonzero(float_totals != from_score_units(totals))} / {len(totals)}")
+
+    assert to_score_units([8.9, 6.9, np.nan, 0.3 * 8.9]).tolist() == [890, 690, 0, 267]
+    # 权重按精确分数计算：1/3 + 1/3 + 1/3 得到原值，0.12345 按十进制写法计算
+    assert weighted_totals_units([[100, 200, 301]], [[Fraction(1, 3)] * 3]).tolist() == [[200]]
+    assert weighted_totals_units([[10000]], [[0.12345]]).tolist() == [[1235]]
+
+
+def test_matrix_weighted_totals():
+    """测试矩阵加权：多组权重换算为整数矩阵，一次计算与逐组精确计算一致，综合得分支持任意考试次数"""
+    print("🔍 测试矩阵加权...")
+    rng = np.random.default_rng(1)
+    units = rng.integers(0, 900, (50, 5))
+    configs = [[0.3, 0.2, 0.2, 0.2, 0.1], [0.5, 0.2, 0, 0.2, 0.1], [Fraction(1, 5)] * 5]
+    numerators, denominators = weight_matrix(configs)
+    assert numerators[:, 0].tolist() == [3, 2, 2, 2, 1] and denominators.tolist() == [10, 10, 5]
+    totals = weighted_totals_units(units, configs)
+    assert totals.shape == (50, 3)
+    for j, weights in enumerate(configs):
+        # 逐组按精确分数求和后四舍五入（.5 进位）
+        fractions = weight_fractions(weights)
+        exact = [sum(int(value) * weight for value, weight in zip(row, fractions)) for row in units]
+        assert totals[:, j].tolist() == [int(total + Fraction(1, 2)) for total in exact]
+
+    for exam_count in range(1, 9):
+        weights = comprehensive_weights(exam_count)
+        assert sum(weights) == 1 and weights[0] == (1 if exam_count == 1 else Fraction(2, 5))
+    assert comprehensive_weights(3) == [Fraction(2, 5), Fraction(3, 10), Fraction(3, 10)]
+
+    sheets = create_sheets(60, subjects=('语文',), exams=['中考', '二模', '九年上', '八年下', '八年上', '七年下'])
+    result = process_single_subject(None, '语文', subject_df=sheets['语文'], cleaned=True, write_output=False)
+    totals = [column for column in result.columns if column.endswith('_语文总分')]
+    assert len(totals) == 6 and result['语文综合得分'].gt(0).any()
+
+
+def test_three_exams_match_reference():
+    """测试3次考试（综合得分权重0.4/0.3/0.3，会出现 .xx5）时与参考实现只有有意的四舍五入差异"""
+    print("🔍 测试3次考试的综合得分...")
+    sheets = create_sheets(1000, subjects=('语文',), exams=['中考', '二模', '九年上'], seed=1000)
+    report, = compare_engines(sheets, ('current', 'reference'), '1000 班 3 次考试')
+    print(report.summary())
+    assert report.is_equivalent
+    # 有意的行为变化：基线浮点 round(2) 得到4.28，精确四舍五入为4.29，综合排名随之变化
+    intended = {difference.column: (difference, names) for difference, names in report.intended}
+    assert sorted(intended) == ['语文综合得分', '语文综合排名']
+    difference, names = intended['语文综合得分']
+    assert names == ['half_up'] and difference.examples == [(805, 4.29, 4.28)]
+    assert intended['语文综合排名'][1] == ['comprehensive_rank']
+
+    # 该数据中有综合得分恰为 .xx5 的班级（按浮点 round(2) 计算会与参考实现不同）
+    result = process_single_subject(None, '语文', subject_df=sheets['语文'], cleaned=True, write_output=False)
+    totals = [column for column in result.columns if column.endswith('_语文总分')]
+    units = np.rint(result[totals].to_numpy() * 100).astype(np.int64)
+    assert np.count_nonzero((units @ [4, 3, 3]) % 10 == 5) > 0
+
+
+if __name__ == "__main__":
+    test_weighted_total_rounds_half_up()
+    test_matrix_weighted_totals()
+    test_three_exams_match_reference()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试任务进度事件流
+验证任务更新时唤醒等待者、/events/<job_id> 推送进度事件并以 done 事件结束，以及未知任务返回404
+"""
+
+import json
+import threading
+import time
+import web_app
+from job_manager import JOB_COMPLETED, Job, JobManager
+
+
+def parse_events(body):
+    """把事件流文本解析为 [(事件名, 数据)]（忽略 retry 和注释行）"""
+    events = []
+    for block in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n') if not line.startswith(':') and ': ' in line)
+        if 'event' in fields:
+            events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_wait_for_update():
+    """测试等待任务更新：有更新时立即返回新版本号，无更新时超时返回原版本号"""
+    print("🔍 测试等待任务更新...")
+    job = Job('test')
+    version = job.version
+    assert job.wait_for_update(version, timeout=0.05) == version
+
+    threading.Timer(0.05, lambda: job.update(progress=50)).start()
+    start = time.time()
+    new_version = job.wait_for_update(version, timeout=5)
+    print(f"  版本号 {version} -> {new_version}，等待 {time.time() - start:.3f}s")
+    assert new_version > version
+    assert job.progress == 50
+
+
+def test_events_stream_until_done():
+    """测试事件流推送进度并在任务完成后结束"""
+    print("🔍 测试进度事件流...")
+    original_manager = web_app.job_manager
+    web_app.job_manager = JobManager(max_workers=1)
+    release = threading.Event()
+
+    def task(job):
+        release.wait(5)
+        for progress in (30, 60, 90):
+            job.update(progress=progress, message=f'处理中 {progress}%')
+            time.sleep(0.02)
+        job.update(progress=100, message='处理完成')
+
+    try:
+        job = web_app.job_manager.submit(task)
+        client = web_app.app.test_client()
+        response = client.get(f'/events/{job.job_id}', buffered=False)
+        assert response.mimetype == 'text/event-stream'
+        assert response.headers['Cache-Control'] == 'no-cache'
+        release.set()
+        body = response.get_data(as_text=True)
+    finally:
+        release.set()
+        web_app.job_manager = original_manager
+
+    events = parse_events(body)
+    print(f"  收到事件: {[(name, data['progress']) for name, data in events]}")
+    assert body.startswith('retry: ')
+    assert events[-1][0] == 'done'
+    assert events[-1][1]['state'] == JOB_COMPLETED
+    assert events[-1][1]['progress'] == 100
+    assert all(name == 'progress' for name, _ in events[:-1])
+    progresses = [data['progress'] for _, data in events]
+    assert progresses == sorted(progresses)
+
+
+def test_events_unknown_job():
+    """测试未知任务返回404，已结束的任务直接返回 done 事件"""
+    print("🔍 测试未知任务...")
+    client = web_app.app.test_client()
+    assert client.get('/events/unknown').status_code == 404
+
+    original_manager = web_app.job_manager
+    web_app.job_manager = JobManager(max_workers=1)
+    try:
+        job = web_app.job_manager.submit(lambda job: job.update(progress=100))
+        deadline = time.time() + 5
+        while not job.is_finished and time.time() < deadline:
+            time.sleep(0.01)
+        events = parse_events(client.get(f'/events/{job.job_id}').get_data(as_text=True))
+    finally:
+        web_app.job_manager = original_manager
+    assert [name for name, _ in events] == ['done']
+
+
+if __name__ == "__main__":
+    test_wait_for_update()
+    test_events_stream_until_done()
+    test_events_unknown_job()
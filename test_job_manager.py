@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试处理任务管理器
+验证多个任务并发处理、先进先出排队、队列满时拒绝（Web返回429和Retry-After）、按任务ID查询状态，
+以及淘汰任务记录时删除其输出目录
+"""
+
+import os
+import tempfile
+import threading
+import time
+import web_app
+from job_manager import JOB_COMPLETED, JOB_FAILED, JobManager, QueueFullError
+
+
+def wait_until(condition, timeout=10):
+    """等待条件成立"""
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_jobs_run_concurrently():
+    """测试多个任务由不同工作线程同时处理"""
+    print("🔍 测试并发处理...")
+    manager = JobManager(max_workers=2, max_queue=5)
+    release = threading.Event()
+    running = []
+
+    def task(job):
+        running.append(job.job_id)
+        release.wait(5)
+        job.update(progress=100)
+
+    jobs = [manager.submit(task) for _ in range(2)]
+    assert wait_until(lambda: len(running) == 2)
+    release.set()
+    assert wait_until(lambda: all(job.is_finished for job in jobs))
+    assert [job.state for job in jobs] == [JOB_COMPLETED, JOB_COMPLETED]
+    print("✅ 两个任务同时处理")
+
+
+def test_fifo_queue_and_backpressure():
+    """测试排队任务按提交顺序处理，队列满时抛出 QueueFullError"""
+    print("🔍 测试排队与背压...")
+    manager = JobManager(max_workers=1, max_queue=2, default_retry_after=7)
+    release = threading.Event()
+    order = []
+
+    def task(job, name):
+        release.wait(5)
+        order.append(name)
+
+    first = manager.submit(task, 'first')
+    assert wait_until(lambda: first.state == 'running')
+    second = manager.submit(task, 'second')
+    third = manager.submit(task, 'third')
+    assert manager.queue_position(second) == 1
+    assert manager.queue_position(third) == 2
+
+    try:
+        manager.submit(task, 'fourth')
+        assert False, "队列已满时应拒绝新任务"
+    except QueueFullError as e:
+        print(f"  队列已满: {e}")
+        assert e.retry_after == 7
+
+    release.set()
+    assert wait_until(lambda: third.is_finished)
+    assert order == ['first', 'second', 'third']
+    assert manager.queue_position(third) == 0
+    # 有完成的任务后按平均耗时估算重试时间
+    assert manager.estimate_retry_after() >= 1
+
+
+def test_failed_job_records_error():
+    """测试任务抛出异常时记录错误"""
+    print("🔍 测试任务失败...")
+    manager = JobManager(max_workers=1)
+
+    def task(job):
+        raise ValueError('数据有误')
+
+    job = manager.submit(task)
+    assert wait_until(lambda: job.is_finished)
+    status = manager.status(job)
+    assert status['state'] == JOB_FAILED
+    assert '数据有误' in status['error']
+    assert not status['is_processing']
+
+
+def test_pruned_jobs_remove_outputs():
+    """测试超过保留数的已完成任务被淘汰时删除输出目录，保留的任务输出不受影响"""
+    print("🔍 测试淘汰任务输出...")
+    manager = JobManager(max_workers=1, max_queue=5, max_history=2)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        def task(job):
+            output_dir = os.path.join(tmp_dir, job.job_id)
+            os.makedirs(output_dir)
+            with open(os.path.join(output_dir, '结果.xlsx'), 'w') as f:
+                f.write('x')
+            job.update(output_dir=output_dir)
+
+        jobs = []
+        for _ in range(4):
+            jobs.append(manager.submit(task))
+            assert wait_until(lambda: jobs[-1].is_finished)
+        # 提交第4个任务时保留最近的2个记录：前两个任务被淘汰
+        assert [manager.get(job.job_id) is not None for job in jobs] == [False, False, True, True]
+        assert sorted(os.listdir(tmp_dir)) == sorted(job.job_id for job in jobs[2:])
+
+
+def test_web_queue_full_returns_429():
+    """测试Web接口在队列满时返回429和Retry-After，未知任务返回404"""
+    print("🔍 测试Web背压...")
+    original_manager = web_app.job_manager
+    release = threading.Event()
+    web_app.job_manager = JobManager(max_workers=1, max_queue=1, default_retry_after=12)
+    try:
+        running = web_app.job_manager.submit(lambda job: release.wait(5))
+        assert wait_until(lambda: web_app.job_manager.queue_position(running) == 0)
+        web_app.job_manager.submit(lambda job: release.wait(5))
+
+        client = web_app.app.test_client()
+        with tempfile.NamedTemporaryFile(suffix='.xlsx') as f:
+            response = client.post('/process', json={'filepath': f.name})
+        print(f"  状态码: {response.status_code}, Retry-After: {response.headers.get('Retry-After')}")
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '12'
+        assert client.get('/status/unknown').status_code == 404
+        assert client.get('/download_all/unknown').status_code == 404
+        # 不提供按最近任务查询和下载的接口
+        for url in ('/status', '/download/结果.xlsx', '/download_all'):
+            assert client.get(url).status_code == 404
+    finally:
+        release.set()
+        web_app.job_manager = original_manager
+
+
+if __name__ == "__main__":
+    test_jobs_run_concurrently()
+    test_fifo_queue_and_backpressure()
+    test_failed_job_records_error()
+    test_pruned_jobs_remove_outputs()
+    test_web_queue_full_returns_429()
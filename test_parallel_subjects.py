@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试并行科目处理
+验证进程池并行模式与顺序模式结果一致、结果按科目顺序返回，且子进程以 spawn 方式启动
+"""
+
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import calculate_scores_final_fix as pipeline
+from calculate_scores_final_fix import process_all_subjects
+
+
+def create_test_workbook(path, subjects, total_count=40):
+    """创建包含多个科目、两次考试的测试文件"""
+    rng = np.random.default_rng(2025)
+    metrics = [('平均分', 'p'), ('优秀率', 'y'), ('优良率', 'l'), ('合格率', 'h'), ('低分率', 'd')]
+    with pd.ExcelWriter(path) as writer:
+        for subject in subjects:
+            data = {
+                '学校代码': [f'S{i // 4:03d}' for i in range(total_count)],
+                '学校名称': ['金山中学' if i % 9 == 0 else f'学校{i // 4}' for i in range(total_count)],
+                '班别': [f'{i % 4 + 1}班' for i in range(total_count)],
+                f'{subject}科任': [f'老师{i}' for i in range(total_count)],
+            }
+            for exam_index, exam in enumerate(['中考', '二模']):
+                for metric, suffix in metrics:
+                    column = f'{exam}_{subject}_{metric}_{suffix}{exam_index + 1}'
+                    data[column] = np.round(rng.uniform(0, 100, total_count), 1)
+            pd.DataFrame(data).to_excel(writer, sheet_name=subject, index=False)
+        pd.DataFrame({'说明': ['非科目工作表']}).to_excel(writer, sheet_name='sheet1', index=False)
+
+
+def test_parallel_matches_sequential():
+    """测试并行模式与顺序模式结果一致"""
+    print("🔍 测试并行科目处理...")
+    subjects = ['语文', '数学', '英语']
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'test.xlsx')
+        create_test_workbook(path, subjects)
+        os.chdir(tmp_dir)  # 结果文件写入临时目录
+        start_methods = []
+        original_executor = pipeline.ProcessPoolExecutor
+
+        def recording_executor(*args, **kwargs):
+            start_methods.append(kwargs['mp_context'].get_start_method())
+            return original_executor(*args, **kwargs)
+
+        pipeline.ProcessPoolExecutor = recording_executor
+        try:
+            sequential = process_all_subjects(path)
+            progress = []
+            parallel = process_all_subjects(
+                path, parallel=True, max_workers=2,
+                progress_callback=lambda *args: progress.append(args)
+            )
+        finally:
+            pipeline.ProcessPoolExecutor = original_executor
+            os.chdir(original_dir)
+
+    print(f"顺序模式科目: {list(sequential)}")
+    print(f"并行模式科目: {list(parallel)}")
+    assert list(sequential) == subjects
+    assert list(parallel) == subjects
+    for subject in subjects:
+        pd.testing.assert_frame_equal(sequential[subject], parallel[subject], check_exact=True)
+
+    # Web服务中有持锁的后台线程，不能 fork
+    assert start_methods == ['spawn']
+
+    print(f"进度回调: {progress}")
+    assert sorted(event[0] for event in progress) == sorted(subjects)
+    assert [event[1] for event in progress] == [1, 2, 3]
+    assert all(event[2] == 3 and event[3] for event in progress)
+
+
+if __name__ == "__main__":
+    test_parallel_matches_sequential()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试计算流程的性能统计
+验证按阶段统计耗时、CPU时间和内存峰值（嵌套统计互不丢失峰值），
+以及计算函数、命令行格式化输出和Web任务状态中的性能统计
+"""
+
+import os
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+from calculate_scores_final_fix import (STAGE_LABELS, STAGE_LOAD_WORKBOOK, STAGE_RANK, STAGE_SUBJECTS,
+                                        STAGE_WRITE, process_all_subjects, process_single_subject)
+from pipeline_profiler import StageProfiler, format_profile
+from test_parallel_subjects import create_test_workbook
+from test_consolidated_output import run_web_processing
+
+
+def allocate(megabytes):
+    """分配并释放一块内存"""
+    block = np.ones(megabytes * 1024 * 1024, dtype=np.uint8)
+    return int(block[0])
+
+
+def test_stage_profiler():
+    """测试阶段统计：同名阶段累加，内存峰值为阶段内的增量，嵌套统计都能看到峰值"""
+    print("🔍 测试阶段统计...")
+    assert not tracemalloc.is_tracing()
+    assert not StageProfiler().track_memory  # 默认只统计耗时和CPU时间
+    outer = StageProfiler(track_memory=True).start()
+    inner = StageProfiler(track_memory=True).start()
+    allocate(1)
+    inner.mark('small')
+    allocate(8)
+    inner.mark('large')
+    allocate(1)
+    inner.mark('small')
+    inner.stop()
+    outer.mark('all')
+    profile = outer.stop().to_dict()
+    inner_profile = inner.to_dict()
+    assert not tracemalloc.is_tracing()  # 最后一个统计结束后停止跟踪
+
+    print(format_profile(inner_profile))
+    stages = {stats['stage']: stats for stats in inner_profile['stages']}
+    assert list(stages) == ['small', 'large']
+    assert 1024 * 1024 <= stages['small']['peak_memory'] < 2 * 1024 * 1024
+    assert stages['large']['peak_memory'] >= 8 * 1024 * 1024
+    assert inner_profile['peak_memory'] >= 8 * 1024 * 1024
+    assert sum(stats['wall_time'] for stats in stages.values()) <= inner_profile['wall_time'] + 1e-6
+    # 内层重置峰值前已计入外层的当前阶段
+    assert profile['stages'][0]['peak_memory'] >= 8 * 1024 * 1024
+
+    without_memory = StageProfiler(track_memory=False).start()
+    without_memory.mark('stage')
+    assert without_memory.stop().to_dict()['peak_memory'] is None
+
+
+def test_subject_profile():
+    """测试计算函数返回各阶段和各科目的性能统计，且不影响计算结果"""
+    print("🔍 测试计算性能统计...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'test.xlsx')
+        create_test_workbook(path, ['语文', '数学'])
+        result, profile = process_single_subject(path, '语文', return_profile=True, profile_memory=True,
+                                                 output_file=os.path.join(tmp_dir, '语文.xlsx'))
+        expected = process_single_subject(path, '语文', write_output=False)
+        # 默认不统计内存
+        results, run_profile = process_all_subjects(path, output_pattern=None, return_profile=True)
+
+    pd.testing.assert_frame_equal(result, expected)
+    stages = [stats['stage'] for stats in profile['stages']]
+    assert stages == ['read', 'clean', 'detect_exams', STAGE_RANK, 'comprehensive', STAGE_WRITE]
+    assert profile['peak_memory'] > 0
+    assert all(stats['wall_time'] >= 0 and stats['cpu_time'] >= 0 for stats in profile['stages'])
+
+    assert list(results) == ['语文', '数学']
+    assert [stats['stage'] for stats in run_profile['stages']] == [STAGE_LOAD_WORKBOOK, STAGE_SUBJECTS]
+    assert list(run_profile['subjects']) == ['语文', '数学']
+    assert run_profile['subjects']['数学']['peak_memory'] is None
+    text = format_profile(run_profile, STAGE_LABELS)
+    print(text)
+    assert '读取工作簿' in text and '排名赋分' in text
+
+
+def test_web_status_includes_profile():
+    """测试Web任务状态包含性能统计"""
+    print("🔍 测试Web性能统计...")
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            status, _, _ = run_web_processing(tmp_dir, consolidated=True)
+        finally:
+            os.chdir(original_dir)
+    profile = status['profile']
+    assert profile['peak_memory'] is None  # 默认不开启 tracemalloc
+    assert [stats['stage'] for stats in profile['stages']] == ['load_workbook', 'subjects', 'write_output']
+    assert sorted(profile['subjects']) == ['数学', '语文']
+    assert profile['wall_time'] + 1e-6 >= sum(stats['wall_time'] for stats in profile['stages'])
+
+
+if __name__ == "__main__":
+    test_stage_profiler()
+    test_subject_profile()
+    test_web_status_includes_profile()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试结果工作簿流式写出
+验证读回的数据与 DataFrame.to_excel 一致、得分/排名列的数字格式，
+以及计算流程直接写到指定路径（不再产生默认路径的文件）
+"""
+
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from result_writer import column_number_format, write_result_workbook
+from calculate_scores_final_fix import DEFAULT_OUTPUT_PATTERN, process_all_subjects
+from test_workbook_cache import create_test_workbook
+
+
+def create_result_dataframe():
+    """创建结构与计算结果类似的测试数据"""
+    return pd.DataFrame({
+        '学校代码': ['S001', 'S002', 'S003'],
+        '班别': ['1班', '2班', '3班'],
+        '中考_语文_平均分_p1': [85.5, np.nan, 78.25],
+        '中考_语文_平均分排名': [1.0, np.nan, 2.0],
+        '中考_语文_平均分得分': [10.0, 0.0, 9.5],
+        '语文综合得分': [9.87, 0.0, 9.5],
+    })
+
+
+def test_round_trip_matches_to_excel():
+    """测试流式写出的文件读回后与 to_excel 结果一致"""
+    print("🔍 测试流式写出一致性...")
+    df = create_result_dataframe()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        expected_path = os.path.join(tmp_dir, 'expected.xlsx')
+        actual_path = os.path.join(tmp_dir, 'actual.xlsx')
+        df.to_excel(expected_path, index=False)
+        write_result_workbook(actual_path, df)
+        pd.testing.assert_frame_equal(pd.read_excel(expected_path), pd.read_excel(actual_path))
+
+        worksheet = load_workbook(actual_path).active
+        assert worksheet.title == 'Sheet1'
+        assert worksheet['A1'].font.b
+        assert worksheet['C3'].value is None  # 空值为空单元格
+
+        # 只有文本列的表（to_numpy 返回只读视图）
+        text_path = os.path.join(tmp_dir, 'text.xlsx')
+        write_result_workbook(text_path, pd.DataFrame({'说明': ['第一行', None]}))
+        assert pd.read_excel(text_path)['说明'].tolist()[0] == '第一行'
+    print("✅ 结果一致")
+
+
+def test_number_formats():
+    """测试得分/排名列的数字格式"""
+    print("🔍 测试数字格式...")
+    assert column_number_format('中考_语文_平均分排名') == '0'
+    assert column_number_format('语文综合得分') == '0.00'
+    assert column_number_format('中考_语文_平均分_p1') is None
+    assert column_number_format(3) is None
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'result.xlsx')
+        write_result_workbook(path, {'语文': create_result_dataframe(), '数学': create_result_dataframe()})
+        workbook = load_workbook(path)
+        assert workbook.sheetnames == ['语文', '数学']
+        worksheet = workbook['语文']
+        formats = [worksheet.cell(row=2, column=column).number_format for column in range(3, 7)]
+        print(f"  数字格式: {formats}")
+        assert formats == ['General', '0', '0.00', '0.00']
+        assert worksheet['D4'].number_format == '0'
+
+
+def test_results_written_once_to_output_pattern():
+    """测试计算流程直接写到指定的输出路径"""
+    print("🔍 测试输出路径...")
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'test.xlsx')
+        create_test_workbook(path)
+        output_dir = os.path.join(tmp_dir, 'outputs')
+        os.makedirs(output_dir)
+        os.chdir(tmp_dir)
+        try:
+            results = process_all_subjects(path, output_pattern=os.path.join(output_dir, '{subject}_计算结果.xlsx'))
+        finally:
+            os.chdir(original_dir)
+
+        print(f"  输出文件: {sorted(os.listdir(output_dir))}")
+        assert sorted(os.listdir(output_dir)) == ['数学_计算结果.xlsx', '语文_计算结果.xlsx']
+        assert not os.path.exists(os.path.join(tmp_dir, DEFAULT_OUTPUT_PATTERN.format(subject='语文')))
+        written = pd.read_excel(os.path.join(output_dir, '语文_计算结果.xlsx'))
+        assert list(written.columns) == list(results['语文'].columns)
+
+
+if __name__ == "__main__":
+    test_round_trip_matches_to_excel()
+    test_number_formats()
+    test_results_written_once_to_output_pattern()
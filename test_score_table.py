@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试编译后的排名→赋分查找表
+验证查找表与 assign_scores 逐名次一致、按 (赋分方式, 赋分表, 总人数) 缓存复用、
+注册新的赋分方式，以及整个科目计算只编译一次查找表
+"""
+
+import os
+import tempfile
+import numpy as np
+import scoring_engine
+from calculate_scores_final_fix import process_single_subject
+from scoring_engine import (PERCENTAGE_INTERVALS, ScoreTable, assign_scores, build_scoring_intervals,
+                            get_score_table, register_scoring_rule)
+from test_workbook_loader import create_test_workbook
+
+
+def test_lookup_matches_assign_scores():
+    """测试查找表与 searchsorted 赋分结果一致（含空值、非整数和超出区间的排名）"""
+    print("🔍 测试查找表赋分...")
+    rng = np.random.default_rng(0)
+    for scoring_method in ('percentage', 'fixed', 'small_cohort'):
+        for total_count in range(1, 301):
+            intervals = build_scoring_intervals(total_count, scoring_method)
+            table = get_score_table(total_count, scoring_method)
+            ranks = np.concatenate([np.arange(1, total_count + 3), rng.uniform(0, total_count + 3, 20), [np.nan]])
+            is_jinshan = rng.random(len(ranks)) < 0.5
+            expected = assign_scores(ranks, is_jinshan, intervals)
+            assert table.lookup(ranks, is_jinshan).tolist() == expected.tolist(), (scoring_method, total_count)
+    print(f"  小规模区间(15人): {get_score_table(15, 'small_cohort').intervals}")
+
+
+def test_score_table_cache():
+    """测试相同规则复用同一张表，自定义赋分表按内容区分，注册赋分方式后缓存失效"""
+    print("🔍 测试查找表缓存...")
+    table = get_score_table(100)
+    assert isinstance(table, ScoreTable) and get_score_table(100) is table
+    assert get_score_table(101) is not table
+    assert not table.regular.flags.writeable
+
+    custom = [[0, 0.5, 10, 12], [0.5, 1, 0, 0]]
+    assert get_score_table(10, 'custom', custom) is get_score_table(10, 'custom', [list(row) for row in custom])
+    assert get_score_table(10, 'custom', custom).regular[1:12].tolist() == [10] * 5 + [0] * 6
+
+    register_scoring_rule('half', custom)
+    try:
+        assert get_score_table(10, 'half').intervals == [(1, 5, 10, 12), (6, 10, 0, 0)]
+        register_scoring_rule('half', PERCENTAGE_INTERVALS)
+        assert get_score_table(10, 'half').intervals == build_scoring_intervals(10)
+    finally:
+        del scoring_engine.SCORING_RULES['half']
+        scoring_engine._compile_score_table.cache_clear()
+
+
+def test_subject_compiles_table_once():
+    """测试一个科目的所有指标和差值共用同一张查找表"""
+    print("🔍 测试科目计算复用查找表...")
+    scoring_engine._compile_score_table.cache_clear()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'test.xlsx')
+        create_test_workbook(path)
+        process_single_subject(path, '语文', write_output=False)
+    info = scoring_engine._compile_score_table.cache_info()
+    print(f"  缓存: {info}")
+    assert info.misses == 1
+
+
+if __name__ == "__main__":
+    test_lookup_matches_assign_scores()
+    test_score_table_cache()
+    test_subject_compiles_table_once()
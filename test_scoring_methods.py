@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试赋分方式选择
+验证固定区间赋分与早期实现的176人规则逐名次一致、自定义赋分表的检查，
+整个科目的固定区间赋分与参考实现一致，以及 /process 拒绝不支持的赋分方式
+"""
+
+import os
+import tempfile
+import numpy as np
+import web_app
+from calculate_scores import TeacherScoreCalculator
+from engine_equivalence import compare_engines
+from scoring_engine import (PERCENTAGE_INTERVALS, assign_scores, build_scoring_intervals,
+                            generate_scoring_intervals, validate_scoring_table)
+from test_engine_equivalence import create_sheets
+from test_workbook_loader import create_test_workbook
+
+
+def test_fixed_matches_legacy_rules():
+    """测试固定区间赋分与 TeacherScoreCalculator.get_scoring_rules 对每个名次的赋分一致，并核对176人规则和小规模区间"""
+    print("🔍 测试固定区间赋分...")
+    calculator = TeacherScoreCalculator(None)
+    # 176人规则各区间的首尾名次，以及小规模区间（20人及以下）
+    boundary_ranks = [1, 18, 19, 43, 44, 71, 72, 106, 107, 134, 135, 159, 160, 176]
+    assert assign_scores(np.array(boundary_ranks), np.zeros(14, dtype=bool),
+                         build_scoring_intervals(176, 'fixed')).tolist() == [8, 8, 6, 6, 5, 5, 4, 4, 3, 3, 2, 2, 0, 0]
+    assert assign_scores(np.arange(1, 21), np.ones(20, dtype=bool), build_scoring_intervals(20, 'fixed')).tolist() == \
+        [8.9] * 3 + [6.9] * 4 + [5.9] * 5 + [4.9] * 6 + [3.9] * 2
+    for total_count in range(1, 401):
+        intervals = build_scoring_intervals(total_count, 'fixed')
+        ranks = np.arange(1, total_count + 1)
+        legacy_rules = calculator.get_scoring_rules(total_count)
+        for is_jinshan in (False, True):
+            expected = [calculator.assign_score(rank, legacy_rules, is_jinshan) for rank in ranks]
+            scores = assign_scores(ranks, np.full(total_count, is_jinshan), intervals)
+            assert scores.tolist() == expected, total_count
+    print(f"  15人区间: {build_scoring_intervals(15, 'fixed')}")
+    assert build_scoring_intervals(176, 'fixed')[-1] == (160, 176, 0, 0)
+
+
+def test_custom_scoring_table():
+    """测试自定义百分比赋分表的计算和格式检查"""
+    print("🔍 测试自定义赋分表...")
+    assert build_scoring_intervals(100, 'custom', PERCENTAGE_INTERVALS) == generate_scoring_intervals(100)
+    assert build_scoring_intervals(10, 'custom', [[0, 0.5, 10, 12], [0.5, 1, 0, 0]]) == [(1, 5, 10, 12),
+                                                                                       (6, 10, 0, 0)]
+    for table in ([], [[0, 0.5, 1, 1]], [[0, 0.5, 1, 1], [0.6, 1, 0, 0]], [[0, 1, 'x', 1]], [[0, 1]]):
+        try:
+            validate_scoring_table(table)
+            assert False, f"赋分表 {table} 应抛出 ValueError"
+        except ValueError as e:
+            print(f"  {table}: {e}")
+    try:
+        build_scoring_intervals(100, 'unknown')
+        assert False, "不支持的赋分方式应抛出 ValueError"
+    except ValueError:
+        pass
+
+
+def test_fixed_subject_matches_reference():
+    """测试整个科目的固定区间赋分与参考实现一致；无并列、无金山中学时与早期实现只差综合排名的精度"""
+    print("🔍 测试固定区间科目计算...")
+    for n_classes in (15, 100, 300):
+        sheets = create_sheets(n_classes, seed=n_classes)
+        for report in compare_engines(sheets, ('current_fixed', 'reference_fixed'), f'{n_classes} 班'):
+            print(report.summary())
+            assert report.is_equivalent
+
+    sheets = create_sheets(100, subjects=('语文',), seed=2)
+    df = sheets['语文']
+    rng = np.random.default_rng(2)
+    for i, column in enumerate(df.columns[4:]):
+        df[column] = (rng.permutation(100) + 0.5) * 1000 ** (i // 5)
+    df['学校名称'] = df['学校名称'].replace('金山中学', '其他学校')
+    report, = compare_engines(sheets, ('current_fixed', 'legacy'), '100 班')
+    print(report.summary())
+    assert [difference.column for difference in report.differences] == ['语文综合排名']
+
+
+def test_process_rejects_invalid_scoring_method():
+    """测试 /process 对不支持的赋分方式和缺少赋分表的自定义方式返回400"""
+    print("🔍 测试 /process 赋分方式检查...")
+    client = web_app.app.test_client()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'test.xlsx')
+        create_test_workbook(path)
+        for payload in ({'scoring_method': 'invalid_method'}, {'scoring_method': 'custom'},
+                        {'scoring_method': 'custom', 'scoring_table': [[0, 0.5, 8, 8.9]]}):
+            response = client.post('/process', json={'filepath': path, 'subject': '语文', **payload})
+            print(f"  {payload}: {response.status_code} {response.get_json()['error']}")
+            assert response.status_code == 400
+
+
+if __name__ == "__main__":
+    test_fixed_matches_legacy_rules()
+    test_custom_scoring_table()
+    test_fixed_subject_matches_reference()
+    test_process_rejects_invalid_scoring_method()
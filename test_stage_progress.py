@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试科目处理的阶段进度回调
+验证各阶段按顺序回报、进度比例递增到1、排名赋分阶段每批排名回报一次，且回调不影响计算结果
+"""
+
+import os
+import tempfile
+import pandas as pd
+from calculate_scores_final_fix import (STAGE_CLEAN, STAGE_COMPREHENSIVE, STAGE_DETECT_EXAMS, STAGE_RANK,
+                                        STAGE_READ, STAGE_WRITE, process_all_subjects, process_single_subject)
+from test_parallel_subjects import create_test_workbook
+
+
+def test_single_subject_stages():
+    """测试单个科目的阶段回报"""
+    print("🔍 测试单科阶段进度...")
+    events = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'test.xlsx')
+        create_test_workbook(path, ['语文'])
+        output_file = os.path.join(tmp_dir, '语文_计算结果.xlsx')
+        result = process_single_subject(path, '语文', output_file=output_file,
+                                        stage_callback=lambda *args: events.append(args))
+        expected = process_single_subject(path, '语文', write_output=False)
+
+    for subject, stage, fraction, elapsed, detail in events:
+        print(f"  {stage:14s} {fraction:.2f} {elapsed:.3f}s {detail}")
+    assert all(event[0] == '语文' for event in events)
+
+    stages = [event[1] for event in events]
+    rank_count = stages.count(STAGE_RANK)
+    assert stages == [STAGE_READ, STAGE_CLEAN, STAGE_DETECT_EXAMS] + [STAGE_RANK] * rank_count + \
+        [STAGE_COMPREHENSIVE, STAGE_WRITE]
+    # 排名赋分批量完成：第一个考试和全部差值各回报一次，不按考试指标逐个回报
+    assert [event[4] for event in events if event[1] == STAGE_RANK] == ['中考 5 个指标', '1 次考试差值 5 个指标']
+    assert events[-1][4] == '语文_计算结果.xlsx'
+
+    fractions = [event[2] for event in events]
+    elapsed = [event[3] for event in events]
+    assert fractions == sorted(fractions) and fractions[-1] == 1.0
+    assert elapsed == sorted(elapsed)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_all_subjects_stages():
+    """测试处理所有科目时每个科目都回报到写出阶段"""
+    print("🔍 测试所有科目阶段进度...")
+    events = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'test.xlsx')
+        create_test_workbook(path, ['语文', '数学'])
+        results = process_all_subjects(path, output_pattern=None,
+                                       stage_callback=lambda *args: events.append(args))
+
+    assert list(results) == ['语文', '数学']
+    finished = [subject for subject, stage, *_ in events if stage == STAGE_WRITE]
+    assert finished == ['语文', '数学']
+
+
+if __name__ == "__main__":
+    test_single_subject_stages()
+    test_all_subjects_stages()
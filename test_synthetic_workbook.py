@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试合成工作簿生成器和计算流程性能基准
+验证生成的数据可重复、各种列名写法都能被识别并完成计算，以及基准结果的结构和回归判断
+"""
+
+import io
+import contextlib
+import os
+import tempfile
+import pandas as pd
+from synthetic_workbook import DEFAULT_EXAMS, MIXED_STYLE, SUFFIX_STYLES, generate_subject_sheet, generate_workbook
+from calculate_scores_final_fix import process_all_subjects
+from benchmark_scoring import STAGES, benchmark_size, compare_to_baseline
+
+
+def test_generator_is_deterministic():
+    """测试相同参数生成相同数据，列名按指定写法生成"""
+    print("🔍 测试生成器...")
+    first = generate_subject_sheet('语文', 50)
+    second = generate_subject_sheet('语文', 50)
+    pd.testing.assert_frame_equal(first, second)
+    assert len(first) == 50
+    assert list(first.columns[:4]) == ['学校   代码', '学校名称', '班   别', '语文科任']
+    assert '金山中学' in set(first['学校名称'])
+
+    columns = list(generate_subject_sheet('数学', 5, suffix_style='compact', messy=False).columns)
+    print(f"  规范写法表头: {columns[:6]}")
+    assert columns[:4] == ['学校代码', '学校名称', '班别', '数学科任']
+    assert columns[4] == '中考   数学   平均分p1'
+    assert columns[-1] == f'{DEFAULT_EXAMS[-1]}   数学   低分率d{len(DEFAULT_EXAMS)}'
+
+    try:
+        generate_subject_sheet('语文', 5, suffix_style='unknown')
+        assert False, "不支持的写法应抛出 ValueError"
+    except ValueError:
+        pass
+
+
+def test_generated_workbook_is_processed():
+    """测试各种写法生成的工作簿都能识别全部考试并计算综合得分"""
+    print("🔍 测试生成的工作簿...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for suffix_style in list(SUFFIX_STYLES) + [MIXED_STYLE]:
+            path = generate_workbook(os.path.join(tmp_dir, f'{suffix_style}.xlsx'), 40,
+                                     subjects=['语文', '数学'], suffix_style=suffix_style)
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = process_all_subjects(path, output_pattern=None)
+            total_columns = [column for column in results['语文'].columns if column.endswith('语文总分')]
+            print(f"  {suffix_style}: {total_columns}")
+            assert list(results) == ['语文', '数学']
+            assert len(total_columns) == len(DEFAULT_EXAMS)
+            assert results['数学']['数学综合得分'].notna().all()
+
+
+def test_benchmark_and_regression_check():
+    """测试基准结果结构和回归判断"""
+    print("🔍 测试性能基准...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = generate_workbook(os.path.join(tmp_dir, 'bench.xlsx'), 20, subjects=['语文'])
+        result = benchmark_size(path, repeat=1)
+    assert list(result['stages']) == STAGES
+    assert all(seconds > 0 for seconds in result['stages'].values())
+
+    baseline = {'results': {'100': {'stages': {'load': 1.0, 'clean': 0.01, 'score': 2.0}}}}
+    current = {'results': {'100': {'stages': {'load': 1.1, 'clean': 0.05, 'score': 3.0, 'write': 1.0}},
+                           '1000': {'stages': {'load': 9.0}}}}
+    # 只有 score 超过阈值且绝对增量足够大；clean 相对增加多但不足0.05秒，write 和 1000 没有基线
+    assert compare_to_baseline(baseline, current, threshold=0.2) == [(100, 'score', 2.0, 3.0)]
+    assert compare_to_baseline(baseline, current, threshold=0.05) == [(100, 'load', 1.0, 1.1),
+                                                                     (100, 'score', 2.0, 3.0)]
+
+
+if __name__ == "__main__":
+    test_generator_is_deterministic()
+    test_generated_workbook_is_processed()
+    test_benchmark_and_regression_check()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试向量化排名赋分引擎
+验证与原逐行(iterrows)赋分逻辑结果完全一致
+"""
+
+import pandas as pd
+import numpy as np
+from scoring_engine import JINSHAN_SCHOOL, generate_scoring_intervals, assign_scores, batch_rank_and_score
+
+
+def legacy_rank_and_score(df, value_col, ascending, intervals, exclude_jinshan):
+    """原 process_single_subject 中的逐行赋分逻辑（作为对照）"""
+    def assign_score(rank, is_jinshan):
+        for start, end, regular_score, jinshan_score in intervals:
+            if start <= rank <= end:
+                return jinshan_score if is_jinshan else regular_score
+        return 0
+
+    df = df.copy()
+    if exclude_jinshan:
+        source_df = df[df['学校名称'] != '金山中学'].copy()
+    else:
+        source_df = df
+    sorted_df = source_df.sort_values(value_col, ascending=ascending).reset_index(drop=True)
+    sorted_df['rank'] = sorted_df[value_col].rank(ascending=ascending, method='min')
+
+    for idx, row in sorted_df.iterrows():
+        is_jinshan = (not exclude_jinshan) and row['学校名称'] == '金山中学'
+        original_idx = df[(df['学校代码'] == row['学校代码']) & (df['班别'] == row['班别'])].index[0]
+        df.loc[original_idx, 'rank'] = row['rank']
+        df.loc[original_idx, 'score'] = assign_score(row['rank'], is_jinshan)
+
+    if exclude_jinshan:
+        jinshan_mask = df['学校名称'] == '金山中学'
+        df.loc[jinshan_mask, 'rank'] = None
+        df.loc[jinshan_mask, 'score'] = 0.0
+
+    return df['rank'], df['score']
+
+
+def create_test_df(total_count, seed):
+    """创建包含并列、空值和金山中学的测试数据"""
+    rng = np.random.default_rng(seed)
+    values = np.round(rng.uniform(0, 100, total_count), 1)
+    values[rng.random(total_count) < 0.3] = values[0]  # 制造并列
+    values[rng.random(total_count) < 0.05] = np.nan     # 制造空值
+    return pd.DataFrame({
+        '学校代码': [f'S{i // 5:03d}' for i in range(total_count)],
+        '学校名称': ['金山中学' if i % 7 == 0 else f'学校{i // 5}' for i in range(total_count)],
+        '班别': [f'{i % 5 + 1}班' for i in range(total_count)],
+        '指标': values,
+    })
+
+
+def test_assign_scores_boundaries():
+    """测试区间边界排名的赋分"""
+    print("🔍 测试区间边界赋分...")
+    intervals = generate_scoring_intervals(176)
+    print(f"176人区间: {intervals}")
+
+    ranks = [1, 18, 19, 43, 44, 159, 160, 176, 177, np.nan]
+    is_jinshan = [False, True, False, True, False, True, False, True, False, True]
+    scores = assign_scores(ranks, is_jinshan, intervals)
+    expected = [8, 8.9, 6, 6.9, 5, 2.9, 0, 0, 0, 0]
+    print(f"排名: {ranks}")
+    print(f"得分: {scores.tolist()}")
+    assert scores.tolist() == expected
+
+
+def test_vectorized_matches_legacy():
+    """测试向量化结果与逐行赋分结果逐位一致"""
+    print("🔍 测试向量化赋分与原逐行赋分一致性...")
+    for total_count in [5, 20, 37, 176, 300]:
+        df = create_test_df(total_count, seed=total_count)
+        intervals = generate_scoring_intervals(total_count)
+        jinshan_mask = (df['学校名称'] == JINSHAN_SCHOOL).to_numpy()
+        for ascending in [False, True]:
+            for exclude_jinshan in [False, True]:
+                ranks, scores = batch_rank_and_score(df[['指标']].to_numpy().T, [ascending], exclude_jinshan,
+                                                     jinshan_mask, intervals)
+                legacy_ranks, legacy_scores = legacy_rank_and_score(
+                    df, '指标', ascending, intervals, exclude_jinshan)
+                assert np.array_equal(ranks[0], legacy_ranks.to_numpy(dtype=float), equal_nan=True)
+                assert np.array_equal(scores[0], legacy_scores.to_numpy(dtype=float))
+        print(f"  ✅ {total_count}人: 排名和得分完全一致")
+
+
+if __name__ == "__main__":
+    test_assign_scores_boundaries()
+    test_vectorized_matches_legacy()
@@ -56,9 +56,11 @@ def test_web_scoring_methods():
             if process_response.status_code == 200:
                 print("✅ 固定区间赋分请求成功")
                 
+                job_id = process_response.json()['job_id']
+                
                 # 等待处理完成
                 for i in range(30):  # 最多等待30秒
-                    status_response = requests.get(f"{base_url}/status")
+                    status_response = requests.get(f"{base_url}/status/{job_id}")
                     status = status_response.json()
                     
                     if status.get('error'):
@@ -110,9 +112,11 @@ def test_web_scoring_methods():
             if process_response.status_code == 200:
                 print("✅ 百分比区间赋分请求成功")
                 
+                job_id = process_response.json()['job_id']
+                
                 # 等待处理完成
                 for i in range(30):  # 最多等待30秒
-                    status_response = requests.get(f"{base_url}/status")
+                    status_response = requests.get(f"{base_url}/status/{job_id}")
                     status = status_response.json()
                     
                     if status.get('error'):
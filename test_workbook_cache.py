@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试已清洗工作簿缓存
+验证缓存命中跳过解析、内容变化导致缓存失效、按容量LRU淘汰
+"""
+
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import workbook_loader
+from workbook_cache import WorkbookCache
+from workbook_loader import WorkbookSession
+from calculate_scores_final_fix import process_all_subjects
+
+
+def create_test_workbook(path, seed=0, total_count=30):
+    """创建包含带空格表头的测试文件（需要数据清洗）"""
+    rng = np.random.default_rng(seed)
+    metrics = [('平均分', 'p'), ('优秀率', 'y'), ('优良率', 'l'), ('合格率', 'h'), ('低分率', 'd')]
+    with pd.ExcelWriter(path) as writer:
+        for subject in ['语文', '数学']:
+            data = {
+                '学校   代码': [f'S{i // 3:03d}' for i in range(total_count)],
+                '学校名称': ['金山中学' if i % 8 == 0 else f'学校{i // 3}' for i in range(total_count)],
+                '班   别': [f'{i % 3 + 1}班' for i in range(total_count)],
+                f'{subject}科任': [f'老师{i}' for i in range(total_count)],
+            }
+            for metric, suffix in metrics:
+                data[f'中考   {subject}   {metric}   {suffix}1'] = [f'{v:.1f}%' for v in rng.uniform(0, 100, total_count)]
+            pd.DataFrame(data).to_excel(writer, sheet_name=subject, index=False)
+
+
+def test_cache_hit_skips_parsing():
+    """测试相同内容的文件第二次加载直接命中缓存"""
+    print("🔍 测试缓存命中...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'test.xlsx')
+        create_test_workbook(path)
+        cache = WorkbookCache(os.path.join(tmp_dir, 'cache'))
+
+        first = WorkbookSession(path, cache=cache)
+        first_sheets = {name: first.get_sheet(name) for name in first.subjects}
+        first.close()
+
+        calls = []
+        original_read_excel = workbook_loader.pd.read_excel
+        original_clean = workbook_loader.clean_subject_dataframe
+        workbook_loader.pd.read_excel = lambda *args, **kwargs: calls.append('read_excel')
+        workbook_loader.clean_subject_dataframe = lambda df: calls.append('clean')
+        try:
+            second = WorkbookSession(path, cache=cache)
+            second_sheets = {name: second.get_sheet(name) for name in second.subjects}
+            second.close()
+        finally:
+            workbook_loader.pd.read_excel = original_read_excel
+            workbook_loader.clean_subject_dataframe = original_clean
+
+        print(f"第二次加载的解析/清洗调用: {calls}")
+        assert calls == []
+        assert second.cleaned
+        assert list(second_sheets) == ['语文', '数学']
+        for name in first_sheets:
+            pd.testing.assert_frame_equal(first_sheets[name], second_sheets[name], check_exact=True)
+        assert '学校代码' in second_sheets['语文'].columns
+        print("✅ 缓存命中，未重新解析和清洗")
+
+
+def test_cache_key_changes_with_content():
+    """测试文件内容变化时缓存键不同"""
+    print("🔍 测试缓存键...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'test.xlsx')
+        cache = WorkbookCache(os.path.join(tmp_dir, 'cache'))
+        create_test_workbook(path, seed=1)
+        key1 = cache.make_key(path)
+        create_test_workbook(path, seed=2)
+        key2 = cache.make_key(path)
+        print(f"key1={key1[:12]}... key2={key2[:12]}...")
+        assert key1 != key2
+        assert cache.make_key(path) == key2
+        assert cache.make_key(path, ['sheet1']) != key2
+        assert cache.make_key(path, projected=True) != key2
+
+
+def test_lru_eviction():
+    """测试超过容量上限时淘汰最久未访问的条目"""
+    print("🔍 测试LRU淘汰...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sheets = {'语文': pd.DataFrame({'a': np.arange(2000, dtype=float)})}
+        cache = WorkbookCache(os.path.join(tmp_dir, 'cache'), max_bytes=10 ** 9)
+        cache.put('a', sheets)
+        cache.put('b', sheets)
+        entry_size = cache._entry_size(cache._entry_dir('a'))
+
+        # 访问a，使b成为最久未访问的条目
+        old = time.time() - 100
+        os.utime(os.path.join(cache._entry_dir('b'), 'manifest.json'), (old, old))
+        assert cache.get('a') is not None
+
+        # 恰好容纳两个条目（清单中的创建时间长度不固定，各条目大小可能相差几个字节）
+        cache.max_bytes = entry_size * 2 + 64
+        cache.put('c', sheets)
+        remaining = sorted(os.listdir(cache.cache_dir))
+        print(f"剩余缓存条目: {remaining}")
+        assert remaining == ['a', 'c']
+
+
+def test_cached_results_match_uncached():
+    """测试使用缓存的计算结果与不使用缓存一致"""
+    print("🔍 测试缓存计算结果一致性...")
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'test.xlsx')
+        create_test_workbook(path)
+        cache = WorkbookCache(os.path.join(tmp_dir, 'cache'))
+        os.chdir(tmp_dir)  # 结果文件写入临时目录
+        try:
+            uncached = process_all_subjects(path)
+            process_all_subjects(path, workbook=WorkbookSession(path, cache=cache))
+            cached = process_all_subjects(path, workbook=WorkbookSession(path, cache=cache))
+        finally:
+            os.chdir(original_dir)
+
+    assert list(cached) == list(uncached) == ['语文', '数学']
+    for subject in uncached:
+        pd.testing.assert_frame_equal(uncached[subject], cached[subject], check_exact=True)
+    print("✅ 结果一致")
+
+
+if __name__ == "__main__":
+    test_cache_hit_skips_parsing()
+    test_cache_key_changes_with_content()
+    test_lru_eviction()
+    test_cached_results_match_uncached()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试工作簿预检
+验证只读取表头行即可识别科目、考试和指标，缺少的列和指标给出提示，预检不输出日志也不替换全局 stdout，
+以及 /inspect 接口
+"""
+
+import io
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+import web_app
+import workbook_inspector
+import workbook_loader
+from result_writer import write_result_workbook
+from synthetic_workbook import DEFAULT_EXAMS, generate_subject_sheet
+from workbook_inspector import inspect_workbook
+
+
+def create_test_workbook(path):
+    """语文完整；数学缺少科任列和二模优良率；英语没有考试数据"""
+    rng = np.random.default_rng(0)
+    math = generate_subject_sheet('数学', 30, rng=rng).drop(columns=['数学科任'])
+    math = math.drop(columns=[column for column in math.columns if '二模' in column and '优良率' in column])
+    return write_result_workbook(path, {
+        '语文': generate_subject_sheet('语文', 30, rng=rng),
+        '数学': math,
+        '英语': pd.DataFrame({'学校代码': ['S1'], '学校名称': ['学校1'], '班别': ['1班'], '英语科任': ['老师']}),
+        'sheet1': pd.DataFrame({'说明': ['非科目工作表']}),
+    })
+
+
+def test_inspect_workbook():
+    """测试识别考试和指标，只读取表头行"""
+    print("🔍 测试工作簿预检...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = create_test_workbook(os.path.join(tmp_dir, 'test.xlsx'))
+
+        calls = []
+        original_read_excel = workbook_loader.pd.read_excel
+
+        def counting_read_excel(*args, **kwargs):
+            calls.append(kwargs.get('nrows'))
+            return original_read_excel(*args, **kwargs)
+
+        workbook_loader.pd.read_excel = counting_read_excel
+        try:
+            result = inspect_workbook(path)
+        finally:
+            workbook_loader.pd.read_excel = original_read_excel
+
+    print(f"  预检耗时: {result['elapsed']:.3f} 秒")
+    assert calls == [0]
+    assert result['sheets'] == ['语文', '数学', '英语', 'sheet1']
+    chinese, math, english = result['subjects']
+
+    assert [exam['name'] for exam in chinese['exams']] == DEFAULT_EXAMS
+    assert all(len(exam['metrics']) == 5 and not exam['missing_metrics'] for exam in chinese['exams'])
+    assert chinese['missing_columns'] == [] and chinese['warnings'] == []
+
+    print(f"  数学: {math['warnings']}")
+    assert math['missing_columns'] == ['数学科任']
+    assert math['exams'][1]['missing_metrics'] == ['优良率']
+    # 二模缺少指标：二模总分和九年上的差值总分都无法计算
+    assert any('二模 缺少指标' in warning for warning in math['warnings'])
+    assert any('九年上 的差值总分无法计算' in warning for warning in math['warnings'])
+
+    assert english['exams'] == [] and not english['can_process']
+
+
+def test_inspect_keeps_stdout():
+    """测试预检不输出日志，也不重定向全局 stdout（同时运行的任务日志不会被吞掉）"""
+    print("🔍 测试预检输出...")
+    output = io.StringIO()
+    streams = []
+    original_extract = workbook_inspector.extract_exam_names
+
+    def recording_extract(*args, **kwargs):
+        streams.append(sys.stdout)
+        return original_extract(*args, **kwargs)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = create_test_workbook(os.path.join(tmp_dir, 'test.xlsx'))
+        original_stdout = sys.stdout
+        sys.stdout = output
+        workbook_inspector.extract_exam_names = recording_extract
+        try:
+            inspect_workbook(path)
+        finally:
+            workbook_inspector.extract_exam_names = original_extract
+            sys.stdout = original_stdout
+
+    assert output.getvalue() == ''
+    assert len(streams) == 3 and all(stream is output for stream in streams)
+
+
+def test_inspect_endpoint():
+    """测试 /inspect 接口按教育阶段检查指标，文件不存在时返回400"""
+    print("🔍 测试 /inspect 接口...")
+    client = web_app.app.test_client()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = create_test_workbook(os.path.join(tmp_dir, 'test.xlsx'))
+        response = client.post('/inspect', json={'filepath': path})
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [subject['name'] for subject in data['subjects']] == ['语文', '数学', '英语']
+
+        # 小学不使用优良率：数学只缺少科任列
+        data = client.post('/inspect', json={'filepath': path, 'education_level': 'primary'}).get_json()
+        math = data['subjects'][1]
+        assert all(not exam['missing_metrics'] for exam in math['exams'])
+        assert math['warnings'] == ['缺少列: 数学科任']
+
+        response = client.post('/inspect', json={'filepath': os.path.join(tmp_dir, 'missing.xlsx')})
+        assert response.status_code == 400
+
+
+if __name__ == "__main__":
+    test_inspect_workbook()
+    test_inspect_keeps_stdout()
+    test_inspect_endpoint()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试工作簿会话（单次解析）
+验证所有科目工作表只解析一次，且各科目拿到的是独立副本；丢弃无关列时只保留科目用到的列、
+工作簿只打开一次且结果不变
+"""
+
+import io
+import contextlib
+import os
+import tempfile
+import numpy as np
+import openpyxl
+import pandas as pd
+import workbook_loader
+from calculate_scores_final_fix import process_all_subjects, process_single_subject
+from column_resolver import subject_column_positions
+from result_writer import write_result_workbook
+from synthetic_workbook import generate_subject_sheet
+from workbook_loader import WorkbookSession
+
+
+def create_test_workbook(path):
+    """创建包含两个科目和一个非科目工作表的测试文件"""
+    with pd.ExcelWriter(path) as writer:
+        for subject in ['语文', '数学']:
+            pd.DataFrame({
+                '学校代码': ['001', '002'],
+                '学校名称': ['学校A', '学校B'],
+                '班别': ['1班', '2班'],
+                f'中考_{subject}_平均分_p1': [85.5, 92.3],
+            }).to_excel(writer, sheet_name=subject, index=False)
+        pd.DataFrame({'说明': ['非科目工作表']}).to_excel(writer, sheet_name='sheet1', index=False)
+
+
+def test_workbook_parsed_once():
+    """测试所有科目工作表通过一次 read_excel 调用解析"""
+    print("🔍 测试工作簿单次解析...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'test.xlsx')
+        create_test_workbook(path)
+
+        calls = []
+        original_read_excel = workbook_loader.pd.read_excel
+
+        def counting_read_excel(*args, **kwargs):
+            calls.append(kwargs.get('sheet_name'))
+            return original_read_excel(*args, **kwargs)
+
+        workbook_loader.pd.read_excel = counting_read_excel
+        try:
+            with WorkbookSession(path) as workbook:
+                print(f"识别到的科目: {workbook.subjects}")
+                assert workbook.subjects == ['语文', '数学']
+                chinese = workbook.get_sheet('语文')
+                math = workbook.get_sheet('数学')
+        finally:
+            workbook_loader.pd.read_excel = original_read_excel
+
+        print(f"read_excel 调用次数: {len(calls)}")
+        assert calls == [['语文', '数学']]
+        assert list(chinese.columns)[-1] == '中考_语文_平均分_p1'
+        assert list(math.columns)[-1] == '中考_数学_平均分_p1'
+
+
+def test_get_sheet_returns_copy():
+    """测试计算流程修改数据不会影响会话中缓存的数据"""
+    print("🔍 测试科目数据副本隔离...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'test.xlsx')
+        create_test_workbook(path)
+
+        with WorkbookSession(path) as workbook:
+            df = workbook.get_sheet('语文')
+            df.columns = ['a', 'b', 'c', 'd']
+            df.loc[0, 'd'] = -1
+            again = workbook.get_sheet('语文')
+
+        assert again.columns[0] == '学校代码'
+        assert again.iloc[0, 3] == 85.5
+        print("✅ 副本隔离正常")
+
+
+def test_subject_column_positions():
+    """测试列投影只选中基本信息列、本科目科任列和本科目的考试指标列"""
+    columns = ['学校   代码', '学校名称', '备注', '班   别', '语文科任', '数学科任',
+               '中考   语文   平均分   p1', '中考_数学_平均分_p1', '语文人数', '二模   语文   合格率h2', 3]
+    assert subject_column_positions(columns, '语文') == [0, 1, 3, 4, 6, 9]
+    assert subject_column_positions(['班级', '中考_数学_优秀率_y1'], '数学') == [0, 1]
+
+
+def test_drop_unused_columns_matches_full():
+    """测试丢弃无关列、每次读取只打开一次工作簿，计算结果与读取全部列时一致（只少了末尾附带的无关列）"""
+    print("🔍 测试丢弃无关列...")
+    rng = np.random.default_rng(3)
+    sheets = {}
+    for subject in ['语文', '数学']:
+        df = generate_subject_sheet(subject, 60, rng=rng, extra_columns=5)
+        # 无关列插在中间：其他科目的考试列、文本列
+        df.insert(3, '中考_物理_平均分_p1', rng.uniform(40, 100, len(df)))
+        df.insert(5, '备注', '无')
+        sheets[subject] = df
+    sheets['sheet1'] = pd.DataFrame({'说明': ['非科目工作表']})
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = write_result_workbook(os.path.join(tmp_dir, 'wide.xlsx'), sheets)
+        opened = []
+        original_load_workbook = openpyxl.load_workbook
+
+        def counting_load_workbook(*args, **kwargs):
+            opened.append(args[0])
+            return original_load_workbook(*args, **kwargs)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            full = process_all_subjects(path, output_pattern=None)
+            openpyxl.load_workbook = counting_load_workbook
+            try:
+                with WorkbookSession(path, drop_unused_columns=True) as workbook:
+                    projected_sheets = workbook.load()
+                session_opens = len(opened)
+                projected = process_all_subjects(path, output_pattern=None, drop_unused_columns=True)
+                all_subjects_opens = len(opened) - session_opens
+                single = process_single_subject(path, '数学', drop_unused_columns=True, write_output=False)
+                single_opens = len(opened) - session_opens - all_subjects_opens
+            finally:
+                openpyxl.load_workbook = original_load_workbook
+
+    # 表头和数据来自同一次解析，不为读取表头或逐个科目重新打开工作簿
+    print(f"  打开工作簿次数: 会话 {session_opens}，所有科目 {all_subjects_opens}，单个科目 {single_opens}")
+    assert session_opens == all_subjects_opens == single_opens == 1
+    pd.testing.assert_frame_equal(single, projected['数学'])
+
+    for subject, df in projected_sheets.items():
+        print(f"  {subject}: {len(df.columns)}/{len(sheets[subject].columns)} 列")
+        assert len(df.columns) == 4 + 20
+        assert not any(column.startswith('附加统计') or column in ('备注', '中考_物理_平均分_p1')
+                       for column in df.columns)
+    for subject in ['语文', '数学']:
+        result = projected[subject]
+        assert len(full[subject].columns) == len(result.columns) + 7
+        pd.testing.assert_frame_equal(full[subject][result.columns], result)
+
+
+if __name__ == "__main__":
+    test_workbook_parsed_once()
+    test_get_sheet_returns_copy()
+    test_subject_column_positions()
+    test_drop_unused_columns_matches_full()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试上传后后台预加载工作簿
+验证同一文件只解析一次、按LRU保留会话、解析失败时回退，以及上传后处理任务不再解析Excel
+"""
+
+import io
+import os
+import tempfile
+import threading
+import time
+import web_app
+import workbook_loader
+from test_workbook_loader import create_test_workbook
+from workbook_cache import WorkbookCache
+from workbook_loader import WorkbookPreloader, WorkbookSession
+
+
+def test_preloader_loads_once():
+    """测试同一文件只解析一次，解析期间 get 等待完成，超出上限时淘汰最久未使用的会话"""
+    print("🔍 测试后台预加载...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = [os.path.join(tmp_dir, f'test{i}.xlsx') for i in range(2)]
+        for path in paths:
+            create_test_workbook(path)
+
+        loads = []
+        release = threading.Event()
+
+        def slow_session(path):
+            loads.append(path)
+            release.wait(5)
+            return WorkbookSession(path, clean=True)
+
+        preloader = WorkbookPreloader(slow_session, max_workbooks=1)
+        try:
+            first = preloader.submit(paths[0])
+            assert preloader.submit(paths[0]) is first
+            threading.Timer(0.2, release.set).start()
+            session = preloader.get(paths[0])
+            assert session.cleaned and session.subjects == ['语文', '数学']
+            assert preloader.get(paths[0]) is session
+            assert loads == [paths[0]]
+
+            preloader.submit(paths[1])
+            assert preloader.get(paths[0]) is None
+            assert preloader.get(paths[1]) is not None
+
+            preloader.submit(os.path.join(tmp_dir, 'missing.xlsx'))
+            assert preloader.get(os.path.join(tmp_dir, 'missing.xlsx')) is None
+        finally:
+            preloader.shutdown()
+
+
+def test_upload_preloads_workbook():
+    """测试上传后后台完成解析，/process 直接使用预加载的数据"""
+    print("🔍 测试上传后预加载...")
+    original_config = {key: web_app.app.config[key] for key in ('UPLOAD_FOLDER', 'OUTPUT_FOLDER')}
+    original_cache = web_app.workbook_cache
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'source.xlsx')
+        create_test_workbook(path)
+        web_app.app.config['UPLOAD_FOLDER'] = tmp_dir
+        web_app.app.config['OUTPUT_FOLDER'] = os.path.join(tmp_dir, 'outputs')
+        web_app.workbook_cache = WorkbookCache(os.path.join(tmp_dir, 'cache'))
+        original_read_excel = workbook_loader.pd.read_excel
+        upload = {}
+        try:
+            client = web_app.app.test_client()
+            with open(path, 'rb') as f:
+                upload = client.post('/upload', data={'file': (io.BytesIO(f.read()), 'test.xlsx')}).get_json()
+            assert upload['preloading']
+            assert web_app.workbook_preloader.get(upload['filepath'], timeout=30) is not None
+
+            calls = []
+
+            def counting_read_excel(*args, **kwargs):
+                calls.append(kwargs.get('sheet_name'))
+                return original_read_excel(*args, **kwargs)
+
+            workbook_loader.pd.read_excel = counting_read_excel
+            response = client.post('/process', json={'filepath': upload['filepath'], 'subject': ''})
+            job = web_app.job_manager.get(response.get_json()['job_id'])
+            deadline = time.time() + 60
+            while not job.is_finished and time.time() < deadline:
+                time.sleep(0.05)
+        finally:
+            workbook_loader.pd.read_excel = original_read_excel
+            web_app.app.config.update(original_config)
+            web_app.workbook_cache = original_cache
+            web_app.workbook_preloader.discard(upload.get('filepath'))
+
+    print(f"  任务状态: {job.state}，处理时解析Excel {len(calls)} 次")
+    assert job.error is None and job.progress == 100
+    assert calls == []
+    assert job.profile['stages'][0]['stage'] == web_app.STAGE_LOAD_WORKBOOK
+
+
+if __name__ == "__main__":
+    test_preloader_loads_once()
+    test_upload_preloads_workbook()
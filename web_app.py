@@ -1,31 +1,80 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_file, stream_with_context
 import os
 import pandas as pd
 import numpy as np
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
 import tempfile
 import zipfile
-from calculate_scores_final_fix import calculate_scores_final_fix
-import threading
+from calculate_scores_final_fix import (EDUCATION_CONFIGS, STAGE_LABELS, STAGE_LOAD_WORKBOOK, STAGE_SUBJECTS,
+                                        STAGE_WRITE_OUTPUT, calculate_scores_final_fix, process_all_subjects)
+from pipeline_profiler import StageProfiler, format_profile
+from workbook_loader import WorkbookPreloader, WorkbookSession
+from workbook_inspector import inspect_workbook
+from workbook_cache import WorkbookCache
+from result_writer import write_consolidated_workbook
+from scoring_engine import DEFAULT_SCORING_METHOD, validate_scoring_method
+from job_manager import JOB_COMPLETED, JOB_FAILED, JobManager, QueueFullError
 import time
+import json
+import uuid
+import logging
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['OUTPUT_FOLDER'] = 'outputs'
+# 并行处理科目的进程数，0或1表示顺序处理
+app.config['PARALLEL_WORKERS'] = int(os.environ.get('PARALLEL_WORKERS', '0'))
+# 已清洗工作簿缓存目录及容量上限
+app.config['CACHE_FOLDER'] = 'cache'
+app.config['CACHE_MAX_BYTES'] = 512 * 1024 * 1024
+# 默认输出一个汇总工作簿（教师汇总 + 每科一个工作表），设为0时每个科目输出一个文件并打包ZIP
+app.config['CONSOLIDATED_OUTPUT'] = os.environ.get('CONSOLIDATED_OUTPUT', '1') != '0'
+# 同时处理的任务数和排队任务数上限（队列满时返回429）
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', '2'))
+app.config['JOB_QUEUE_SIZE'] = int(os.environ.get('JOB_QUEUE_SIZE', '20'))
+# 进度事件流的心跳间隔和浏览器重连间隔
+app.config['SSE_HEARTBEAT_SECONDS'] = 15
+app.config['SSE_RETRY_MS'] = 3000
+# 任务性能统计是否包含内存峰值：tracemalloc 会使计算变慢一倍以上，默认只统计耗时和CPU时间，设为1时开启
+app.config['PROFILE_MEMORY'] = os.environ.get('PROFILE_MEMORY', '0') == '1'
+# 是否只保留科目计算用到的列（不减少解析时间，区县汇总表无关列较多时减少清洗、内存和写出），结果中不再附带无关列
+app.config['DROP_UNUSED_COLUMNS'] = os.environ.get('DROP_UNUSED_COLUMNS', '0') == '1'
+# 上传后立即在后台解析并清洗工作簿（处理时直接使用），以及内存中保留的已解析工作簿数
+app.config['PRELOAD_ON_UPLOAD'] = os.environ.get('PRELOAD_ON_UPLOAD', '1') != '0'
+app.config['PRELOAD_MAX_WORKBOOKS'] = int(os.environ.get('PRELOAD_MAX_WORKBOOKS', '4'))
+
+# 汇总工作簿和打包文件名
+CONSOLIDATED_FILENAME = '所有计算结果.xlsx'
+ZIP_FILENAME = '所有计算结果.zip'
+
+# 科目计算阶段在总进度中的区间（之前为读取工作簿，之后为写出汇总文件）
+SUBJECT_PROGRESS_START = 10
+SUBJECT_PROGRESS_END = 90
+
+# 非科目工作表
+EXCLUDED_SHEETS = ['sheet1', 'Sheet1', '汇总', '总览']
+
+logger = logging.getLogger(__name__)
 
 # 确保上传和输出目录存在
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
 
-# 全局变量存储处理状态
-processing_status = {
-    'is_processing': False,
-    'progress': 0,
-    'message': '',
-    'error': None,
-    'output_files': []
-}
+# 相同文件重复上传时直接复用已清洗的数据
+workbook_cache = WorkbookCache(app.config['CACHE_FOLDER'], max_bytes=app.config['CACHE_MAX_BYTES'])
+
+def open_workbook(filepath):
+    """打开上传文件的工作簿会话（读取时经过磁盘缓存）"""
+    return WorkbookSession(filepath, excluded_sheets=EXCLUDED_SHEETS, cache=workbook_cache,
+                           drop_unused_columns=app.config['DROP_UNUSED_COLUMNS'])
+
+# 上传后在后台解析的工作簿
+workbook_preloader = WorkbookPreloader(open_workbook, max_workbooks=app.config['PRELOAD_MAX_WORKBOOKS'])
+
+# 处理任务：每个任务有独立的ID、状态和输出目录
+job_manager = JobManager(max_workers=app.config['JOB_WORKERS'], max_queue=app.config['JOB_QUEUE_SIZE'])
 
 @app.route('/')
 def index():
@@ -43,127 +92,303 @@ def upload_file():
     if not file.filename.endswith(('.xls', '.xlsx')):
         return jsonify({'error': '只支持Excel文件(.xls, .xlsx)'}), 400
     
-    # 保存上传的文件
-    filename = secure_filename(file.filename)
+    # 保存上传的文件（加随机前缀，避免不同用户同名文件互相覆盖）
+    filename = f"{uuid.uuid4().hex[:8]}_{secure_filename(file.filename)}"
     filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
     file.save(filepath)
     
-    return jsonify({'success': True, 'filename': filename, 'filepath': filepath})
+    # 用户选择科目和教育阶段期间在后台完成解析和清洗，/process 只需计算和写出
+    preloading = app.config['PRELOAD_ON_UPLOAD']
+    if preloading:
+        workbook_preloader.submit(filepath)
+    
+    return jsonify({'success': True, 'filename': filename, 'filepath': filepath, 'preloading': preloading})
 
-@app.route('/process', methods=['POST'])
-def process_file():
-    global processing_status
+@app.route('/inspect', methods=['POST'])
+def inspect_file():
+    """预检已上传的文件：只读取表头行，返回识别到的科目、考试、指标和缺少的列"""
+    data = request.get_json()
+    filepath = data.get('filepath')
+    education_level = data.get('education_level', 'middle')
+    
+    if not filepath or not os.path.exists(filepath):
+        return jsonify({'error': '文件不存在'}), 400
     
-    if processing_status['is_processing']:
-        return jsonify({'error': '正在处理中，请稍候'}), 400
+    try:
+        result = inspect_workbook(filepath, excluded_sheets=EXCLUDED_SHEETS, education_level=education_level)
+    except Exception as e:
+        logger.exception("预检文件失败: %s", filepath)
+        return jsonify({'error': f'无法读取文件: {e}'}), 400
     
+    return jsonify({'success': True, **result})
+
+@app.route('/process', methods=['POST'])
+def process_file():
     data = request.get_json()
     filepath = data.get('filepath')
     subject = data.get('subject', '')  # 空字符串表示处理所有科目
     education_level = data.get('education_level', 'middle')  # 教育阶段，默认初中
+    consolidated = bool(data.get('consolidated', app.config['CONSOLIDATED_OUTPUT']))  # 是否输出汇总工作簿
+    scoring_method = data.get('scoring_method', DEFAULT_SCORING_METHOD)  # 赋分方式，默认统一百分比区间
+    scoring_table = data.get('scoring_table')  # 自定义百分比赋分表（scoring_method 为 custom 时）
+    education_levels = data.get('education_levels')  # 多场景模式：同时计算多个教育阶段，如 ["middle", "primary"]
     
     if not filepath or not os.path.exists(filepath):
         return jsonify({'error': '文件不存在'}), 400
     
-    # 开始处理
-    processing_status['is_processing'] = True
-    processing_status['progress'] = 0
-    processing_status['message'] = '开始处理...'
-    processing_status['error'] = None
-    processing_status['output_files'] = []
+    try:
+        validate_scoring_method(scoring_method, scoring_table)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # 在新线程中处理文件
-    thread = threading.Thread(target=process_file_thread, args=(filepath, subject, education_level))
-    thread.daemon = True
-    thread.start()
+    if education_levels is not None and (
+            not isinstance(education_levels, list) or not education_levels
+            or any(level not in EDUCATION_CONFIGS for level in education_levels)):
+        return jsonify({'error': f'不支持的教育阶段: {education_levels}，可选: {list(EDUCATION_CONFIGS)}'}), 400
     
-    return jsonify({'success': True, 'message': '开始处理文件'})
-
-def process_file_thread(filepath, subject, education_level):
-    global processing_status
+    # 提交到任务队列，由工作线程处理；队列满时返回429
+    try:
+        job = job_manager.submit(process_file_thread, filepath, subject, education_level, consolidated,
+                                 scoring_method, scoring_table, education_levels)
+    except QueueFullError as e:
+        response = jsonify({'error': '当前处理任务较多，请稍后重试', 'retry_after': e.retry_after})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
     
+    return jsonify({
+        'success': True,
+        'message': '已加入处理队列',
+        'job_id': job.job_id,
+        'queue_position': job_manager.queue_position(job)
+    })
+
+def job_output_dir(job):
+    """任务的输出目录（各任务的结果文件互不覆盖）"""
+    return os.path.join(app.config['OUTPUT_FOLDER'], job.job_id)
+
+def build_results_zip(output_dir, output_files):
+    """将单科结果文件打包（处理完成时生成一次，下载时直接发送）"""
+    zip_path = os.path.join(output_dir, ZIP_FILENAME)
+    with zipfile.ZipFile(zip_path, 'w') as zipf:
+        for file_path in output_files:
+            if os.path.exists(file_path):
+                zipf.write(file_path, os.path.basename(file_path))
+    return zip_path
+
+def process_file_thread(job, filepath, subject, education_level, consolidated=False,
+                        scoring_method=DEFAULT_SCORING_METHOD, scoring_table=None, education_levels=None):
+    """在任务工作线程中处理上传的文件，进度和输出记录在 job 上
+
+    education_levels 不为空时为多场景模式：每个科目的结果文件中每个教育阶段一个工作表，
+    汇总输出时每个教育阶段写出一个汇总工作簿
+    """
+    # 记录各阶段耗时、CPU时间和内存峰值，随任务状态返回
+    profiler = StageProfiler(track_memory=app.config['PROFILE_MEMORY']).start()
+    subject_profiles = {}
     try:
-        processing_status['message'] = '正在读取Excel文件...'
-        processing_status['progress'] = 10
+        job.update(message='正在读取Excel文件...', progress=2)
+        
+        # 整个工作簿只解析一次：优先使用上传后预加载的数据（仍在解析时等待完成），
+        # 其次是内容相同文件的缓存，各科目直接使用已解析的数据
+        start_time = time.perf_counter()
+        workbook = workbook_preloader.get(filepath)
+        preloaded = workbook is not None
+        if not preloaded:
+            workbook = open_workbook(filepath)
+        workbook.load()
+        profiler.mark(STAGE_LOAD_WORKBOOK)
+        source = '使用上传时预加载的数据' if preloaded else 'Excel文件读取完成'
+        job.update(message=f'{source}（{time.perf_counter() - start_time:.1f}秒）',
+                   progress=SUBJECT_PROGRESS_START)
+        output_dir = job_output_dir(job)
+        os.makedirs(output_dir, exist_ok=True)
+        job.update(output_dir=output_dir)
+        # 输出汇总工作簿时不再写出单科文件，结果在全部计算完成后一次写出
+        output_pattern = None if consolidated else os.path.join(output_dir, '{subject}_计算结果.xlsx')
+        all_results = {}
+        
+        # 各科目按实际处理阶段推进进度，科目之间平分 [SUBJECT_PROGRESS_START, SUBJECT_PROGRESS_END]
+        subject_count = 1 if subject else max(1, len(workbook.subjects))
+        finished_subjects = []
+        
+        def on_stage(subject_name, stage, fraction, elapsed, detail):
+            overall = (len(finished_subjects) + fraction) / subject_count
+            message = f'{subject_name}: {STAGE_LABELS[stage]}'
+            if detail:
+                message += f' {detail}'
+            job.update(message=f'{message}（已用 {elapsed:.1f}秒）',
+                       progress=SUBJECT_PROGRESS_START
+                       + int((SUBJECT_PROGRESS_END - SUBJECT_PROGRESS_START) * overall))
         
         # 调用计算函数
         if subject:
             # 处理单个科目
-            processing_status['message'] = f'正在处理科目: {subject}...'
-            processing_status['progress'] = 30
+            job.update(message=f'正在处理科目: {subject}...')
             
-            result_df = calculate_scores_final_fix(filepath, subject, education_level)
+            # 单科文件由计算流程直接写到输出目录
+            result_df, subject_profiles[subject] = calculate_scores_final_fix(
+                filepath, subject, education_level, workbook=workbook, output_pattern=output_pattern,
+                stage_callback=on_stage, return_profile=True, profile_memory=app.config['PROFILE_MEMORY'],
+                scoring_method=scoring_method, scoring_table=scoring_table, education_levels=education_levels)
             if result_df is not None:
-                output_filename = f"{subject}_计算结果.xlsx"
-                output_path = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
-                result_df.to_excel(output_path, index=False)
-                processing_status['output_files'].append(output_path)
-                processing_status['message'] = f'科目 {subject} 处理完成'
-                processing_status['progress'] = 100
+                all_results[subject] = result_df
+                job.update(message=f'科目 {subject} 处理完成')
             else:
-                processing_status['error'] = f'科目 {subject} 处理失败'
+                job.update(error=f'科目 {subject} 处理失败')
         else:
             # 处理所有科目
-            processing_status['message'] = '正在处理所有科目...'
-            processing_status['progress'] = 30
+            job.update(message='正在处理所有科目...')
             
-            # 读取Excel文件获取所有sheet名称
-            excel_file = pd.ExcelFile(filepath)
-            subject_sheets = [sheet for sheet in excel_file.sheet_names 
-                            if sheet not in ['sheet1', 'Sheet1', '汇总', '总览']]
+            def on_subject_done(subject_name, completed, total_subjects, success):
+                finished_subjects.append(subject_name)
+                job.update(message=f'已完成科目: {subject_name} ({completed}/{total_subjects})...',
+                           progress=SUBJECT_PROGRESS_START
+                           + int((SUBJECT_PROGRESS_END - SUBJECT_PROGRESS_START) * completed / total_subjects))
             
-            total_subjects = len(subject_sheets)
-            processed_count = 0
+            parallel_workers = app.config['PARALLEL_WORKERS']
+            all_results, subjects_profile = process_all_subjects(
+                filepath,
+                workbook=workbook,
+                parallel=parallel_workers > 1,
+                max_workers=parallel_workers,
+                progress_callback=on_subject_done,
+                output_pattern=output_pattern,
+                stage_callback=on_stage,
+                return_profile=True,
+                profile_memory=app.config['PROFILE_MEMORY'],
+                scoring_method=scoring_method,
+                scoring_table=scoring_table,
+                education_level=education_level,
+                education_levels=education_levels
+            )
+            subject_profiles = subjects_profile['subjects']
             
-            for i, subject_name in enumerate(subject_sheets):
-                processing_status['message'] = f'正在处理科目: {subject_name} ({i+1}/{total_subjects})...'
-                processing_status['progress'] = 30 + int(50 * (i / total_subjects))
-                
-                result_df = calculate_scores_final_fix(filepath, subject_name, education_level)
-                if result_df is not None:
-                    output_filename = f"{subject_name}_计算结果.xlsx"
-                    output_path = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
-                    result_df.to_excel(output_path, index=False)
-                    processing_status['output_files'].append(output_path)
-                    processed_count += 1
-                
-                time.sleep(0.1)  # 让用户看到进度
+            processed_count = len(all_results)
             
-            processing_status['message'] = f'所有科目处理完成，共处理 {processed_count} 个科目'
-            processing_status['progress'] = 100
+            job.update(message=f'所有科目处理完成，共处理 {processed_count} 个科目')
+        
+        workbook.close()
+        profiler.mark(STAGE_SUBJECTS)
+        
+        # 下载全部的文件在处理完成时生成一次
+        if all_results:
+            done_message = job.message
+            if consolidated:
+                job.update(message='正在写出汇总工作簿...', progress=SUBJECT_PROGRESS_END)
+                if education_levels:
+                    # 每个教育阶段一个汇总工作簿，一并打包
+                    output_files = []
+                    for level in dict.fromkeys(education_levels):
+                        consolidated_path = os.path.join(
+                            output_dir, f"{EDUCATION_CONFIGS[level]['label']}_{CONSOLIDATED_FILENAME}")
+                        write_consolidated_workbook(consolidated_path, {
+                            subject_name: results[level] for subject_name, results in all_results.items()})
+                        output_files.append(consolidated_path)
+                    job.update(output_files=output_files,
+                               download_all_file=build_results_zip(output_dir, output_files))
+                else:
+                    consolidated_path = os.path.join(output_dir, CONSOLIDATED_FILENAME)
+                    write_consolidated_workbook(consolidated_path, all_results)
+                    job.update(output_files=[consolidated_path], download_all_file=consolidated_path)
+            else:
+                output_files = [output_pattern.format(subject=subject_name) for subject_name in all_results]
+                job.update(output_files=output_files,
+                           download_all_file=build_results_zip(output_dir, output_files))
+            job.update(message=done_message)
+            profiler.mark(STAGE_WRITE_OUTPUT)
+        
+        if job.error is None:
+            job.update(progress=100)
         
     except Exception as e:
-        processing_status['error'] = f'处理过程中出现错误: {str(e)}'
-        processing_status['progress'] = 0
-    
+        job.update(error=f'处理过程中出现错误: {str(e)}', progress=0)
     finally:
-        processing_status['is_processing'] = False
+        profile = profiler.stop().to_dict()
+        profile['subjects'] = {name: subject_profile for name, subject_profile in subject_profiles.items()
+                               if subject_profile is not None}
+        job.update(profile=profile)
+        logger.info("任务 %s 性能统计:\n%s", job.job_id, format_profile(profile, STAGE_LABELS))
+
+def job_status_payload(job):
+    """任务状态（输出文件只返回文件名）"""
+    status = job_manager.status(job)
+    status['output_files'] = [os.path.basename(path) for path in status['output_files']]
+    if status['download_all_file']:
+        status['download_all_file'] = os.path.basename(status['download_all_file'])
+    return status
 
-@app.route('/status')
-def get_status():
-    return jsonify(processing_status)
+def job_status_response(job):
+    """任务状态的JSON响应"""
+    return jsonify(job_status_payload(job))
 
-@app.route('/download/<filename>')
-def download_file(filename):
-    file_path = os.path.join(app.config['OUTPUT_FOLDER'], filename)
-    if os.path.exists(file_path):
+def format_sse(event, data):
+    """格式化一条 Server-Sent Events 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/events/<job_id>')
+def job_events(job_id):
+    """推送任务进度：状态每次变化时发送 progress 事件，完成或失败时发送 done 事件后结束"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在'}), 404
+    
+    def generate():
+        # 连接断开时浏览器按 retry 毫秒数自动重连
+        yield f"retry: {app.config['SSE_RETRY_MS']}\n\n"
+        version = None
+        while True:
+            current_version = job.wait_for_update(version, timeout=app.config['SSE_HEARTBEAT_SECONDS'])
+            if current_version == version:
+                # 长时间没有进度变化时发送注释行保持连接
+                yield ": keep-alive\n\n"
+                continue
+            version = current_version
+            status = job_status_payload(job)
+            if status['state'] in (JOB_COMPLETED, JOB_FAILED):
+                yield format_sse('done', status)
+                return
+            yield format_sse('progress', status)
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # 禁止反向代理缓冲事件流
+    return response
+
+@app.route('/status/<job_id>')
+def get_job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在'}), 404
+    return job_status_response(job)
+
+def send_job_file(job, filename):
+    """发送任务输出目录中的文件"""
+    file_path = safe_join(job.output_dir, filename) if job is not None and job.output_dir else None
+    if file_path and os.path.isfile(file_path):
         return send_file(file_path, as_attachment=True)
     else:
         return jsonify({'error': '文件不存在'}), 404
 
-@app.route('/download_all')
-def download_all():
-    if not processing_status['output_files']:
+@app.route('/download/<job_id>/<filename>')
+def download_job_file(job_id, filename):
+    return send_job_file(job_manager.get(job_id), filename)
+
+def send_download_all(job):
+    # 汇总工作簿或ZIP在处理完成时已生成，直接发送
+    download_path = job.download_all_file if job is not None else None
+    if not download_path or not os.path.exists(download_path):
         return jsonify({'error': '没有可下载的文件'}), 400
     
-    # 创建ZIP文件
-    zip_path = os.path.join(app.config['OUTPUT_FOLDER'], '所有计算结果.zip')
-    with zipfile.ZipFile(zip_path, 'w') as zipf:
-        for file_path in processing_status['output_files']:
-            if os.path.exists(file_path):
-                zipf.write(file_path, os.path.basename(file_path))
-    
-    return send_file(zip_path, as_attachment=True)
+    return send_file(download_path, as_attachment=True)
+
+@app.route('/download_all/<job_id>')
+def download_all_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在'}), 404
+    return send_download_all(job)
+
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     app.run(debug=True, host='0.0.0.0', port=8080)
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+# 列式存储（Parquet）需要 pyarrow，不可用时回退为 pickle
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+try:
+    from data_cleaner import CLEANER_VERSION
+except ImportError:
+    CLEANER_VERSION = 'raw'
+
+MANIFEST_NAME = 'manifest.json'
+
+
+class WorkbookCache:
+    """已清洗工作簿的磁盘缓存
+
+    以“文件内容SHA-256 + 清洗器版本”为键，每个工作表存为一个列式文件，
+    总大小超过上限时按最近访问时间(LRU)淘汰。
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, file_path, excluded_sheets=(), projected=False):
+        """计算缓存键：文件内容哈希 + 清洗器版本 + 排除的工作表（+ 列投影）"""
+        sha256 = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(chunk)
+        sha256.update(f'|cleaner={CLEANER_VERSION}'.encode('utf-8'))
+        sha256.update(f'|excluded={sorted(excluded_sheets)}'.encode('utf-8'))
+        if projected:
+            # 列投影的数据不含无关列，与完整数据分开缓存（未投影时的键保持不变）
+            sha256.update(b'|projected')
+        return sha256.hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key):
+        """读取缓存，未命中返回 None；命中时更新访问时间"""
+        entry_dir = self._entry_dir(key)
+        manifest_path = os.path.join(entry_dir, MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            return None
+
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+
+            sheets = {}
+            for sheet in manifest['sheets']:
+                sheet_path = os.path.join(entry_dir, sheet['file'])
+                if sheet['format'] == 'parquet':
+                    df = pd.read_parquet(sheet_path)
+                    df.columns = sheet['columns']
+                else:
+                    df = pd.read_pickle(sheet_path)
+                sheets[sheet['name']] = df
+
+            os.utime(manifest_path)  # 记录最近访问时间
+            return sheets
+        except Exception as e:
+            print(f"警告: 读取缓存失败，将重新解析: {e}")
+            self._remove_entry(key)
+            return None
+
+    def put(self, key, sheets):
+        """写入缓存（先写临时目录再原子替换），然后按容量淘汰旧条目"""
+        tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=self.cache_dir)
+        try:
+            manifest = {'created': time.time(), 'sheets': []}
+            for index, (name, df) in enumerate(sheets.items()):
+                manifest['sheets'].append(self._write_sheet(tmp_dir, index, name, df))
+
+            with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False)
+
+            with self._lock:
+                entry_dir = self._entry_dir(key)
+                if os.path.exists(entry_dir):
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                os.replace(tmp_dir, entry_dir)
+                self._evict(keep=key)
+        except Exception as e:
+            print(f"警告: 写入缓存失败: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _write_sheet(self, entry_dir, index, name, df):
+        """写入单个工作表，列名记录在清单中（Parquet要求字符串列名）"""
+        columns = list(df.columns)
+        if PARQUET_AVAILABLE:
+            try:
+                file_name = f'sheet_{index}.parquet'
+                stored = df.copy(deep=False)
+                stored.columns = [f'c{i}' for i in range(len(columns))]
+                stored.to_parquet(os.path.join(entry_dir, file_name), index=False)
+                return {'name': name, 'file': file_name, 'format': 'parquet', 'columns': columns}
+            except Exception:
+                # 混合类型的对象列无法写入Parquet，回退为pickle
+                pass
+
+        file_name = f'sheet_{index}.pkl'
+        df.to_pickle(os.path.join(entry_dir, file_name))
+        return {'name': name, 'file': file_name, 'format': 'pickle', 'columns': None}
+
+    def _entry_size(self, entry_dir):
+        total = 0
+        for root, _, files in os.walk(entry_dir):
+            for file_name in files:
+                total += os.path.getsize(os.path.join(root, file_name))
+        return total
+
+    def _evict(self, keep=None):
+        """按最近访问时间从旧到新淘汰条目，直到总大小不超过上限"""
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            if key.startswith('.tmp-'):
+                continue  # 正在写入的条目
+            manifest_path = os.path.join(self._entry_dir(key), MANIFEST_NAME)
+            if os.path.exists(manifest_path):
+                entries.append((os.path.getmtime(manifest_path), key, self._entry_size(self._entry_dir(key))))
+
+        total = sum(size for _, _, size in entries)
+        for _, key, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self._remove_entry(key)
+            total -= size
+            print(f"缓存淘汰: {key[:12]}... ({size} 字节)")
+
+    def _remove_entry(self, key):
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            for key in os.listdir(self.cache_dir):
+                self._remove_entry(key)
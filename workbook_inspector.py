@@ -0,0 +1,88 @@
+"""
+工作簿预检：只读取工作表名称和表头行（不解析数据行），在正式处理前识别各科目的考试和指标，
+并提示缺少的列，供上传后填充科目选项和提前告警
+"""
+
+import time
+
+import pandas as pd
+
+from calculate_scores_final_fix import EDUCATION_CONFIGS, extract_exam_names
+from column_resolver import ColumnResolver
+from workbook_loader import DEFAULT_EXCLUDED_SHEETS, clean_subject_dataframe, read_sheet_headers
+
+# 每个科目工作表必需的基本信息列（清洗后的列名，另需 {科目}科任）
+REQUIRED_BASE_COLUMNS = ['学校代码', '学校名称', '班别']
+
+
+def inspect_subject(columns, subject, education_level='middle'):
+    """按原始表头预检一个科目：表头标准化后识别考试，逐个考试检查指标列
+
+    Returns:
+        {'name', 'exams': [{'name', 'metrics', 'missing_metrics'}], 'missing_columns', 'warnings', 'can_process'}
+    """
+    metrics = EDUCATION_CONFIGS.get(education_level, EDUCATION_CONFIGS['middle'])['metrics']
+    # 在请求处理线程中运行，不能重定向全局 stdout（会吞掉同时运行的任务日志），改为关闭各步骤的输出
+    header = clean_subject_dataframe(pd.DataFrame(columns=columns), verbosity='quiet')
+    exam_names, _ = extract_exam_names(header, subject, verbose=False)
+    resolver = ColumnResolver(header.columns)
+
+    present = set(header.columns)
+    missing_columns = [column for column in REQUIRED_BASE_COLUMNS + [f'{subject}科任'] if column not in present]
+    warnings = []
+    if missing_columns:
+        warnings.append(f"缺少列: {'、'.join(missing_columns)}")
+
+    exams = []
+    previous_metrics = None
+    total_count = 0
+    for i, exam in enumerate(exam_names):
+        found = [metric for metric in metrics if resolver.resolve(exam, subject, metric, i + 1) is not None]
+        missing = [metric for metric in metrics if metric not in found]
+        exams.append({'name': exam, 'metrics': found, 'missing_metrics': missing})
+        if missing:
+            warnings.append(f"{exam} 缺少指标: {'、'.join(missing)}，不计算该次考试总分")
+        elif previous_metrics is not None and len(previous_metrics) < len(metrics):
+            # 后续考试按与上一次考试的差值赋分，上一次考试缺少的指标无法计算差值
+            warnings.append(f"{exam_names[i - 1]} 缺少指标，{exam} 的差值总分无法计算")
+        else:
+            total_count += 1
+        previous_metrics = found
+
+    if not exam_names:
+        warnings.append("未找到任何考试数据，该科目无法处理")
+    elif total_count == 0:
+        warnings.append("没有任何考试能计算总分，综合得分将为0")
+
+    return {
+        'name': subject,
+        'exams': exams,
+        'missing_columns': missing_columns,
+        'warnings': warnings,
+        'can_process': bool(exam_names),
+    }
+
+
+def inspect_workbook(file_path, excluded_sheets=None, education_level='middle'):
+    """预检工作簿：一次读取全部科目工作表的表头行，逐个科目识别考试和缺少的列
+
+    Args:
+        file_path: Excel文件路径
+        excluded_sheets: 非科目工作表名称
+        education_level: 教育阶段（决定需要检查的指标）
+
+    Returns:
+        {'sheets': 全部工作表, 'subjects': [inspect_subject 结果], 'elapsed': 秒数}
+    """
+    start_time = time.perf_counter()
+    if excluded_sheets is None:
+        excluded_sheets = DEFAULT_EXCLUDED_SHEETS
+    with pd.ExcelFile(file_path) as excel_file:
+        sheet_names = excel_file.sheet_names
+        subjects = [sheet for sheet in sheet_names if sheet not in excluded_sheets]
+        headers = read_sheet_headers(excel_file, subjects)
+    return {
+        'sheets': sheet_names,
+        'subjects': [inspect_subject(headers[subject], subject, education_level) for subject in subjects],
+        'elapsed': time.perf_counter() - start_time,
+    }
@@ -0,0 +1,244 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from column_resolver import subject_column_positions
+
+# 导入数据清洗模块
+try:
+    from data_cleaner import DataCleaner
+    DATA_CLEANER_AVAILABLE = True
+except ImportError:
+    print("警告: 数据清洗模块未找到，将使用原始数据处理方式")
+    DATA_CLEANER_AVAILABLE = False
+
+# 非科目工作表（不参与计算）
+DEFAULT_EXCLUDED_SHEETS = ['sheet1']
+
+logger = logging.getLogger(__name__)
+
+
+def clean_subject_dataframe(df, verbosity='summary'):
+    """科目数据清洗预处理：标准化表头并转换数值列
+
+    Args:
+        verbosity: 清洗日志详细程度，默认每个科目只输出一条汇总记录；'quiet' 时不输出任何内容
+    """
+    verbose = verbosity != 'quiet'
+    if DATA_CLEANER_AVAILABLE:
+        if verbose:
+            print("开始数据清洗...")
+        cleaner = DataCleaner(verbosity=verbosity)
+        df = cleaner.clean_dataframe(df)
+        if verbose:
+            print("数据清洗完成")
+    else:
+        # 原始处理方式（兼容性）
+        if verbose:
+            print("使用原始数据处理方式")
+        # 标准化列名
+        df.columns = [col.strip() if isinstance(col, str) else col for col in df.columns]
+        
+        # 重命名关键列
+        df = df.rename(columns={
+            '学校   代码': '学校代码',
+            '学校名称': '学校名称',
+            '班   别': '班别'
+        })
+    return df
+
+
+def read_sheet_headers(excel_file, sheet_names):
+    """只读取各工作表的表头行（nrows=0，不解析数据行）
+
+    Returns:
+        {工作表名称: [原始列名]}
+    """
+    if not sheet_names:
+        return {}
+    headers = pd.read_excel(excel_file, sheet_name=list(sheet_names), nrows=0)
+    return {name: list(df.columns) for name, df in headers.items()}
+
+
+def read_projected_sheets(excel_file, subjects):
+    """丢弃无关列：一次 read_excel 解析所有科目工作表，再按表头只保留科目计算用到的列
+
+    解析时间和解析时的内存峰值与读取全部列相同：Excel 读取器（openpyxl、xlrd）即使指定 usecols
+    也要解析工作表的每个单元格，按 usecols 逐表读取还要重复解析工作簿。丢弃无关列减少的是之后的清洗列数、
+    缓存大小、加载后的内存占用和写出耗时（区县汇总表往往带有几十个与本科目无关的列）。
+    注意：结果中不包含这些列，写出的结果文件末尾也不再附带它们。
+
+    Args:
+        excel_file: Excel文件路径或 pd.ExcelFile（传入路径时也只打开一次工作簿）
+        subjects: 科目工作表名称
+
+    Returns:
+        {科目: DataFrame}
+    """
+    if not subjects:
+        return {}
+    sheets = pd.read_excel(excel_file, sheet_name=list(subjects))
+    projected = {}
+    for subject in subjects:
+        df = sheets[subject]
+        positions = subject_column_positions(list(df.columns), subject)
+        projected[subject] = df.iloc[:, positions].copy()
+        logger.info("丢弃无关列: %s 保留 %d/%d 列", subject, len(positions), len(df.columns))
+    return projected
+
+
+class WorkbookSession:
+    """工作簿会话：整个工作簿只解析一次，向各科目计算流程提供已解析的DataFrame
+
+    Args:
+        file_path: Excel文件路径
+        excluded_sheets: 非科目工作表名称
+        clean: 是否在加载时完成数据清洗（cleaned为True时计算流程跳过清洗）
+        cache: WorkbookCache，命中时直接读取已清洗的数据，跳过Excel解析和清洗
+        drop_unused_columns: 是否丢弃科目计算用不到的列，结果中不再附带这些列（见 read_projected_sheets）
+    """
+
+    def __init__(self, file_path, excluded_sheets=None, clean=False, cache=None, drop_unused_columns=False):
+        self.file_path = file_path
+        self.excluded_sheets = list(excluded_sheets) if excluded_sheets is not None else DEFAULT_EXCLUDED_SHEETS
+        # 缓存中存放的是清洗后的数据
+        self.cleaned = clean or cache is not None
+        self.cache = cache
+        self.drop_unused_columns = drop_unused_columns
+        self._excel_file = None
+        self._sheets = None
+
+    @property
+    def sheet_names(self):
+        """工作簿中的全部工作表名称"""
+        if self._excel_file is None:
+            self._excel_file = pd.ExcelFile(self.file_path)
+        return self._excel_file.sheet_names
+
+    @property
+    def subjects(self):
+        """科目工作表名称（已排除非科目工作表）"""
+        if self._sheets is None and self.cache is not None:
+            # 有缓存时先尝试从缓存加载，避免打开工作簿
+            self.load()
+        if self._sheets is not None:
+            return list(self._sheets)
+        return [sheet for sheet in self.sheet_names if sheet not in self.excluded_sheets]
+
+    def load(self):
+        """一次 read_excel 调用解析所有科目工作表，启用缓存时优先读取缓存"""
+        if self._sheets is not None:
+            return self._sheets
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(self.file_path, self.excluded_sheets, self.drop_unused_columns)
+            sheets = self.cache.get(cache_key)
+            if sheets is not None:
+                print(f"命中工作簿缓存: {self.file_path}，共 {len(sheets)} 个科目工作表")
+                self._sheets = sheets
+                return self._sheets
+
+        subjects = [sheet for sheet in self.sheet_names if sheet not in self.excluded_sheets]
+        if self.drop_unused_columns:
+            sheets = read_projected_sheets(self._excel_file, subjects)
+        else:
+            sheets = pd.read_excel(self._excel_file, sheet_name=subjects) if subjects else {}
+        print(f"工作簿解析完成: {self.file_path}，共 {len(sheets)} 个科目工作表")
+
+        if self.cleaned:
+            sheets = {name: clean_subject_dataframe(df) for name, df in sheets.items()}
+        if cache_key is not None:
+            self.cache.put(cache_key, sheets)
+
+        self._sheets = sheets
+        return self._sheets
+
+    def get_sheet(self, subject):
+        """获取科目数据的副本（计算流程会就地修改列名和数据）"""
+        sheets = self.load()
+        if subject not in sheets:
+            raise KeyError(f"工作表 '{subject}' 不存在")
+        return sheets[subject].copy()
+
+    def close(self):
+        """释放工作簿句柄"""
+        if self._excel_file is not None:
+            self._excel_file.close()
+            self._excel_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+class WorkbookPreloader:
+    """上传后在后台解析并清洗工作簿，处理任务直接取用已加载的 WorkbookSession
+
+    按文件路径保存最近提交的 max_workbooks 个会话（LRU），超出时丢弃最久未使用的会话。
+    同一文件只解析一次：处理任务提交时若仍在解析，等待解析完成后直接使用结果。
+
+    Args:
+        session_factory: session_factory(file_path) -> WorkbookSession
+        max_workbooks: 内存中保留的会话数上限
+        max_workers: 后台解析线程数
+    """
+
+    def __init__(self, session_factory, max_workbooks=4, max_workers=1):
+        self.session_factory = session_factory
+        self.max_workbooks = max_workbooks
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='workbook-preload')
+        self._futures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, file_path):
+        session = self.session_factory(file_path)
+        try:
+            session.load()
+        finally:
+            session.close()  # 数据已在内存中，释放工作簿句柄
+        return session
+
+    def submit(self, file_path):
+        """提交后台解析（已提交的文件不重复解析），返回 Future"""
+        with self._lock:
+            future = self._futures.get(file_path)
+            if future is not None:
+                self._futures.move_to_end(file_path)
+                return future
+            future = self._executor.submit(self._load, file_path)
+            self._futures[file_path] = future
+            while len(self._futures) > self.max_workbooks:
+                _, oldest = self._futures.popitem(last=False)
+                oldest.cancel()  # 尚未开始解析的直接取消
+        return future
+
+    def get(self, file_path, timeout=None):
+        """取出预加载的会话（仍在解析时等待完成）；未预加载或解析失败时返回 None"""
+        with self._lock:
+            future = self._futures.get(file_path)
+            if future is None:
+                return None
+            self._futures.move_to_end(file_path)
+        try:
+            return future.result(timeout=timeout)
+        except Exception as e:
+            print(f"警告: 预加载工作簿失败，将重新解析: {e}")
+            self.discard(file_path)
+            return None
+
+    def discard(self, file_path):
+        """丢弃文件的预加载结果"""
+        with self._lock:
+            future = self._futures.pop(file_path, None)
+        if future is not None:
+            future.cancel()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)